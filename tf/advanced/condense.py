@@ -1,7 +1,6 @@
 def condense(api, tuples, condenseType, multiple=False):
     F = api.F
     E = api.E
-    L = api.L
     N = api.N
     fOtype = F.otype.v
     sortNodes = N.sortNodes
@@ -16,6 +15,10 @@ def condense(api, tuples, condenseType, multiple=False):
 
     if not multiple:
         tuples = (tuples,)
+    elif type(tuples) not in {tuple, list}:
+        tuples = tuple(tuples)
+
+    ups = _containers(api, (n for tup in tuples for n in tup), condenseType)
 
     for tup in tuples:
         for (i, n) in enumerate(tup):
@@ -23,20 +26,20 @@ def condense(api, tuples, condenseType, multiple=False):
             if nType == condenseType:
                 containers.setdefault(n, set())
             elif nType == slotType:
-                up = L.u(n, otype=condenseType)
+                up = ups.get(n, None)
                 if up:
-                    containers.setdefault(up[0], set()).add(n)
+                    containers.setdefault(up, set()).add(n)
             elif otypeRank[nType] < condenseRank:
                 slots = eoslots[n - maxSlot - 1]
                 first = slots[0]
                 last = slots[-1]
-                firstUp = L.u(first, otype=condenseType)
-                lastUp = L.u(last, otype=condenseType)
+                firstUp = ups.get(first, None)
+                lastUp = ups.get(last, None)
                 allUps = set()
                 if firstUp:
-                    allUps.add(firstUp[0])
+                    allUps.add(firstUp)
                 if lastUp:
-                    allUps.add(lastUp[0])
+                    allUps.add(lastUp)
                 for up in allUps:
                     containers.setdefault(up, set()).add(n)
             else:
@@ -48,7 +51,6 @@ def condense(api, tuples, condenseType, multiple=False):
 def condenseSet(api, tup, condenseType):
     F = api.F
     E = api.E
-    L = api.L
     N = api.N
     fOtype = F.otype.v
     sortNodes = N.sortNodes
@@ -61,25 +63,62 @@ def condenseSet(api, tup, condenseType):
 
     containers = set()
 
+    ups = _containers(api, tup, condenseType)
+
     for n in tup:
         nType = fOtype(n)
         if nType == condenseType:
             containers.add(n)
         elif nType == slotType:
-            up = L.u(n, otype=condenseType)
+            up = ups.get(n, None)
             if up:
-                containers.add(up[0])
+                containers.add(up)
         elif otypeRank[nType] < condenseRank:
             slots = eoslots[n - maxSlot - 1]
             first = slots[0]
             last = slots[-1]
-            firstUp = L.u(first, otype=condenseType)
-            lastUp = L.u(last, otype=condenseType)
+            firstUp = ups.get(first, None)
+            lastUp = ups.get(last, None)
             if firstUp:
-                containers.add(firstUp[0])
+                containers.add(firstUp)
             if lastUp:
-                containers.add(lastUp[0])
+                containers.add(lastUp)
         else:
             containers.add(n)
         # we skip nodes with a higher rank than that of the container
     return sortNodes(containers)
+
+
+def _containers(api, nodes, condenseType):
+    # The first embedder of type condenseType of the slots that are relevant
+    # for condensing nodes: the slots among the nodes and the first and last slots
+    # of the nodes of a lower rank than condenseType.
+    # They are looked up in one batch, see tf.core.locality.Locality.uMany
+
+    F = api.F
+    L = api.L
+    fOtype = F.otype.v
+    otypeRank = api.N.otypeRank
+    maxSlot = F.otype.maxSlot
+    eoslots = api.E.oslots.data
+    slotType = F.otype.slotType
+    condenseRank = otypeRank[condenseType]
+
+    slots = set()
+    for n in nodes:
+        nType = fOtype(n)
+        if nType == condenseType:
+            continue
+        if nType == slotType:
+            slots.add(n)
+        elif otypeRank[nType] < condenseRank:
+            mySlots = eoslots[n - maxSlot - 1]
+            slots.add(mySlots[0])
+            slots.add(mySlots[-1])
+
+    slots = tuple(slots)
+    return {
+        s: ups[0]
+        for (s, ups) in zip(slots, L.uMany(slots, otype=condenseType))
+        if ups
+    }
@@ -7,10 +7,13 @@ import types
 from ..core.helpers import console, wrapMessages
 from ..core.timestamp import SILENT_D, silentConvert
 from .condense import condense
+from ..search.cache import QueryCache, sizeOf
+from ..search.guard import Guard, YARN_NODE_BYTES
 
 
 def searchApi(app):
     app.search = types.MethodType(search, app)
+    app.count = types.MethodType(count, app)
 
 
 def getQueryFeatures(exe):
@@ -118,6 +121,9 @@ def search(
         If `limit` is a positive number, it will fetch only that many results.
         If it is negative, 0, None, or absent, it will fetch arbitrary many results.
 
+        If `sort` is `True`, you get the first `limit` results in canonical order,
+        and they are computed without computing all results.
+
         !!! caution "there is an upper *fail limit* for safety reasons.
             The limit is a factor times the max node in your corpus.
             See `tf.parameters.SEARCH_FAIL_FACTOR`.
@@ -139,7 +145,6 @@ def search(
     api = app.api
     S = api.S
     N = api.N
-    sortKeyTuple = N.sortKeyTuple
 
     wasSilent = isSilent()
 
@@ -150,13 +155,18 @@ def search(
         for (name, s) in sets.items():
             passSets[name] = s
 
-    results = S.search(query, sets=passSets, shallow=shallow, limit=limit)
+    # With a limit and canonical sorting, we let the search engine
+    # deliver the results in canonical order, so that it can stop early.
+
+    topK = not shallow and sort is True and limit is not None and limit > 0
+
+    results = S.search(query, sets=passSets, shallow=shallow, limit=limit, sort=topK)
 
     if not shallow:
-        if not sort:
+        if not sort or topK:
             results = list(results)
         elif sort is True:
-            results = sorted(results, key=sortKeyTuple)
+            results = N.sortTuples(results)
         else:
             try:
                 sortedResults = sorted(results, key=sort)
@@ -189,14 +199,76 @@ def search(
     return results
 
 
-def runSearch(app, query, cache):
+def count(app, query, silent=SILENT_D, sets=None, byType=None):
+    """Counts the results of a search without collecting them.
+
+    This function calls `tf.search.search.Search.count` with a search template,
+    so the results are counted without constructing result tuples.
+    It then reports the number of results.
+
+    Parameters
+    ----------
+    query: dict
+        the search template (`tf.about.searchusage`)
+        whose results have to be counted.
+
+    silent: string, optional `tf.core.timestamp.SILENT_D`
+        See `tf.core.timestamp.Timestamp`
+
+    sets: dict, optional None
+        As in `tf.advanced.search.search`.
+        The sets of the app will be added to these sets.
+
+    byType: string, optional None
+        If given, the results are counted per node of this type that contains
+        the first node of the result, e.g. per `book` or per `chapter`.
+
+    Returns
+    -------
+    integer | dict | None
+        The number of results, or, if `byType` is given, a dict keyed by
+        nodes of that type with the number of results as values.
+        If the query has errors, `None` is returned.
+    """
+
+    warning = app.warning
+    isSilent = app.isSilent
+    setSilent = app.setSilent
+    S = app.api.S
+
+    wasSilent = isSilent()
+
+    silent = silentConvert(silent)
+
+    passSets = {**app.sets} if app.sets else {}
+    if sets:
+        for (name, s) in sets.items():
+            passSets[name] = s
+
+    counts = S.count(query, sets=passSets, byType=byType)
+
+    if counts is not None:
+        nResults = counts if byType is None else sum(counts.values())
+        plural = "" if nResults == 1 else "s"
+        setSilent(silent)
+        warning(f"{nResults} result{plural}")
+        setSilent(wasSilent)
+    return counts
+
+
+def runSearch(app, query, cache, timeout=None):
     """A wrapper around the generic search interface of TF.
 
-    Before running the TF search, the *query* will be looked up in the *cache*.
+    Before running the TF search, the *query* will be looked up in the *cache*,
+    which is typically the shared query cache `tf.search.cache.QueryCache`
+    of the search API, but it may also be a plain dictionary.
     If present, its cached results / error messages will be returned.
     If not, the query will be run, results / error messages collected, put in the *cache*,
     and returned.
 
+    If a `timeout` (in seconds) is given and the query takes longer,
+    a `tf.search.guard.SearchAborted` exception is raised, see `tf.search.guard`.
+
     !!! note "Context web app"
         The intended context of this function is: web app.
     """
@@ -204,17 +276,19 @@ def runSearch(app, query, cache):
     api = app.api
     S = api.S
     N = api.N
-    sortKeyTuple = N.sortKeyTuple
     plainSearch = S.search
 
-    cacheKey = (query, False)
-    if cacheKey in cache:
-        return cache[cacheKey]
+    cacheKey = QueryCache.key(query, kind="run", sets=app.sets)
+    cached = cache.get(cacheKey)
+    if cached is not None:
+        return cached
     options = dict(_msgCache=[])
     if app.sets is not None:
         options["sets"] = app.sets
-    (queryResults, status, messages, exe) = plainSearch(query, here=False, **options)
-    queryResults = tuple(sorted(queryResults, key=sortKeyTuple))
+    (queryResults, status, messages, exe) = plainSearch(
+        query, here=False, timeout=timeout, **options
+    )
+    queryResults = tuple(N.sortTuples(queryResults))
     nodeFeatures = ()
     edgeFeatures = set()
 
@@ -222,23 +296,128 @@ def runSearch(app, query, cache):
         (nodeFeatures, edgeFeatures) = getQueryFeatures(exe)
 
     (runStatus, runMessages) = wrapMessages(S._msgCache)
-    cache[cacheKey] = (
-        queryResults,
-        (status, runStatus),
-        (messages, runMessages),
-        nodeFeatures,
-        edgeFeatures,
-    )
-    return (
+    result = (
         queryResults,
         (status, runStatus),
         (messages, runMessages),
         nodeFeatures,
         edgeFeatures,
     )
+    _store(cache, cacheKey, result)
+    return result
+
+
+def runSearchCount(app, query, cache, timeout=None):
+    """Counts the results of a query, for paging through them.
+
+    If the complete results are in the *cache*, we count them.
+    Otherwise the query is studied and its results are counted without collecting
+    them, see `tf.search.search.Search.count`.
+    The studied search is kept in the *cache*, so that
+    `tf.advanced.search.runSearchPaged` can fetch its results without studying the
+    query again.
 
+    Queries with errors have 0 results.
+
+    !!! note "Context web app"
+        The intended context of this function is: web app.
+    """
 
-def runSearchCondensed(app, query, cache, condenseType):
+    runKey = QueryCache.key(query, kind="run", sets=app.sets)
+    if runKey in cache:
+        (queryResults, status) = runSearch(app, query, cache)[0:2]
+        return len(queryResults) if status[0] and status[1] else 0
+
+    return _pagedSearch(app, query, cache, 0, timeout)[2]
+
+
+def runSearchPaged(app, query, cache, need, timeout=None):
+    """A wrapper around the generic search interface of TF, for paged results.
+
+    Like `tf.advanced.search.runSearch`, but the results are only computed
+    up to result number `need`.
+    The results are computed in canonical order, so that they are the same as
+    the first results of `tf.advanced.search.runSearch`.
+    Use `tf.advanced.search.runSearchCount` to get the total number of results.
+
+    If the complete results are already in the *cache*, they will be used.
+    Otherwise, the *cache* keeps the studied search together with the longest
+    run of results fetched so far, and the pages are cut from that.
+    When more results are needed, they are fetched from the same studied search;
+    the query is not studied again.
+
+    !!! note "Context web app"
+        The intended context of this function is: web app.
+    """
+
+    runKey = QueryCache.key(query, kind="run", sets=app.sets)
+    if runKey in cache:
+        return runSearch(app, query, cache)
+
+    (exe, queryResults, total, status, messages, nodeFeatures, edgeFeatures) = (
+        _pagedSearch(app, query, cache, need, timeout)
+    )
+    return (queryResults[0:need], status, messages, nodeFeatures, edgeFeatures)
+
+
+def _pagedSearch(app, query, cache, need, timeout):
+    # Delivers the entry in the cache for paging through the results of a query,
+    # with at least need results, or all results if there are fewer.
+    # The entry has the studied search, so that more results can be fetched
+    # without studying the query again.
+    # When we have to fetch more results, we fetch at least twice as many as we had,
+    # so that paging to the end does not fetch the first results over and over.
+
+    S = app.api.S
+    pagedKey = QueryCache.key(query, kind="paged", sets=app.sets)
+    paged = cache.get(pagedKey)
+
+    if paged is None:
+        options = dict(_msgCache=[], here=False, sort=True)
+        if app.sets is not None:
+            options["sets"] = app.sets
+        (queryResults, status, messages, exe) = S.search(
+            query, limit=max(need, 1), timeout=timeout, **options
+        )
+        good = status and exe.good
+        total = exe.countOnly(study=False) if good else 0
+        nodeFeatures = ()
+        edgeFeatures = set()
+
+        if exe:
+            (nodeFeatures, edgeFeatures) = getQueryFeatures(exe)
+
+        (runStatus, runMessages) = wrapMessages(S._msgCache)
+        paged = (
+            exe if good else None,
+            queryResults if good else (),
+            total,
+            (status, runStatus),
+            (messages, runMessages),
+            nodeFeatures,
+            edgeFeatures,
+        )
+    else:
+        (exe, queryResults, total) = paged[0:3]
+        if len(queryResults) >= min(need, total):
+            return paged
+        exe.guard = Guard.make(timeout=timeout)
+        queryResults = exe.fetch(
+            limit=min(total, max(need, 2 * len(queryResults))), sort=True
+        )
+        paged = (exe, queryResults) + paged[2:]
+
+    (exe, queryResults) = paged[0:2]
+    size = sizeOf(queryResults)
+    if exe is not None:
+        size += exe.memory() + YARN_NODE_BYTES * sum(
+            len(yarn) for yarn in exe.yarns.values()
+        )
+    _store(cache, pagedKey, paged, size=size)
+    return paged
+
+
+def runSearchCondensed(app, query, cache, condenseType, timeout=None):
     """A wrapper around the generic search interface of TF.
 
     When query results need to be condensed into a container,
@@ -253,12 +432,21 @@ def runSearchCondensed(app, query, cache, condenseType):
     """
 
     api = app.api
-    cacheKey = (query, True, condenseType)
-    if cacheKey in cache:
-        return cache[cacheKey]
+    cacheKey = QueryCache.key(query, kind=("condensed", condenseType), sets=app.sets)
+    cached = cache.get(cacheKey)
+    if cached is not None:
+        return cached
     (queryResults, status, messages, nodeFeatures, edgeFeatures) = runSearch(
-        app, query, cache
+        app, query, cache, timeout=timeout
     )
     queryResults = condense(api, queryResults, condenseType, multiple=True)
-    cache[cacheKey] = (queryResults, status, messages, nodeFeatures, edgeFeatures)
-    return (queryResults, status, messages, nodeFeatures, edgeFeatures)
+    result = (queryResults, status, messages, nodeFeatures, edgeFeatures)
+    _store(cache, cacheKey, result)
+    return result
+
+
+def _store(cache, cacheKey, result, size=None):
+    if isinstance(cache, QueryCache):
+        cache.put(cacheKey, result, size=size)
+    else:
+        cache[cacheKey] = result
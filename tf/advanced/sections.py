@@ -26,9 +26,14 @@ without regard for how they are to be displayed.
 
 import types
 
+RANGE_SEP = "-"
+"""Separator between the start and the end of a range of sections."""
+
 
 def sectionsApi(app):
     app.nodeFromSectionStr = types.MethodType(nodeFromSectionStr, app)
+    app.nodeFromSectionStrMany = types.MethodType(nodeFromSectionStrMany, app)
+    app._sectionIndexes = {}
     app.sectionStrFromNode = types.MethodType(sectionStrFromNode, app)
     app.structureStrFromNode = types.MethodType(structureStrFromNode, app)
     app._sectionLink = types.MethodType(_sectionLink, app)
@@ -125,6 +130,167 @@ def nodeFromSectionStr(app, sectionStr, lang="en"):
     return sectionNode
 
 
+def nodeFromSectionStrMany(app, sectionStrs, lang="en"):
+    """Find the nodes of many section strings, including ranges of sections.
+
+    Compare `tf.advanced.sections.nodeFromSectionStr`.
+
+    The first time it is called for a language, an index is made from
+    the section strings of all sections to their nodes,
+    so that most section strings are resolved by a single lookup.
+    Strings that are not in the index, e.g. `Genesis 01:1`,
+    are handed over to `nodeFromSectionStr`.
+
+    Parameters
+    ----------
+    sectionStrs: iterable of string
+        The section strings, each as in `nodeFromSectionStr`, or a range:
+        two section strings of the same level separated by a `-`.
+        The end of a range may leave out the leading parts that it has in common
+        with the start of the range.
+
+        !!! hint "examples"
+            A few ranges:
+
+                Genesis 1:1-3:5
+
+                Genesis 1:1-5
+
+                Genesis 1-3
+
+                Genesis 50-Exodus 2
+
+    lang: string, optional en
+        The language assumed for the section parts,
+        as far as they are language dependent.
+        Must be a 2-letter language code.
+
+    Returns
+    -------
+    tuple
+        For each section string: the tuple of its section nodes,
+        in canonical order, or an error string.
+    """
+
+    index = app._sectionIndexes.get(lang, None)
+    if index is None:
+        index = _makeSectionIndex(app, lang)
+        app._sectionIndexes[lang] = index
+    nodeFromStr = index[0]
+
+    result = []
+    for sectionStr in sectionStrs:
+        node = nodeFromStr.get(sectionStr, None)
+        result.append(
+            (node,)
+            if node is not None
+            else _nodesFromSectionStr(app, index, sectionStr, lang)
+        )
+    return tuple(result)
+
+
+def _makeSectionIndex(app, lang):
+    # An index from the section strings of all sections to their nodes,
+    # and the position of every section node among the sections of its type
+
+    api = app.api
+    F = api.F
+    N = api.N
+    T = api.T
+    fOtype = F.otype.v
+    cData = api.C.sections.data
+
+    aContext = app.context
+    sep1 = aContext.sectionSep1
+    sep2 = aContext.sectionSep2
+
+    nodeFromStr = {}
+    order = {}
+    position = {}
+
+    sTypes = T.sectionTypes
+    if len(sTypes) == 0:
+        return (nodeFromStr, order, position)
+
+    sec0T = sTypes[0]
+    names = {
+        node: name
+        for (node, name) in T.nameFromNode[
+            "" if lang not in T.languages else lang
+        ].items()
+        if fOtype(node) == sec0T
+    }
+    for (node, name) in names.items():
+        nodeFromStr[str(name)] = node
+    for (sec0node, sec1nodes) in cData["sec1"].items():
+        name = names.get(sec0node, None)
+        if name is None:
+            continue
+        for (label, node) in sec1nodes.items():
+            nodeFromStr[f"{name}{sep1}{label}"] = node
+    for (sec0node, sec1s) in cData["sec2"].items():
+        name = names.get(sec0node, None)
+        if name is None:
+            continue
+        for (label1, sec2nodes) in sec1s.items():
+            for (label2, node) in sec2nodes.items():
+                nodeFromStr[f"{name}{sep1}{label1}{sep2}{label2}"] = node
+
+    for sType in sTypes:
+        nodes = tuple(N.sortNodes(F.otype.s(sType)))
+        order[sType] = nodes
+        for (i, node) in enumerate(nodes):
+            position[node] = i
+
+    return (nodeFromStr, order, position)
+
+
+def _nodesFromSectionStr(app, index, sectionStr, lang):
+    # The nodes of a section string or range that is not in the section index
+
+    (nodeFromStr, order, position) = index
+
+    def single(sStr):
+        node = nodeFromStr.get(sStr, None)
+        return node if node is not None else nodeFromSectionStr(app, sStr, lang=lang)
+
+    node = single(sectionStr)
+    if type(node) is int:
+        return (node,)
+
+    api = app.api
+    T = api.T
+    fOtype = api.F.otype.v
+
+    aContext = app.context
+    sep1 = aContext.sectionSep1
+    sep2 = aContext.sectionSep2
+    seps = ("", sep1, sep2)
+
+    i = sectionStr.find(RANGE_SEP)
+    while i >= 0:
+        start = single(sectionStr[0:i].strip())
+        if type(start) is int:
+            endStr = sectionStr[i + 1 :].strip()
+            startParts = T.sectionFromNode(start, lang=lang)
+            endParts = endStr.split(sep2)
+            if sep1 not in endStr and len(endParts) < len(startParts):
+                parts = startParts[0 : len(startParts) - len(endParts)] + tuple(
+                    endParts
+                )
+                endStr = "".join(f"{seps[j]}{part}" for (j, part) in enumerate(parts))
+            end = single(endStr)
+            if type(end) is not int:
+                return end
+            sType = fOtype(start)
+            if fOtype(end) != sType or position[start] > position[end]:
+                return f'Not a valid range: "{sectionStr}"'
+            return order[sType][position[start] : position[end] + 1]
+        i = sectionStr.find(RANGE_SEP, i + 1)
+
+    return node
+
+
 def sectionStrFromNode(app, n, lang="en", lastSlot=False, fillup=False, level=None):
     """The heading of a section to which a node belongs.
 
@@ -15,7 +15,12 @@ for a web server.
 from functools import reduce
 
 from ..advanced.highlight import getPassageHighlights
-from ..advanced.search import runSearch, runSearchCondensed
+from ..advanced.search import (
+    runSearch,
+    runSearchCondensed,
+    runSearchCount,
+    runSearchPaged,
+)
 from ..advanced.helpers import getRowsX
 from ..advanced.tables import compose, composeP, composeT
 from .servelib import batchAround
@@ -33,7 +38,7 @@ def makeTfKernel(app, appName):
     cache = TF.cache
 
     reset()
-    cache = {}
+    cache = app.api.S.cache
 
     class TfKernel:
         def __init__(self):
@@ -242,6 +247,9 @@ def makeTfKernel(app, appName):
             task: iterable
                 The list of things (sections or tuples) to retrieve the material for;
                 Typically coming from the *section pad* / *node pad* in the browser.
+                A line of the section pad may also be a range of sections,
+                see `tf.advanced.sections.nodeFromSectionStrMany`;
+                its sections are shown together in one row.
 
             features: string | iterable
                 The features that should be displayed in pretty displays when expanding
@@ -265,14 +273,12 @@ def makeTfKernel(app, appName):
                 results = []
                 messages = []
                 if task:
-                    lines = task.split("\n")
-                    for (i, line) in enumerate(lines):
-                        line = line.strip()
-                        node = app.nodeFromSectionStr(line)
-                        if type(node) is not int:
-                            messages.append(str(node))
+                    lines = [line.strip() for line in task.split("\n")]
+                    for (i, nodes) in enumerate(app.nodeFromSectionStrMany(lines)):
+                        if type(nodes) is not tuple:
+                            messages.append(str(nodes))
                         else:
-                            results.append((i + 1, (node,)))
+                            results.append((i + 1, nodes))
                 results = tuple(results)
                 messages = "\n".join(messages)
             elif kind == "tuples":
@@ -300,6 +306,7 @@ def makeTfKernel(app, appName):
             position=1,
             opened=set(),
             getx=None,
+            timeout=None,
             **options,
         ):
             """Executes a TF search template, retrieves formatted results.
@@ -334,6 +341,10 @@ def makeTfKernel(app, appName):
                 If given, only a single `sec2` (verse) will be fetched, but in pretty
                 display.
                 `getx` is the identifier (section label, verse number) of the item.
+
+            timeout: float, optional None
+                If given, the search will be aborted after so many seconds,
+                with a `tf.search.guard.SearchAborted` exception.
             """
 
             app = self.app
@@ -348,16 +359,29 @@ def makeTfKernel(app, appName):
             status = True
             messages = ("", "")
             if query:
-                (results, status, messages, nodeFeatures, edgeFeatures) = (
-                    runSearchCondensed(app, query, cache, condenseType)
-                    if condensed and condenseType
-                    else runSearch(app, query, cache)
-                )
-
-                status = status[0] and status[1]
-                if not status:
-                    results = ()
-                total += len(results)
+                if condensed and condenseType:
+                    (results, status, messages, nodeFeatures, edgeFeatures) = (
+                        runSearchCondensed(
+                            app, query, cache, condenseType, timeout=timeout
+                        )
+                    )
+                    status = status[0] and status[1]
+                    if not status:
+                        results = ()
+                    total += len(results)
+                else:
+                    # we only compute the results up to the ones we show
+
+                    total = runSearchCount(app, query, cache, timeout=timeout)
+                    (start, end) = batchAround(total, position, batch)
+                    need = max([end] + [n for n in opened if n <= total])
+                    (results, status, messages, nodeFeatures, edgeFeatures) = (
+                        runSearchPaged(app, query, cache, need, timeout=timeout)
+                    )
+                    status = status[0] and status[1]
+                    if not status:
+                        results = ()
+                        total = 0
 
             (start, end) = batchAround(total, position, batch)
 
@@ -365,7 +389,7 @@ def makeTfKernel(app, appName):
             opened = set(opened)
 
             before = {n for n in opened if n > 0 and n < start}
-            after = {n for n in opened if n > end and n <= len(results)}
+            after = {n for n in opened if n > end and n <= min(total, len(results))}
             beforeResults = tuple((n, results[n - 1]) for n in sorted(before))
             afterResults = tuple((n, results[n - 1]) for n in sorted(after))
 
@@ -389,11 +413,14 @@ def makeTfKernel(app, appName):
             )
             return (table, status, " ".join(messages), featureStr, start, total)
 
-        def csvs(self, query, tuples, sections, **options):
+        def csvs(self, query, tuples, sections, timeout=None, **options):
             """Gets query results etc. in plain CSV format.
 
             The query results, tuples, and sections are retrieved, as in
             `exposed_search`, but this function only needs some features per node.
+
+            If a `timeout` (in seconds) is given, the search will be aborted after
+            so many seconds, with a `tf.search.guard.SearchAborted` exception.
             """
 
             app = self.app
@@ -406,12 +433,10 @@ def makeTfKernel(app, appName):
             sectionResults = []
 
             if sections:
-                sectionLines = sections.split("\n")
-                for sectionLine in sectionLines:
-                    sectionLine = sectionLine.strip()
-                    node = app.nodeFromSectionStr(sectionLine)
-                    if type(node) is int:
-                        sectionResults.append((node,))
+                sectionLines = [line.strip() for line in sections.split("\n")]
+                for nodes in app.nodeFromSectionStrMany(sectionLines):
+                    if type(nodes) is tuple:
+                        sectionResults.append(nodes)
 
             sectionResults = tuple(sectionResults)
 
@@ -439,7 +464,7 @@ def makeTfKernel(app, appName):
                     queryMessages,
                     nodeFeatures,
                     edgeFeatures,
-                ) = runSearch(app, query, cache)
+                ) = runSearch(app, query, cache, timeout=timeout)
                 (
                     queryResultsC,
                     queryStatusC,
@@ -447,7 +472,9 @@ def makeTfKernel(app, appName):
                     nodeFeaturesC,
                     edgeFeaturesC,
                 ) = (
-                    runSearchCondensed(app, query, cache, condenseType)
+                    runSearchCondensed(
+                        app, query, cache, condenseType, timeout=timeout
+                    )
                     if queryStatus[0] and queryStatus[1] and condensed and condenseType
                     else (None, (False, False), ("", ""), None, None)
                 )
@@ -20,6 +20,7 @@ from ..core.files import writeJson
 from ..core.text import DEFAULT_FORMAT
 from ..advanced.helpers import RESULT
 from ..advanced.text import specialCharacters
+from ..search.guard import SearchAborted
 from .wrap import (
     pageLinks,
     passageLinks,
@@ -33,6 +34,35 @@ from .servelib import getAbout, getFormData, zipTables, BATCH
 
 
 TIMEOUT = 180
+"""Default and maximum number of seconds that a query may take.
+
+Clients may ask for a shorter timeout, but not for a longer one.
+"""
+
+
+def _timeout(form):
+    # the timeout that the client asks for, capped by TIMEOUT
+
+    timeout = form["timeout"]
+    return TIMEOUT if timeout is None else min(timeout, TIMEOUT)
+
+
+def _aborted(e, timeout):
+    # a message for a search that has been aborted, and whether it is wild,
+    # i.e. whether it would have exceeded any timeout that a client can ask for
+
+    reason = getattr(e, "reason", "timeout")
+    messages = (
+        (
+            f"Aborted because query takes longer than {timeout} second"
+            + ("" if timeout == 1 else "s")
+        )
+        if reason == "timeout"
+        else "Aborted because query has been cancelled"
+        if reason == "cancelled"
+        else "Aborted because query exceeds its memory budget"
+    )
+    return (messages, reason == "timeout" and timeout >= TIMEOUT)
 
 
 def serveTable(web, kind, getx=None, asDict=False):
@@ -95,6 +125,8 @@ def serveQuery(web, getx=None, asDict=False):
         {int(n) for n in form[openedKey].split(",")} if form[openedKey] else set()
     )
 
+    timeout = _timeout(form)
+
     pages = ""
     features = ""
 
@@ -105,7 +137,10 @@ def serveQuery(web, getx=None, asDict=False):
         messages = ""
         table = None
         status = True
-        if task in wildQueries:
+        if timeout <= 0:
+            messages = f"Invalid timeout: {timeout} seconds"
+            status = False
+        elif task in wildQueries:
             messages = (
                 f"Aborted because query is known to take longer than {TIMEOUT} second"
                 + ("" if TIMEOUT == 1 else "s")
@@ -132,15 +167,14 @@ def serveQuery(web, getx=None, asDict=False):
                     hiddenTypes=form["hiddenTypes"],
                     edgeFeatures=form["edgeFeatures"],
                     getx=int(getx) if getx else None,
+                    timeout=timeout,
                     **options,
                 )
-            except TimeoutError:
-                messages = (
-                    f"Aborted because query takes longer than {TIMEOUT} second"
-                    + ("" if TIMEOUT == 1 else "s")
-                )
+            except (TimeoutError, SearchAborted) as e:
+                (messages, wild) = _aborted(e, timeout)
                 console(f"{task}\n{messages}", error=True)
-                wildQueries.add(task)
+                if wild:
+                    wildQueries.add(task)
                 total = 0
                 status = False
 
@@ -294,17 +328,22 @@ def serveDownload(web, jobOnly):
     condensed = form["condensed"]
     condenseType = form["condenseType"] or None
     textFormat = form["textFormat"] or None
+    timeout = _timeout(form)
     csvs = None
     queryStatus = True
     tupleResultsX = None
     queryResultsX = None
     messages = ""
 
-    if task in wildQueries:
+    if timeout <= 0:
+        messages = f"Invalid timeout: {timeout} seconds"
+        return jsonify(messages=messages)
+    elif task in wildQueries:
         messages = (
             f"Aborted because query is known to take longer than {TIMEOUT} second"
             + ("" if TIMEOUT == 1 else "s")
         )
+        return jsonify(messages=messages)
     else:
         try:
             (
@@ -320,14 +359,13 @@ def serveDownload(web, jobOnly):
                 condensed=condensed,
                 condenseType=condenseType,
                 fmt=textFormat,
+                timeout=timeout,
             )
-        except TimeoutError:
-            queryStatus = False
-            messages = f"Aborted because query takes longer than {TIMEOUT} second" + (
-                "" if TIMEOUT == 1 else "s"
-            )
+        except (TimeoutError, SearchAborted) as e:
+            (messages, wild) = _aborted(e, timeout)
             console(f"{task}\n{messages}", error=True)
-            wildQueries.add(task)
+            if wild:
+                wildQueries.add(task)
             return jsonify(messages=messages)
 
     if not queryStatus:
@@ -102,6 +102,7 @@ def getFormData(interfaceDefaults):
     form["mode"] = request.form.get("mode", "") or "passage"
     form["position"] = getInt(request.form.get("position", ""), default=1)
     form["batch"] = getInt(request.form.get("batch", ""), default=BATCH)
+    form["timeout"] = getInt(request.form.get("timeout", ""), default=None)
     form["sec0"] = request.form.get("sec0", "")
     form["sec1"] = request.form.get("sec1", "")
     form["sec2"] = request.form.get("sec2", "")
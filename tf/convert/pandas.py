@@ -214,14 +214,19 @@ def exportPandas(app, inTypes=None, exportDir=None):
         s = 0
         perc = 0
 
-        for n in N.walk():
+        nodes = tuple(N.walk())
+        ups = {
+            upType: [(ms or NA)[0] for ms in L.uMany(nodes, otype=upType)]
+            for upType in set(sectionTypes) | set(inTypes)
+        }
+
+        for n in nodes:
             nType = F.otype.v(n)
             textValues = [pandasEsc(str(Fs(f).v(n) or "")) for f in textFeatures]
             sectionNodes = [
-                n if nType == section else (L.u(n, otype=section) or NA)[0]
-                for section in sectionTypes
+                n if nType == section else ups[section][i] for section in sectionTypes
             ]
-            inValues = [(L.u(n, otype=inType) or NA)[0] for inType in inTypes]
+            inValues = [ups[inType][i] for inType in inTypes]
             edgeValues = [pandasEsc(str((Es(f).f(n) or NA)[0])) for f in edgeFeatures]
             nodeValues = [
                 pandasEsc(
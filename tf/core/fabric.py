@@ -51,6 +51,7 @@ from .prepare import (
     characters,
     sections,
     structure,
+    stats,
 )
 from .computed import Computed
 from .nodefeature import NodeFeature
@@ -84,6 +85,7 @@ PRECOMPUTE = (
     (0, "__levDown__", levDown, (OTYPE, "__levUp__", "__rank__")),
     (1, "__characters__", characters, (OTEXT,)),
     (0, "__boundary__", boundary, (OTYPE, OSLOTS) + ("__rank__",)),
+    (0, "__stats__", stats, (OTYPE, OSLOTS) + ("__levUp__", "__boundary__")),
     (
         2,
         "__sections__",
@@ -2,9 +2,23 @@
 # Local navigation between nodes.
 """
 
+from array import array
+from bisect import bisect_left, bisect_right
+
+from ..parameters import LOCALITY_INDEX_THRESHOLD
 
 SET_TYPES = {set, frozenset}
 
+START = 0
+END = 1
+WITHIN = 2
+
+
+def _sized(nodes):
+    # nodes as a collection with a length, if they are not already
+
+    return nodes if hasattr(nodes, "__len__") else tuple(nodes)
+
 
 class Locality:
     """Methods by which you can navigate from a node to its neighbourhood.
@@ -43,10 +57,35 @@ class Locality:
 
         *   `L.d(verseNode)` will contain `sentenceNode`,
         *   `L.d(sentenceNode)` will contain `verseNode`.
+
+    !!! hint "Speed of `L.u` and `L.d` for a single node type"
+        When `L.u` or `L.d` are called often with the same single node type,
+        e.g. `L.u(w, otype="verse")` for every word,
+        an index for that type is built: for every node the embedders
+        (or embeddees) of that type, in one array.
+        From then on, such calls are slices of that array,
+        instead of a scan over all embedders (or embeddees) of the node.
+        The index is built after `tf.parameters.LOCALITY_INDEX_THRESHOLD` calls,
+        so that occasional calls do not pay for it.
+
+        The methods `L.uMany`, `L.dMany`, `L.pMany` and `L.nMany` do the same
+        as `L.u` etc. for a whole batch of nodes at once;
+        every node in the batch counts as a call.
+
+        `L.i` uses an index of the nodes of each type by the first and last slot
+        of their extent, so that it does not have to visit all the slots of big
+        nodes such as books and chapters.
+
+        The same index serves `L.pk`, `L.nk` and `L.window`, which give the nodes
+        that end or start within a number of slots before or after a node,
+        so that they only visit the nodes that they deliver.
       """
 
     def __init__(self, api):
         self.api = api
+        self.typeIndexes = {}
+        self.typeUses = {}
+        self.intervalIndexes = {}
 
     def i(self, n, otype=None):
         """Produces an ordered tuple of *intersecting* nodes
@@ -92,17 +131,49 @@ class Locality:
             otype = set(otype)
 
         slotType = Fotype.slotType
-        fOtype = Fotype.v
         levUp = api.C.levUp.data
-        Eoslots = api.E.oslots
+        eoslots = api.E.oslots.data
+
+        slots = eoslots[n - maxSlot - 1]
+        first = slots[0]
+        last = slots[-1]
+        slotSet = None if last - first + 1 == len(slots) else set(slots)
+
+        def intersects(m):
+            mSlots = eoslots[m - maxSlot - 1]
+            if slotSet is None:
+                return any(first <= s <= last for s in mSlots)
+            return any(s in slotSet for s in mSlots)
 
-        slots = Eoslots.s(n)
         result = set()
-        for slot in slots:
-            result |= {m for m in levUp[slot - 1] if fOtype(m) in otype}
-            if slotType in otype:
-                result.add(slot)
-        return sortNodes(result - {n})
+        for tp in otype:
+            if tp == slotType:
+                result.update(slots)
+                continue
+            index = self._intervalIndex(tp)
+            if index is None:
+                continue
+            (tFirst, tLast, starts, byStart, gapCover, ends, byEnd) = index
+
+            # nodes that contain the first slot of n
+
+            result.update(m for m in levUp[first - 1] if tFirst <= m <= tLast)
+
+            # nodes that start within the extent of n
+
+            lo = bisect_left(starts, first)
+            hi = bisect_right(starts, last)
+            if slotSet is None:
+                result.update(byStart[lo:hi])
+            else:
+                result.update(m for m in byStart[lo:hi] if intersects(m))
+
+            # nodes that start before n and have a gap at the first slot of n
+
+            result.update(m for m in gapCover.get(first, ()) if intersects(m))
+
+        result.discard(n)
+        return sortNodes(result)
 
     def u(self, n, otype=None):
         """Produces an ordered tuple of *upward* nodes.
@@ -144,6 +215,10 @@ class Locality:
         if otype is None:
             return tuple(levUp[n - 1])
         elif type(otype) is str:
+            index = self._typeIndex(levUp, otype)
+            if index is not None:
+                (offsets, members) = index
+                return tuple(members[offsets[n - 1] : offsets[n]])
             return tuple(m for m in levUp[n - 1] if fOtype(m) == otype)
         else:
             if type(otype) not in SET_TYPES:
@@ -196,8 +271,15 @@ class Locality:
                 )
             )
         elif otype == slotType:
-            return tuple(sorted(Eoslots.s(n), key=lambda m: Crank[m - 1]))
+            # the slots of a node are stored in ascending order,
+            # which is their canonical order
+            return tuple(Eoslots.s(n))
         elif type(otype) is str:
+            index = self._typeIndex(levDown, otype)
+            if index is not None:
+                (offsets, members) = index
+                m = n - maxSlot
+                return tuple(members[offsets[m - 1] : offsets[m]])
             return tuple(m for m in levDown[n - maxSlot - 1] if fOtype(m) == otype)
         else:
             if type(otype) not in SET_TYPES:
@@ -310,3 +392,426 @@ class Locality:
             if type(otype) not in SET_TYPES:
                 otype = set(otype)
             return tuple(m for m in result if fOtype(m) in otype)
+
+    def pk(self, n, k, otype=None):
+        """Produces an ordered tuple of nodes that end at most `k` slots before a node.
+
+        A generalization of `Locality.p`: where `L.p(n)` gives the nodes whose
+        last slot is the slot just before the first slot of `n`,
+        `L.pk(n, k)` gives the nodes whose last slot is one of the `k` slots
+        before the first slot of `n`.
+
+        Parameters
+        ----------
+
+        node: integer
+            The node whose preceding nodes will be delivered.
+        k: integer
+            The number of slots before `node` in which the nodes should end.
+        otype: string or set of strings
+            See `Locality`.
+
+        Returns
+        -------
+        tuple of integer
+            The tuple nodes is sorted in the canonical order (`tf.core.nodes`),
+            not reversed as in `Locality.p`.
+        """
+
+        extent = self._extent(n)
+        if extent is None or k <= 0:
+            return ()
+        first = extent[0]
+        return self._slotWindow(first - k, first - 1, otype, END)
+
+    def nk(self, n, k, otype=None):
+        """Produces an ordered tuple of nodes that start at most `k` slots after a node.
+
+        A generalization of `Locality.n`: where `L.n(n)` gives the nodes whose
+        first slot is the slot just after the last slot of `n`,
+        `L.nk(n, k)` gives the nodes whose first slot is one of the `k` slots
+        after the last slot of `n`.
+
+        Parameters
+        ----------
+
+        node: integer
+            The node whose following nodes will be delivered.
+        k: integer
+            The number of slots after `node` in which the nodes should start.
+        otype: string or set of strings
+            See `Locality`.
+
+        Returns
+        -------
+        tuple of integer
+            The tuple nodes is sorted in the canonical order (`tf.core.nodes`).
+        """
+
+        extent = self._extent(n)
+        if extent is None or k <= 0:
+            return ()
+        last = extent[1]
+        return self._slotWindow(last + 1, last + k, otype, START)
+
+    def window(self, n, before, after, otype=None):
+        """Produces an ordered tuple of nodes in a window of slots around a node.
+
+        The window runs from `before` slots before the first slot of `n`
+        till `after` slots after the last slot of `n`.
+        The nodes in the window are the nodes whose first and last slots
+        are both in the window, including `n` itself.
+
+        Parameters
+        ----------
+
+        node: integer
+            The node around which the window is taken.
+        before: integer
+            The number of slots in the window before `node`.
+        after: integer
+            The number of slots in the window after `node`.
+        otype: string or set of strings
+            See `Locality`.
+
+        Returns
+        -------
+        tuple of integer
+            The tuple nodes is sorted in the canonical order (`tf.core.nodes`).
+        """
+
+        extent = self._extent(n)
+        if extent is None:
+            return ()
+        (first, last) = extent
+        return self._slotWindow(
+            first - max(before, 0), last + max(after, 0), otype, WITHIN
+        )
+
+    def _extent(self, n):
+        # The first and last slot of a node, or None if it is not a node
+
+        Fotype = self.api.F.otype
+        maxSlot = Fotype.maxSlot
+        if n <= 0 or n > Fotype.maxNode:
+            return None
+        if n <= maxSlot:
+            return (n, n)
+        slots = self.api.E.oslots.data[n - maxSlot - 1]
+        return (slots[0], slots[-1])
+
+    def _slotWindow(self, lo, hi, otype, mode):
+        # The nodes that start (mode START), end (mode END), or start and end
+        # (mode WITHIN) in the slots lo through hi, in canonical order.
+        # Without otype we use the boundary data, otherwise the interval index
+        # of each type.
+
+        api = self.api
+        Fotype = api.F.otype
+        maxSlot = Fotype.maxSlot
+        slotType = Fotype.slotType
+        eoslots = api.E.oslots.data
+        lo = max(lo, 1)
+        hi = min(hi, maxSlot)
+        if lo > hi:
+            return ()
+
+        def endsInWindow(m):
+            return m <= maxSlot or eoslots[m - maxSlot - 1][-1] <= hi
+
+        result = []
+        if otype is None:
+            (firstNode, lastNode) = api.C.boundary.data
+            for s in range(lo, hi + 1):
+                if mode == END:
+                    result.extend(lastNode[s - 1])
+                elif mode == START:
+                    result.extend(firstNode[s - 1])
+                else:
+                    result.extend(m for m in firstNode[s - 1] if endsInWindow(m))
+                result.append(s)
+            return tuple(api.N.sortNodes(result))
+
+        if type(otype) is str:
+            otype = {otype}
+        elif type(otype) not in SET_TYPES:
+            otype = set(otype)
+
+        for tp in otype:
+            if tp == slotType:
+                result.extend(range(lo, hi + 1))
+                continue
+            index = self._intervalIndex(tp)
+            if index is None:
+                continue
+            (tFirst, tLast, starts, byStart, gapCover, ends, byEnd) = index
+            if mode == END:
+                result.extend(byEnd[bisect_left(ends, lo) : bisect_right(ends, hi)])
+            else:
+                nodes = byStart[bisect_left(starts, lo) : bisect_right(starts, hi)]
+                result.extend(
+                    nodes if mode == START else (m for m in nodes if endsInWindow(m))
+                )
+        return tuple(api.N.sortNodes(result))
+
+    def uMany(self, nodes, otype=None):
+        """Produces the *upward* nodes of many nodes.
+
+        The same as `[L.u(n, otype=otype) for n in nodes]`, but faster,
+        especially if `otype` is a single node type.
+
+        Parameters
+        ----------
+
+        nodes: iterable of integer
+            The nodes whose embedders will be delivered.
+        otype: string or set of strings
+            See `Locality`.
+
+        Returns
+        -------
+        tuple of tuple of integer
+            For each node in `nodes`, in the same order, its embedders,
+            as delivered by `Locality.u`.
+        """
+
+        Fotype = self.api.F.otype
+        maxNode = Fotype.maxNode
+        levUp = self.api.C.levUp.data
+
+        if type(otype) is str:
+            nodes = _sized(nodes)
+            index = self._typeIndex(levUp, otype, uses=len(nodes))
+            if index is not None:
+                (offsets, members) = index
+                return tuple(
+                    tuple(members[offsets[n - 1] : offsets[n]])
+                    if 0 < n <= maxNode
+                    else ()
+                    for n in nodes
+                )
+
+        test = self._typeTest(otype)
+        return tuple(
+            ()
+            if n <= 0 or n > maxNode
+            else tuple(levUp[n - 1])
+            if test is None
+            else tuple(m for m in levUp[n - 1] if test(m))
+            for n in nodes
+        )
+
+    def dMany(self, nodes, otype=None):
+        """Produces the *downward* nodes of many nodes.
+
+        The same as `[L.d(n, otype=otype) for n in nodes]`, but faster
+        if `otype` is a single node type.
+
+        Parameters
+        ----------
+
+        nodes: iterable of integer
+            The nodes whose embeddees will be delivered.
+        otype: string or set of strings
+            See `Locality`.
+
+        Returns
+        -------
+        tuple of tuple of integer
+            For each node in `nodes`, in the same order, its embeddees,
+            as delivered by `Locality.d`.
+        """
+
+        d = self.d
+        if type(otype) is not str:
+            return tuple(d(n, otype=otype) for n in nodes)
+
+        Fotype = self.api.F.otype
+        maxSlot = Fotype.maxSlot
+        maxNode = Fotype.maxNode
+
+        if otype == Fotype.slotType:
+            eoslots = self.api.E.oslots.data
+            return tuple(
+                tuple(eoslots[n - maxSlot - 1]) if maxSlot < n <= maxNode else ()
+                for n in nodes
+            )
+
+        nodes = _sized(nodes)
+        levDown = self.api.C.levDown.data
+        index = self._typeIndex(levDown, otype, uses=len(nodes))
+        if index is None:
+            return tuple(d(n, otype=otype) for n in nodes)
+        (offsets, members) = index
+        return tuple(
+            tuple(members[offsets[n - maxSlot - 1] : offsets[n - maxSlot]])
+            if maxSlot < n <= maxNode
+            else ()
+            for n in nodes
+        )
+
+    def pMany(self, nodes, otype=None):
+        """Produces the *previous* nodes of many nodes.
+
+        The same as `[L.p(n, otype=otype) for n in nodes]`, but faster.
+
+        Parameters
+        ----------
+
+        nodes: iterable of integer
+            The nodes whose previous nodes will be delivered.
+        otype: string or set of strings
+            See `Locality`.
+
+        Returns
+        -------
+        tuple of tuple of integer
+            For each node in `nodes`, in the same order, its previous nodes,
+            as delivered by `Locality.p`.
+        """
+
+        return self._adjacentMany(nodes, otype, True)
+
+    def nMany(self, nodes, otype=None):
+        """Produces the *next* nodes of many nodes.
+
+        The same as `[L.n(n, otype=otype) for n in nodes]`, but faster.
+
+        Parameters
+        ----------
+
+        nodes: iterable of integer
+            The nodes whose next nodes will be delivered.
+        otype: string or set of strings
+            See `Locality`.
+
+        Returns
+        -------
+        tuple of tuple of integer
+            For each node in `nodes`, in the same order, its next nodes,
+            as delivered by `Locality.n`.
+        """
+
+        return self._adjacentMany(nodes, otype, False)
+
+    def _adjacentMany(self, nodes, otype, previous):
+        # The previous or next nodes of many nodes, see pMany and nMany.
+
+        Fotype = self.api.F.otype
+        maxSlot = Fotype.maxSlot
+        maxNode = Fotype.maxNode
+        eoslots = self.api.E.oslots.data
+        (firstNode, lastNode) = self.api.C.boundary.data
+        test = self._typeTest(otype)
+
+        result = []
+        for n in nodes:
+            if n <= 0 or n > maxNode:
+                result.append(())
+                continue
+            if previous:
+                adj = n - 1 if n <= maxSlot else eoslots[n - maxSlot - 1][0] - 1
+                if adj <= 0:
+                    result.append(())
+                    continue
+                ms = tuple(lastNode[adj - 1]) + (adj,)
+            else:
+                adj = n + 1 if n <= maxSlot else eoslots[n - maxSlot - 1][-1] + 1
+                if adj > maxSlot:
+                    result.append(())
+                    continue
+                ms = (adj,) + tuple(firstNode[adj - 1])
+            result.append(ms if test is None else tuple(m for m in ms if test(m)))
+        return tuple(result)
+
+    def _typeTest(self, otype):
+        # A function that tells whether a node has one of the types in otype,
+        # or None if otype does not restrict the types.
+
+        if otype is None:
+            return None
+        Fotype = self.api.F.otype
+        if type(otype) is str:
+            interval = Fotype.sInterval(otype)
+            if not interval:
+                return lambda m: False
+            (first, last) = interval
+            return lambda m: first <= m <= last
+        fOtype = Fotype.v
+        if type(otype) not in SET_TYPES:
+            otype = set(otype)
+        return lambda m: fOtype(m) in otype
+
+    def _typeIndex(self, lev, otype, uses=1):
+        # The embedders (lev is levUp) or embeddees (lev is levDown) of a single
+        # node type, as offsets into an array of members, one entry per node.
+        # Returns None as long as the type has been asked for too few times;
+        # uses is the number of nodes that are being asked for.
+
+        key = (id(lev), otype)
+        index = self.typeIndexes.get(key, None)
+        if index is not None and index[0] is lev:
+            return index[1]
+
+        uses += self.typeUses.get(key, 0)
+        self.typeUses[key] = uses
+        if uses < LOCALITY_INDEX_THRESHOLD:
+            return None
+
+        interval = self.api.F.otype.sInterval(otype)
+        offsets = array("I", [0])
+        members = array("I")
+        if interval:
+            (first, last) = interval
+            for ms in lev:
+                members.extend(m for m in ms if first <= m <= last)
+                offsets.append(len(members))
+        else:
+            offsets.extend(0 for ms in lev)
+        index = (offsets, members)
+        self.typeIndexes[key] = (lev, index)
+        return index
+
+    def _intervalIndex(self, otype):
+        # The nodes of a non-slot type, by the extent of their slots:
+        # the start slots in ascending order, the nodes in that order,
+        # for each slot the nodes whose extent spans that slot without
+        # containing it, and the end slots in ascending order,
+        # with the nodes in that order.
+        # Returns None if there is no such type.
+
+        eoslots = self.api.E.oslots.data
+        index = self.intervalIndexes.get(otype, None)
+        if index is not None and index[0] is eoslots:
+            return index[1]
+
+        Fotype = self.api.F.otype
+        maxSlot = Fotype.maxSlot
+        interval = Fotype.sInterval(otype)
+        if not interval or otype == Fotype.slotType:
+            return None
+
+        (tFirst, tLast) = interval
+        extents = []
+        endExtents = []
+        gapCover = {}
+        for m in range(tFirst, tLast + 1):
+            slots = eoslots[m - maxSlot - 1]
+            start = slots[0]
+            end = slots[-1]
+            extents.append((start, m))
+            endExtents.append((end, m))
+            if end - start + 1 != len(slots):
+                slotSet = set(slots)
+                for s in range(start + 1, end):
+                    if s not in slotSet:
+                        gapCover.setdefault(s, []).append(m)
+        extents.sort()
+        starts = array("I", (start for (start, m) in extents))
+        byStart = array("I", (m for (start, m) in extents))
+        endExtents.sort()
+        ends = array("I", (end for (end, m) in endExtents))
+        byEnd = array("I", (m for (end, m) in endExtents))
+        index = (tFirst, tLast, starts, byStart, gapCover, ends, byEnd)
+        self.intervalIndexes[otype] = (eoslots, index)
+        return index
@@ -57,6 +57,10 @@ post-order. It is very much like SAX parsing in the XML world.
 """
 
 import functools
+import sys
+from array import array
+
+from ..parameters import SORT_ORDER_FRACTION
 
 
 class Nodes:
@@ -65,6 +69,12 @@ class Nodes:
         C = api.C
         Crank = C.rank.data
 
+        # the ranks indexed by node, so that we can use its __getitem__ as sort key
+        rank = array("I", [0])
+        rank.extend(Crank)
+        self.rank = rank
+        rankOf = rank.__getitem__
+
         self.otypeRank = {d[0]: i for (i, d) in enumerate(reversed(C.levels.data))}
         """Dictionary that provides a ranking of the node types.
 
@@ -75,7 +85,7 @@ class Nodes:
         and the more comprehensive a type is, the higher its rank.
         """
 
-        self.sortKey = lambda n: Crank[n - 1]
+        self.sortKey = rankOf
         """Sort key function for the canonical ordering between nodes.
 
 
@@ -89,7 +99,7 @@ class Nodes:
         tf.core.nodes.Nodes.sortNodes: sorting nodes
         """
 
-        self.sortKeyTuple = lambda tup: tuple(Crank[n - 1] for n in tup)
+        self.sortKeyTuple = lambda tup: tuple(map(rankOf, tup))
         """Sort key function for the canonical ordering between tuples of nodes.
         It applies `sortKey` to each member of the tuple.
         Handy to sort search results. We can sort them in canonical order like this:
@@ -198,13 +208,18 @@ class Nodes:
             functools.cmp_to_key(beforeLength),
         )
 
-    def sortNodes(self, nodeSet):
+    def sortNodes(self, nodeSet, fast=False):
         """Delivers a tuple of nodes sorted by the *canonical ordering*.
 
         Parameters
         ----------
         nodeSet: iterable
             An iterable of nodes to be sorted.
+        fast: boolean, optional False
+            If `True` and there are many nodes, they are not sorted,
+            but picked from the list of all nodes in canonical order,
+            which takes time proportional to the number of nodes in the corpus.
+            See `tf.parameters.SORT_ORDER_FRACTION`.
 
         Returns
         -------
@@ -216,12 +231,83 @@ class Nodes:
         tf.core.nodes: canonical ordering
         """
 
-        api = self.api
+        if fast:
+            api = self.api
+            nodes = nodeSet if hasattr(nodeSet, "__len__") else tuple(nodeSet)
+            if len(nodes) * SORT_ORDER_FRACTION > api.F.otype.maxNode:
+                members = nodes if type(nodes) in {set, frozenset} else set(nodes)
+                if len(members) == len(nodes):
+                    return [n for n in api.C.order.data if n in members]
+            nodeSet = nodes
+
+        return sorted(nodeSet, key=self.sortKey)
+
+    def sortTuples(self, tuples):
+        """Delivers tuples of nodes sorted by the *canonical ordering*.
+
+        The same as `sorted(tuples, key=N.sortKeyTuple)`, but faster and with less
+        memory if the tuples have the same length, such as search results:
+        the ranks of the nodes in a tuple are packed into a single integer,
+        which is used as sort key.
+
+        Parameters
+        ----------
+        tuples: iterable
+            An iterable of tuples of nodes to be sorted.
+
+        Returns
+        -------
+        list
+            The sorted tuples as list
+
+        See Also
+        --------
+        tf.core.nodes: canonical ordering
+        """
+
+        tuples = list(tuples)
+        if not tuples:
+            return tuples
+
+        width = len(tuples[0])
+        if any(len(tup) != width for tup in tuples):
+            return sorted(tuples, key=self.sortKeyTuple)
+
+        rankOf = self.rank.__getitem__
+        shift = 32
+        shift2 = 2 * shift
+
+        if width == 1:
+
+            def key(tup):
+                return rankOf(tup[0])
+
+        elif width == 2:
+
+            def key(tup):
+                return (rankOf(tup[0]) << shift) | rankOf(tup[1])
+
+        elif width == 3:
+
+            def key(tup):
+                return (
+                    (rankOf(tup[0]) << shift2)
+                    | (rankOf(tup[1]) << shift)
+                    | rankOf(tup[2])
+                )
+
+        else:
+            bigEndian = sys.byteorder == "big"
+            fromBytes = int.from_bytes
+            byteOrder = sys.byteorder
 
-        Crank = api.C.rank.data
-        return sorted(nodeSet, key=lambda n: Crank[n - 1])
+            def key(tup):
+                ranks = array("I", map(rankOf, tup if bigEndian else reversed(tup)))
+                return fromBytes(ranks.tobytes(), byteOrder)
 
-    def walk(self, nodes=None, events=False):
+        return sorted(tuples, key=key)
+
+    def walk(self, nodes=None, events=False, start=None, end=None):
         """Generates all nodes in the *canonical order*.
         (`tf.core.nodes`)
 
@@ -252,6 +338,9 @@ class Nodes:
             Under `tf.core.nodefeature.NodeFeatures` there is another convenient way
             to walk through subsets of nodes.
 
+            If you need the nodes of a stretch of slots, such as a single book,
+            use `Nodes.walkRange`.
+
         Parameters
         ----------
         nodes: iterable of integer, optional None
@@ -259,6 +348,13 @@ class Nodes:
             Otherwise, walks through the given nodes in canonical order.
         events: boolean, optional False
             If True, wraps the generated nodes in event tuples as described above.
+        start: integer, optional None
+            If passed, the walk starts at this node: nodes that come before it
+            in the canonical order are skipped.
+            This is handy to resume a walk after the last node that you have seen.
+        end: integer, optional None
+            If passed, the walk stops at this node: nodes that come after it
+            in the canonical order are skipped.
 
         Returns
         -------
@@ -268,29 +364,107 @@ class Nodes:
 
         api = self.api
         C = api.C
+        Crank = C.rank.data
+        bounded = start is not None or end is not None
+        lo = 0 if start is None else Crank[start - 1]
+        hi = len(Crank) if end is None else Crank[end - 1] + 1
 
         if nodes is None:
             walkNodes = C.order.data
+            if bounded:
+                walkNodes = walkNodes[lo:hi]
         else:
             walkNodes = self.sortNodes(nodes)
             walkNodeSet = set(nodes)
+            if bounded:
+                rankOf = self.rank.__getitem__
+                walkNodes = [n for n in walkNodes if lo <= rankOf(n) < hi]
 
         if events:
-            endSlots = C.boundary.data[1]
+            yield from self._events(walkNodes, None if nodes is None else walkNodeSet)
+        else:
+            yield from walkNodes
+
+    def walkRange(self, firstSlot, lastSlot, events=False):
+        """Generates the nodes that overlap with a range of slots, in canonical order.
+
+        The same as `N.walk(nodes)` where `nodes` are the slots from `firstSlot` till
+        `lastSlot` and all nodes that have slots in common with them,
+        but without walking through the rest of the corpus.
+
+        The nodes that start within the range are a contiguous stretch
+        of the canonical order, which is located by means of `C.rank` and
+        `C.boundary`. They are preceded by the nodes that start before the range
+        and have slots in it.
+
+        Parameters
+        ----------
+        firstSlot: integer
+            The first slot of the range.
+        lastSlot: integer
+            The last slot of the range.
+        events: boolean, optional False
+            If True, wraps the generated nodes in event tuples as in `Nodes.walk`.
+            Nodes that end after `lastSlot` get no end event.
+
+        Returns
+        -------
+        nodes: integer
+            One at a time.
+        """
+
+        api = self.api
+        C = api.C
+        Fotype = api.F.otype
+        maxSlot = Fotype.maxSlot
+        firstSlot = max(firstSlot, 1)
+        lastSlot = min(lastSlot, maxSlot)
+        if firstSlot > lastSlot:
+            return
+
+        Crank = C.rank.data
+        firstNode = C.boundary.data[0]
+        eoslots = api.E.oslots.data
+
+        # the nodes that start before the range and have slots in it
 
-            otype = api.F.otype
-            Fotypev = otype.v
-            slotType = otype.slotType
+        starting = set(firstNode[firstSlot - 1])
+        before = {m for m in C.levUp.data[firstSlot - 1] if m not in starting}
+        L = api.L
+        for otype in Fotype.all:
+            index = L._intervalIndex(otype)
+            if index is None:
+                continue
+            for m in index[4].get(firstSlot, ()):
+                if any(firstSlot <= s <= lastSlot for s in eoslots[m - maxSlot - 1]):
+                    before.add(m)
 
-            for n in walkNodes:
-                if Fotypev(n) == slotType:
-                    yield (n, None)
-                    for m in reversed(endSlots[n - 1]):
-                        if nodes is None or m in walkNodeSet:
-                            yield (m, True)
-                else:
-                    yield (n, False)
+        # the nodes that start in the range
 
+        lo = Crank[firstSlot - 1] - len(starting)
+        hi = Crank[lastSlot - 1] + 1
+        walkNodes = self.sortNodes(before) + list(C.order.data[lo:hi])
+
+        if events:
+            yield from self._events(walkNodes, None)
         else:
-            for n in walkNodes:
-                yield n
+            yield from walkNodes
+
+    def _events(self, walkNodes, walkNodeSet):
+        # The start and end events of walking through nodes, see walk
+
+        api = self.api
+        endSlots = api.C.boundary.data[1]
+
+        otype = api.F.otype
+        Fotypev = otype.v
+        slotType = otype.slotType
+
+        for n in walkNodes:
+            if Fotypev(n) == slotType:
+                yield (n, None)
+                for m in reversed(endSlots[n - 1]):
+                    if walkNodeSet is None or m in walkNodeSet:
+                        yield (m, True)
+            else:
+                yield (n, False)
@@ -13,6 +13,7 @@ The functions in this module implement those tasks.
 
 import collections
 import functools
+import itertools
 import array
 
 from .helpers import itemize
@@ -565,6 +566,9 @@ def sections(info, error, otype, oslots, otext, levUp, levDown, levels, *sFeats)
             Mapping from tuples of section sequence numbers to tuples of nodes.
             Only if there are precisely 3 section levels, otherwise this is an
             empty dictionary.
+        *   `slotSec`:
+            For each section level, the section node of each slot,
+            see `sectionSlots`.
 
     Warnings
     --------
@@ -680,7 +684,54 @@ def sections(info, error, otype, oslots, otext, levUp, levDown, levels, *sFeats)
                     seqFromNode[n2] = (c0, c1, c2)
                     nodeFromSeq[(c0, c1, c2)] = n2
 
-    return dict(sec1=sec1, sec2=sec2, seqFromNode=seqFromNode, nodeFromSeq=nodeFromSeq)
+    slotSec = sectionSlots(maxSlot, levUp, support, sTypes)
+
+    return dict(
+        sec1=sec1,
+        sec2=sec2,
+        seqFromNode=seqFromNode,
+        nodeFromSeq=nodeFromSeq,
+        slotSec=slotSec,
+    )
+
+
+def sectionSlots(maxSlot, levUp, support, sTypes):
+    """Computes the section nodes of all slots.
+
+    Parameters
+    ----------
+    maxSlot: integer
+        The last slot.
+    levUp: tuple
+        The data of the `levUp` pre-computation step.
+    support: dict
+        The first and last node of each node type.
+    sTypes: iterable
+        The section types.
+
+    Returns
+    -------
+    tuple of array
+        For each section level an array with for every slot `s`
+        at index `s - 1` the section node of that level that contains `s`,
+        or `0` if there is no such section node.
+        If several section nodes of a level contain `s`, it is the one that comes
+        first in `levUp`, just as with `L.u(s, otype=sectionType)[0]`.
+    """
+
+    slotSec = []
+    for sType in sTypes:
+        secs = array.array("I", [0]) * maxSlot
+        interval = support.get(sType, None)
+        if interval is not None:
+            (first, last) = interval
+            for s in range(maxSlot):
+                for x in levUp[s]:
+                    if first <= x <= last:
+                        secs[s] = x
+                        break
+        slotSec.append(secs)
+    return tuple(slotSec)
 
 
 def structure(info, error, otype, oslots, otext, rank, levUp, *sFeats):
@@ -821,3 +872,164 @@ def structure(info, error, otype, oslots, otext, rank, levUp, *sFeats):
     down = {n: tuple(sorted(ms, key=lambda m: rank[m - 1])) for (n, ms) in down.items()}
 
     return (headingFromNode, nodeFromHeading, multiple, top, up, down)
+
+
+def stats(info, error, otype, oslots, levUp, boundary):
+    """Computes statistics for the search planner.
+
+    The search engine has to estimate how many nodes are reachable from a node
+    via a relation (the *spread* of that relation).
+    For the basic relations between nodes in terms of their slots we can compute
+    those spreads once and for all, per pair of node types.
+
+    Parameters
+    ----------
+    info: function
+        Method to write informational messages to the console.
+    error: function
+        Method to write error messages to the console.
+    otype: iterable
+        The data of the `otype` feature.
+    oslots: iterable
+        The data of the `oslots` feature.
+    levUp: tuple
+        The data of the `levUp` pre-computation step.
+    boundary: tuple
+        The data of the `boundary` pre-computation step.
+
+    Returns
+    -------
+    dict
+        We have the following items:
+
+        *   `typeCount`:
+            Mapping from node types to the number of nodes of that type.
+        *   `fanOut`:
+            Mapping from relation acronyms to mappings from
+            pairs of node types `(fType, tType)` to the average number of nodes
+            of type `tType` that stand in that relation to a node of type `fType`.
+
+        The relations covered are `[[`, `]]`, `&&`, `=:`, `:=`, `<:` and `:>`.
+
+    Notes
+    -----
+    The spread of `&&` is computed under the assumption that nodes have no gaps.
+    For gapped nodes it is a slight overestimation.
+    """
+
+    (otype, maxSlot, maxNode, slotType) = otype
+    oslots = oslots[0]
+    (firstSlots, lastSlots) = boundary
+
+    def fOtype(n):
+        return slotType if n <= maxSlot else otype[n - maxSlot - 1]
+
+    def slotsOf(n):
+        return (n,) if n <= maxSlot else oslots[n - maxSlot - 1]
+
+    typeCount = collections.Counter(otype)
+    typeCount[slotType] = maxSlot
+
+    info("counting embedding pairs")
+    embedPairs = collections.Counter()
+    for n in range(1, maxNode + 1):
+        nType = fOtype(n)
+        for m in levUp[n - 1]:
+            embedPairs[(fOtype(m), nType)] += 1
+
+    info("counting boundary pairs")
+
+    # Per node type, the number of nodes that start and end at each slot.
+    # Every slot starts and ends a node of the slot type.
+
+    startCount = {}
+    endCount = {}
+    for tType in typeCount:
+        fill = 1 if tType == slotType else 0
+        for counts in (startCount, endCount):
+            acc = array.array("I", [fill]) * (maxSlot + 2)
+            acc[0] = 0
+            acc[maxSlot + 1] = 0
+            counts[tType] = acc
+    for (i, slots) in enumerate(oslots):
+        if slots:
+            nType = otype[i]
+            startCount[nType][slots[0]] += 1
+            endCount[nType][slots[-1]] += 1
+
+    def occupied(counts):
+        return {
+            tType: range(1, maxSlot + 1)
+            if tType == slotType
+            else array.array("I", itertools.compress(range(maxSlot + 2), acc))
+            for (tType, acc) in counts.items()
+        }
+
+    startsAt = occupied(startCount)
+    endsAt = occupied(endCount)
+
+    def countPairs(fCounts, fAt, tCounts, tAt, shift=0):
+        # for all pairs of types, the sum over the slots s of the number of nodes
+        # of the first type at s times the number of nodes of the second type
+        # at s + shift; we only visit the slots where the sparser type occurs
+
+        pairs = {}
+        for (fType, fAcc) in fCounts.items():
+            fSlots = fAt[fType]
+            for (tType, tAcc) in tCounts.items():
+                tSlots = tAt[tType]
+                amount = (
+                    sum(fAcc[s] * tAcc[s + shift] for s in fSlots)
+                    if len(fSlots) <= len(tSlots)
+                    else sum(fAcc[s - shift] * tAcc[s] for s in tSlots)
+                )
+                if amount:
+                    pairs[(fType, tType)] = amount
+        return pairs
+
+    sameFirstPairs = countPairs(startCount, startsAt, startCount, startsAt)
+    sameLastPairs = countPairs(endCount, endsAt, endCount, endsAt)
+    adjacentPairs = countPairs(endCount, endsAt, startCount, startsAt, shift=1)
+    del endCount, startsAt, endsAt
+
+    info("counting overlap pairs")
+
+    # Per node type, the number of nodes that start at or before each slot.
+
+    startsBefore = startCount
+    for (tType, acc) in startsBefore.items():
+        startsBefore[tType] = array.array("I", itertools.accumulate(acc))
+
+    overlapPairs = collections.Counter()
+    for n in range(1, maxNode + 1):
+        nType = fOtype(n)
+        slots = slotsOf(n)
+        if not slots:
+            continue
+        (first, last) = (slots[0], slots[-1])
+        for (tType, acc) in startsBefore.items():
+            overlapPairs[(nType, tType)] += acc[last] - acc[first - 1]
+        for m in levUp[first - 1]:
+            if slotsOf(m)[0] < first:
+                overlapPairs[(nType, fOtype(m))] += 1
+
+    def average(pairs, byFrom=True):
+        return {
+            (fType, tType): amount / typeCount[fType if byFrom else tType]
+            for ((fType, tType), amount) in pairs.items()
+        }
+
+    fanOut = {
+        "[[": average(embedPairs),
+        "]]": average(embedPairs, byFrom=False),
+        "&&": average(overlapPairs),
+        "=:": average(sameFirstPairs),
+        ":=": average(sameLastPairs),
+        "<:": average(adjacentPairs),
+        ":>": average(adjacentPairs, byFrom=False),
+    }
+    fanOut["]]"] = {(tType, fType): v for ((fType, tType), v) in fanOut["]]"].items()}
+    fanOut[":>"] = {(tType, fType): v for ((fType, tType), v) in fanOut[":>"].items()}
+
+    info(f"{len(typeCount)} node types and {len(fanOut)} relations")
+    return dict(typeCount=dict(typeCount), fanOut=fanOut)
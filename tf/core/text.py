@@ -353,9 +353,30 @@ features to furnish a decent representation.
     (i.e. a single backslash plus the character `n` or `t`.
     In your editor you may have to type the backslash twice in order to put it
     in the file once!)
+
+!!! note "Remembered texts"
+    `T.text()` remembers the texts of the nodes that it renders by descending to
+    their constituents, per node, format and target type, as long as the format
+    is compiled from a template in `otext.tf`. When such a node is rendered again,
+    e.g. in a table and then again in a pretty display, its text is looked up.
+    The least recently used texts are forgotten when their total size exceeds
+    a memory budget, see `Text.setMemoBudget`.
+    Nodes whose slots form one contiguous run are not remembered once the slot
+    text buffer of the format is there (see `Text.textBuffer`): their text is
+    a single slice of that buffer.
 """
 
-from ..parameters import OTEXT
+import collections
+import sys
+from array import array
+
+from ..parameters import OTEXT, TEXT_MEMO_BUDGET
+from .prepare import sectionSlots
+
+MEMO_ENTRY_BYTES = 200
+"""Approximate memory cost of an entry in the memo of `T.text()`, apart from its text:
+the key (node, format, target type) and the slot in the memo.
+"""
 
 DEFAULT_FORMAT = "text-orig-full"
 DEFAULT_FORMAT_TYPE = "{}-default"
@@ -456,6 +477,12 @@ class Text:
         """
 
         self._compileFormats()
+        self._buffers = {}
+        self._bufferUses = {}
+        self._memo = collections.OrderedDict()
+        self._memoSize = 0
+        self._memoBudget = TEXT_MEMO_BUDGET
+        self._slotSec = None
         self.good = good
 
     def sectionTuple(self, n, lastSlot=False, fillup=False):
@@ -503,11 +530,11 @@ class Text:
             return ()
         F = self.api.F
         E = self.api.E
-        L = self.api.L
         fOtype = F.otype.v
         slotType = F.otype.slotType
         maxSlot = F.otype.maxSlot
         eoslots = E.oslots.data
+        slotSec = self._slotSections()
         nType = fOtype(n)
 
         if nType == slotType:
@@ -518,28 +545,23 @@ class Text:
 
         if nType == sTypes[0]:
             if fillup:
-                r1 = L.u(r, otype=sTypes[1])
-                r1 = r1[0] if r1 else ""
+                r1 = slotSec[1][r - 1] or ""
                 if lsTypes > 2:
-                    r2 = L.u(r, otype=sTypes[2])
-                    r2 = r2[0] if r2 else ""
+                    r2 = slotSec[2][r - 1] or ""
                     return (n, r1, r2)
                 return (n, r1)
             return (n,)
 
-        r0s = L.u(r, sTypes[0])
-        r0 = r0s[0] if r0s else None
+        r0 = slotSec[0][r - 1] or None
 
         if nType == sTypes[1]:
             if fillup:
                 if lsTypes > 2:
-                    r2 = L.u(r, otype=sTypes[2])
-                    r2 = r2[0] if r2 else ""
+                    r2 = slotSec[2][r - 1] or ""
                     return (r0, n, r2)
             return (r0, n)
 
-        r1s = L.u(r, sTypes[1])
-        r1 = r1s[0] if r1s else ""
+        r1 = slotSec[1][r - 1] or ""
 
         if lsTypes < 3:
             return (r0, r1)
@@ -547,11 +569,54 @@ class Text:
         if nType == sTypes[2]:
             return (r0, r1, n)
 
-        r2s = L.u(r, sTypes[2])
-        r2 = r2s[0] if r2s else ""
+        r2 = slotSec[2][r - 1] or ""
 
         return (r0, r1, r2)
 
+    def sectionTupleMany(self, nodes, lastSlot=False, fillup=False):
+        """Gives the section tuples of many nodes.
+
+        The same as `[T.sectionTuple(n, lastSlot=lastSlot, fillup=fillup)
+        for n in nodes]`.
+
+        Parameters
+        ----------
+        nodes: iterable of integer
+            The nodes whose containing sections to retrieve.
+        lastSlot: boolean, optional False
+            See `Text.sectionTuple`.
+        fillup: boolean, optional False
+            See `Text.sectionTuple`.
+
+        Returns
+        -------
+        tuple of tuple
+            The section tuples of the nodes, in the same order as `nodes`.
+        """
+
+        sectionTuple = self.sectionTuple
+        return tuple(sectionTuple(n, lastSlot=lastSlot, fillup=fillup) for n in nodes)
+
+    def _slotSections(self):
+        # For each section level, the section node of each slot,
+        # see tf.core.prepare.sectionSlots.
+        # Data that has been pre-computed by an older version lacks it,
+        # in that case we compute it here.
+
+        slotSec = self._slotSec
+        if slotSec is None:
+            api = self.api
+            C = api.C
+            sections = getattr(C, "sections", None)
+            slotSec = None if sections is None else sections.data.get("slotSec", None)
+            if slotSec is None:
+                Fotype = api.F.otype
+                slotSec = sectionSlots(
+                    Fotype.maxSlot, C.levUp.data, Fotype.support, self.sectionTypes
+                )
+            self._slotSec = slotSec
+        return slotSec
+
     def sectionFromNode(self, n, lastSlot=False, lang="en", fillup=False, level=None):
         """Gives the full heading of a section node.
 
@@ -652,6 +717,48 @@ class Text:
         else:
             return sec2.get(sec0node, {}).get(section[1], {}).get(section[2], None)
 
+    def nodeFromSectionMany(self, sections, lang="en"):
+        """Gives the nodes of many section tuples.
+
+        The same as `[T.nodeFromSection(section) for section in sections]`,
+        but the lookup tables are fetched only once.
+
+        Parameters
+        ----------
+        sections: iterable of tuple
+            The sections, each as in `Text.nodeFromSection`.
+        lang: string, optional en
+            See `Text.nodeFromSection`.
+
+        Returns
+        -------
+        tuple
+            The section node for each section, `None` if there is no such section.
+        """
+
+        sTypes = self.sectionTypes
+        if len(sTypes) == 0:
+            return tuple(None for section in sections)
+        cData = self.api.C.sections.data
+        sec1 = cData["sec1"]
+        sec2 = cData["sec2"]
+        sec0T = sTypes[0]
+        sec0Nodes = self.nodeFromName["" if lang not in self.languages else lang]
+        empty = {}
+
+        result = []
+        for section in sections:
+            sec0node = sec0Nodes.get((sec0T, section[0]), None)
+            if len(section) == 1:
+                node = sec0node
+            elif len(section) == 2:
+                node = sec1.get(sec0node, empty).get(section[1], None)
+            else:
+                sec2nodes = sec2.get(sec0node, empty).get(section[1], empty)
+                node = sec2nodes.get(section[2], None)
+            result.append(node)
+        return tuple(result)
+
     def structureInfo(self):
         """Gives a summary of how structure has been configured in the dataset.
 
@@ -969,6 +1076,37 @@ There are {len(hdFromNd)} structural elements in the dataset.
             error(f"no structure node with heading {head}", tm=False)
         return n
 
+    def nodeFromHeadingMany(self, heads):
+        """Gives the nodes of many headings.
+
+        The same as `[T.nodeFromHeading(head) for head in heads]`,
+        but headings without a node do not give an error message each;
+        there is one message with their number.
+
+        Parameters
+        ----------
+        heads: iterable of tuple
+            The headings, each as in `Text.nodeFromHeading`.
+
+        Returns
+        -------
+        tuple
+            The structure node for each heading, `None` if there is no such node.
+        """
+
+        api = self.api
+        TF = api.TF
+        error = TF.error
+        ndFromHd = self.ndFromHd
+        if ndFromHd is None:
+            error("structure types are not configured", tm=False)
+            return tuple(None for head in heads)
+        result = tuple(ndFromHd.get(head, None) for head in heads)
+        missing = sum(1 for n in result if n is None)
+        if missing:
+            error(f"no structure node for {missing} headings", tm=False)
+        return result
+
     def text(self, nodes, fmt=None, descend=None, func=None, explain=False, **kwargs):
         """Gives the text that corresponds to a bunch of nodes.
 
@@ -1044,7 +1182,9 @@ There are {len(hdFromNd)} structural elements in the dataset.
 
         defaultFormats = self.defaultFormats
         xformats = self._xformats
+        cformats = self._cformats
         xdTypes = self._xdTypes
+        memo = self._memo
 
         if fmt and fmt not in xformats:
             error(f'Undefined format "{fmt}"', tm=False)
@@ -1090,12 +1230,14 @@ EXPLANATION: T.text() called with parameters:
                 if explain:
                     downRep = fmttStr
                 if fmt:
+                    repFmt = fmt
                     repf = xformats[fmt]
                     downType = xdTypes[fmt]
                     if explain:
                         fmtRep = f"explicit {fmt} does {repf}"
                         expandRep = f"{downType} {{}} (descend=True) ({downRep})"
                 else:
+                    repFmt = DEFAULT_FORMAT
                     repf = xformats[DEFAULT_FORMAT]
                     downType = xdTypes[DEFAULT_FORMAT]
                     if explain:
@@ -1106,6 +1248,7 @@ EXPLANATION: T.text() called with parameters:
                 if explain:
                     downRep = ntStr
                 if fmt:
+                    repFmt = fmt
                     repf = xformats[fmt]
                     if descend is None:
                         downType = xdTypes[fmt]
@@ -1116,6 +1259,7 @@ EXPLANATION: T.text() called with parameters:
                         expandRep = f"{downType} {{}} (descend=None) ({downRep})"
                 elif nType in defaultFormats:
                     dfmt = defaultFormats[nType]
+                    repFmt = dfmt
                     repf = xformats[dfmt]
                     if descend is None:
                         downType = nType
@@ -1125,6 +1269,7 @@ EXPLANATION: T.text() called with parameters:
                         fmtRep = f"implicit {dfmt} does {repf}"
                         expandRep = f"{downType} {{}} (descend=None) ({downRep})"
                 else:
+                    repFmt = DEFAULT_FORMAT
                     repf = xformats[DEFAULT_FORMAT]
                     if descend is None:
                         downType = xdTypes[DEFAULT_FORMAT]
@@ -1144,6 +1289,21 @@ EXPLANATION: T.text() called with parameters:
             if explain:
                 error(f"\t\tTARGET LEVEL: {expandRep.format(expandRep2)}", tm=False)
 
+            memoKey = (
+                (node, repFmt, downType)
+                if downType
+                and not func
+                and not explain
+                and repf is cformats.get(repFmt, False)
+                else None
+            )
+            if memoKey is not None:
+                text = memo.get(memoKey, None)
+                if text is not None:
+                    memo.move_to_end(memoKey)
+                    material.append(text)
+                    continue
+
             if explain:
                 plural = "s"
             if downType == slotType:
@@ -1171,6 +1331,27 @@ EXPLANATION: T.text() called with parameters:
             if explain:
                 error(f"\t\tFORMATTING: {fmtRep}", tm=False)
                 error("\t\tMATERIAL:", tm=False)
+            else:
+                text = None
+                if (
+                    not func
+                    and repf is cformats.get(repFmt, False)
+                    and (downType or nType) == slotType
+                ):
+                    buffer = self._buffer(repFmt, len(xnodes))
+                    if buffer is not None:
+                        text = _sliceBuffer(buffer, xnodes)
+                if memoKey is not None:
+                    if text is None:
+                        text = "".join(repf(n) for n in xnodes)
+                        self._memoPut(memoKey, text)
+                    elif xnodes[-1] - xnodes[0] + 1 != len(xnodes):
+                        # a contiguous run of slots is a single slice of the
+                        # buffer, which is as fast as looking it up
+                        self._memoPut(memoKey, text)
+                if text is not None:
+                    material.append(text)
+                    continue
             for n in xnodes:
                 rep = repf(n, **kwargs)
                 material.append(rep)
@@ -1181,6 +1362,135 @@ EXPLANATION: T.text() called with parameters:
             error('Text format "{DEFAULT_FORMAT}" not defined in otext.tf', tm=False)
         return "".join(material)
 
+    def textMany(self, nodes, fmt=None, descend=None, func=None, **kwargs):
+        """Gives the texts that correspond to many nodes, one text per node.
+
+        The same as `[T.text(n, fmt=fmt, descend=descend) for n in nodes]`,
+        but if you pass a format, the text buffer of that format
+        (see `Text.textBuffer`) is made right away if it is not yet there,
+        so that the texts of the slots are taken from it.
+
+        Parameters
+        ----------
+        nodes: iterable of integer
+            The nodes whose texts will be delivered.
+        fmt: string, optional None
+            See `Text.text`.
+        descend: boolean, optional None
+            See `Text.text`.
+        func: function, optional None
+            See `Text.text`. If passed, the text buffers are not used.
+
+        Returns
+        -------
+        tuple of string
+            The texts of the nodes, in the same order as `nodes`.
+        """
+
+        if fmt and not func and self._xformats.get(fmt, None) is self._cformats.get(
+            fmt, False
+        ):
+            self.textBuffer(fmt)
+        text = self.text
+        return tuple(
+            text(n, fmt=fmt, descend=descend, func=func, **kwargs) for n in nodes
+        )
+
+    def textBuffer(self, fmt):
+        """Gives the text of all slots in a format, as one buffer.
+
+        The buffer is made the first time it is asked for, and it is kept
+        as long as the format does not change.
+        `Text.text` uses it to render the slots of nodes with slices
+        of the buffer instead of formatting every slot anew;
+        it asks for it after it has rendered as many slots in that format
+        as there are slots in the corpus.
+        It does so only for formats that are compiled from their templates,
+        not for formats that an app renders with functions of its own,
+        because those may render a slot differently in different contexts.
+
+        Parameters
+        ----------
+        fmt: string
+            The name of a text format.
+
+        Returns
+        -------
+        tuple
+            The texts of all slots in the format, concatenated into one string,
+            and an array of offsets: slot `s` occupies the string from offset
+            `offsets[s - 1]` till offset `offsets[s]`.
+        """
+
+        repf = self._xformats[fmt]
+        cached = self._buffers.get(fmt, None)
+        if cached is not None and cached[0] is repf:
+            return cached[1]
+
+        material = []
+        offsets = array("L", [0])
+        pos = 0
+        for s in range(1, self.api.F.otype.maxSlot + 1):
+            text = repf(s)
+            material.append(text)
+            pos += len(text)
+            offsets.append(pos)
+        buffer = ("".join(material), offsets)
+        self._buffers[fmt] = (repf, buffer)
+        return buffer
+
+    def setMemoBudget(self, budget=None):
+        """Changes the memory budget for remembered texts.
+
+        `Text.text` remembers the texts of nodes that it has rendered
+        by descending to their constituents.
+        When their total size exceeds the budget,
+        the least recently used texts are forgotten.
+
+        Parameters
+        ----------
+        budget: integer, optional None
+            The new budget in bytes. If `None`, the default budget is restored,
+            see `tf.parameters.TEXT_MEMO_BUDGET`.
+            If `0`, no texts will be remembered.
+        """
+
+        self._memoBudget = TEXT_MEMO_BUDGET if budget is None else budget
+        self._memoEvict()
+
+    def clearMemo(self):
+        """Forgets all remembered texts, see `Text.setMemoBudget`."""
+
+        self._memo.clear()
+        self._memoSize = 0
+
+    def _memoPut(self, key, text):
+        size = sys.getsizeof(text) + MEMO_ENTRY_BYTES
+        if size > self._memoBudget:
+            return
+        self._memo[key] = text
+        self._memoSize += size
+        self._memoEvict()
+
+    def _memoEvict(self):
+        memo = self._memo
+        while self._memoSize > self._memoBudget and memo:
+            (k, text) = memo.popitem(last=False)
+            self._memoSize -= sys.getsizeof(text) + MEMO_ENTRY_BYTES
+
+    def _buffer(self, fmt, uses):
+        # The text buffer of a format, or None as long as too few slots
+        # have been rendered in that format, see textBuffer
+
+        cached = self._buffers.get(fmt, None)
+        if cached is not None and cached[0] is self._xformats[fmt]:
+            return cached[1]
+        uses += self._bufferUses.get(fmt, 0)
+        self._bufferUses[fmt] = uses
+        if uses < self.api.F.otype.maxSlot:
+            return None
+        return self.textBuffer(fmt)
+
     def _sec0Name(self, n, lang="en"):
         sec0T = self.sectionTypes[0]
         fOtype = self.api.F.otype.v
@@ -1202,6 +1512,7 @@ EXPLANATION: T.text() called with parameters:
         self.formats = {}
         self._tformats = {}
         self._xformats = {}
+        self._cformats = {}
         self._xdTypes = {}
         for (fmt, (otpl, rtpl, feats)) in sorted(cformats.items()):
             defaultType = self.splitDefaultFormat(fmt)
@@ -1212,6 +1523,7 @@ EXPLANATION: T.text() called with parameters:
             tpl = rtpl.replace("\\n", "\n").replace("\\t", "\t")
             self._xdTypes[fmt] = descendType
             self._xformats[fmt] = self._compileFormat(tpl, feats)
+            self._cformats[fmt] = self._xformats[fmt]
             self.formats[fmt] = descendType
             self._tformats[fmt] = otpl
 
@@ -1279,3 +1591,14 @@ EXPLANATION: T.text() called with parameters:
                 return v or default
 
             return _getVal
+
+
+def _sliceBuffer(buffer, slots):
+    # The text of a sequence of slots, as slices of a text buffer
+
+    (text, offsets) = buffer
+    first = slots[0]
+    last = slots[-1]
+    if last - first + 1 == len(slots):
+        return text[offsets[first - 1] : offsets[last]]
+    return "".join(text[offsets[s - 1] : offsets[s]] for s in slots)
@@ -203,3 +203,40 @@ TRY_LIMIT_TO = 40
 
 SEARCH_FAIL_FACTOR = 4
 """Limits fetching of search results to this times maxNode (corpus dependent)"""
+
+SEARCH_CACHE_BUDGET = 256 * 1024 * 1024
+"""Memory budget in bytes for cached search results.
+
+See `tf.search.cache.QueryCache`.
+"""
+
+SEARCH_PARSE_CACHE = 256
+"""Maximum number of parsed search templates that are kept.
+
+See `tf.search.cache.ParseCache`.
+"""
+
+SEARCH_FILE_CHUNK = 10000
+"""Number of search results that are written to a result file in one go.
+
+See `tf.search.resultfile`.
+"""
+
+LOCALITY_INDEX_THRESHOLD = 1000
+"""Number of calls to `L.u` or `L.d` for a single node type
+after which an index for that type is built.
+
+See `tf.core.locality.Locality`.
+"""
+
+SORT_ORDER_FRACTION = 8
+"""When `tf.core.nodes.Nodes.sortNodes` is called with `fast=True`
+and gets more than `maxNode / SORT_ORDER_FRACTION` nodes,
+it picks them from all nodes in canonical order instead of sorting them.
+"""
+
+TEXT_MEMO_BUDGET = 64 * 1024 * 1024
+"""Memory budget in bytes for the texts of nodes that `T.text()` remembers.
+
+See `tf.core.text.Text.setMemoBudget`.
+"""
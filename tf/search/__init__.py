@@ -4,4 +4,6 @@
 *   User guide to search: `tf.about.searchusage`
 *   Search API: `tf.search.search`.
 *   Implementation of search: `tf.about.searchdesign`
+*   Searching the text of a corpus: `tf.search.textlayer`
+*   Measuring the performance of search: `tf.search.qperf`
 """
@@ -0,0 +1,301 @@
+"""
+# Measuring the execution of a search
+
+The plan of a search, as shown by `tf.search.search.Search.showPlan`,
+is based on estimates: the sizes of the yarns and the spreads of the relations.
+When a search is slow, you want to know what actually happened.
+
+With `S.showPlan(analyze=True)` the latest search template is executed again,
+and every phase of the execution is measured:
+
+*   the phases as a whole: parsing, preparing, spinning atoms, spinning edges,
+    stitching (planning the retrieval) and fetching the results;
+*   every atom: where its yarn came from, how many candidate nodes have been tried
+    and how many have been accepted by its feature conditions and quantifiers;
+*   every time an edge has been spun: the sizes of the yarns around it,
+    before and after thinning;
+*   every edge of the stitch plan: how many partial results arrived at it,
+    how many candidate nodes have been tried, how many partial results have been
+    passed on to the next edge, and how much time has been spent in computing
+    its relation.
+
+The measurements are shown next to the plan and returned as a dictionary.
+
+Measuring costs time itself, especially during stitching,
+so the timings are only indicative of where the time goes.
+"""
+
+from time import perf_counter
+
+
+class Analysis:
+    """Collects measurements during the execution of a search.
+
+    An analysis is attached to a `tf.search.searchexe.SearchExe` when it is created
+    with `analyze=True`. The search engine reports to it at the points of interest.
+
+    Parameters
+    ----------
+    stitchCounts: boolean, optional True
+        Whether to count what happens at the edges of the stitch plan.
+        This slows down fetching the results considerably,
+        so leave it out if you are only interested in the timing of the phases.
+    """
+
+    def __init__(self, stitchCounts=True):
+        self.stitchCounts = stitchCounts
+        self.phases = {}
+        self.atoms = []
+        self.edges = []
+        self.planEdges = []
+        self.arrivals = []
+        self.tried = []
+        self.relationTime = []
+        self.results = 0
+
+    def measure(self, phase, func, *args):
+        """Runs a function and adds its wall time to a phase."""
+
+        start = perf_counter()
+        result = func(*args)
+        self.phases[phase] = self.phases.get(phase, 0) + perf_counter() - start
+        return result
+
+    def atom(self, q, source, tried, accepted, final, time):
+        """Records the spinning of an atom.
+
+        Parameters
+        ----------
+        q: integer
+            The number of the atom.
+        source: string
+            `universe` if the yarn is the yarn of the quantified atom,
+            `cached` if it has been shared with an identical atom,
+            `spun` if it has been computed from the node type and features.
+        tried: integer
+            The number of candidate nodes that have been tested.
+        accepted: integer
+            The number of nodes that satisfied the feature conditions.
+        final: integer
+            The number of nodes in the yarn after applying the quantifiers.
+        time: float
+            Wall time in seconds.
+        """
+
+        self.atoms.append(
+            dict(
+                node=q,
+                source=source,
+                tried=tried,
+                accepted=accepted,
+                final=final,
+                time=time,
+            )
+        )
+
+    def edge(self, e, before, after, time):
+        """Records the spinning of an edge.
+
+        Parameters
+        ----------
+        e: integer
+            The number of the edge.
+        before, after: tuple
+            The sizes of the yarns of the source and target of the edge,
+            before and after spinning.
+        time: float
+            Wall time in seconds.
+        """
+
+        self.edges.append(dict(edge=e, before=before, after=after, time=time))
+
+    def instrument(self, planEdges, edgesCompiled):
+        """Wraps the relations of a compiled stitch plan with counters.
+
+        Parameters
+        ----------
+        planEdges: list
+            The edges of the stitch plan, as pairs of edge number and direction.
+        edgesCompiled: list
+            The compiled edges, see `tf.search.stitch._compilePlan`.
+
+        Returns
+        -------
+        list
+            The compiled edges, where the relation functions count the candidates
+            they produce and measure the time they take.
+        """
+
+        n = len(edgesCompiled)
+        self.planEdges = list(planEdges)
+        self.arrivals = [0] * (n + 1)
+        self.tried = [0] * n
+        self.relationTime = [0.0] * n
+
+        wrapped = []
+        for (e, (f, t, r, nparams, isMulti)) in enumerate(edgesCompiled):
+            if isMulti:
+                r = tuple(self._wrap(e, ri, 2, i == 0) for (i, ri) in enumerate(r))
+            else:
+                r = self._wrap(e, r, nparams, True)
+            wrapped.append((f, t, r, nparams, isMulti))
+        return wrapped
+
+    def _wrap(self, e, r, nparams, count):
+        tried = self.tried
+        relationTime = self.relationTime
+
+        if nparams == 1:
+
+            def measured(n):
+                start = perf_counter()
+                ms = tuple(r(n) or ())
+                relationTime[e] += perf_counter() - start
+                tried[e] += len(ms)
+                return ms
+
+        else:
+
+            def measured(n, m):
+                start = perf_counter()
+                result = r(n, m)
+                relationTime[e] += perf_counter() - start
+                if count:
+                    tried[e] += 1
+                return result
+
+        return measured
+
+    def data(self, searchExe):
+        """Assembles the measurements in a dictionary.
+
+        Returns
+        -------
+        dict
+            With keys:
+
+            *   `phases`: wall time per phase;
+            *   `atoms`: a list with a dict per atom;
+            *   `edges`: a list with a dict per spinning of an edge,
+                in the order in which the edges have been spun;
+            *   `stitch`: a list with a dict per edge of the stitch plan;
+            *   `results`: the number of results fetched.
+        """
+
+        qnodes = searchExe.qnodes
+        qedges = searchExe.qedges
+        relations = searchExe.relations
+        converse = searchExe.converse
+        firstMulti = searchExe.firstMulti
+        spreads = searchExe.spreads
+        spreadsC = searchExe.spreadsC
+
+        def relRep(e, dir=1):
+            (f, rela, t) = qedges[e]
+            if e >= firstMulti:
+                if dir == -1:
+                    (f, rela, t) = (t, tuple(converse[r] for r in rela), f)
+                fRep = ",".join(str(x) for x in f)
+                relaRep = ",".join(relations[r]["acro"] for r in rela)
+            else:
+                if dir == -1:
+                    (f, rela, t) = (t, converse[rela], f)
+                fRep = str(f)
+                relaRep = relations[rela]["acro"]
+            return f"{fRep} {relaRep} {t}"
+
+        atoms = [dict(atom=qnodes[a["node"]][2].strip(), **a) for a in self.atoms]
+        edges = [dict(relation=relRep(x["edge"]), **x) for x in self.edges]
+
+        arrivals = self.arrivals
+        stitch = []
+        for (i, (e, dir)) in enumerate(self.planEdges):
+            stitch.append(
+                dict(
+                    edge=e,
+                    dir=dir,
+                    relation=relRep(e, dir),
+                    estimate=(spreads if dir == 1 else spreadsC).get(e, None),
+                    arrived=arrivals[i],
+                    tried=self.tried[i],
+                    accepted=arrivals[i + 1],
+                    time=self.relationTime[i],
+                )
+            )
+
+        return dict(
+            phases=dict(self.phases),
+            atoms=atoms,
+            edges=edges,
+            stitch=stitch,
+            results=self.results,
+        )
+
+
+def displayAnalysis(searchExe, data):
+    """Shows the measurements of an analysis.
+
+    Parameters
+    ----------
+    searchExe: object
+        The search that has been analysed.
+    data: dict
+        The measurements, as delivered by `tf.search.analyze.Analysis.data`.
+    """
+
+    api = searchExe.api
+    TF = api.TF
+    setSilent = TF.setSilent
+    isSilent = TF.isSilent
+    info = TF.info
+    wasSilent = isSilent()
+    setSilent(False)
+    _msgCache = searchExe._msgCache
+
+    def show(msg):
+        info(msg, tm=False, cache=_msgCache)
+
+    show("Measured execution:")
+    for (phase, time) in data["phases"].items():
+        show(f"\t{phase:<20} {time:>9.4f}s")
+
+    show("Atoms:")
+    show(
+        f"\t{'':<8} {'source':<8} {'tried':>8} {'accepted':>8} "
+        f"{'final':>8} {'time':>9}"
+    )
+    for a in data["atoms"]:
+        show(
+            f"\tnode {a['node']:>2}  {a['source']:<8} {a['tried']:>8} "
+            f"{a['accepted']:>8} {a['final']:>8} {a['time']:>9.4f}s  {a['atom']}"
+        )
+
+    if data["edges"]:
+        show("Spinning edges:")
+        show(f"\t{'':<8} {'relation':<16} {'before':>17}    {'after':>17} {'time':>9}")
+        for x in data["edges"]:
+            (bF, bT) = x["before"]
+            (aF, aT) = x["after"]
+            show(
+                f"\tedge {x['edge']:>2}  {x['relation']:<16} {bF:>8} {bT:>8} -> "
+                f"{aF:>8} {aT:>8} {x['time']:>9.4f}s"
+            )
+
+    if data["stitch"]:
+        show("Stitching:")
+        show(
+            f"\t{'':<8} {'relation':<16} {'estimate':>8} {'arrived':>8} "
+            f"{'tried':>8} {'accepted':>8} {'time':>9}"
+        )
+        for x in data["stitch"]:
+            estimate = x["estimate"]
+            estimateRep = "" if estimate is None else f"{estimate:.1f}"
+            show(
+                f"\tedge {x['edge']:>2}  {x['relation']:<16} {estimateRep:>8} "
+                f"{x['arrived']:>8} {x['tried']:>8} {x['accepted']:>8} "
+                f"{x['time']:>9.4f}s"
+            )
+
+    show(f"\t{data['results']} results")
+
+    setSilent(wasSilent)
@@ -0,0 +1,180 @@
+"""
+# Running many search templates in one go
+
+When you run a lot of search templates, for example to produce a report,
+many of them will have atoms in common, such as `verse`, `clause` or
+`word sp=verb`. When you run them one by one, the yarns of those atoms are
+computed again and again.
+
+`tf.search.search.Search.searchMany` runs a batch of templates together:
+
+1.  all templates are parsed and checked;
+1.  the atoms that occur in more than one template are spun exactly once,
+    and their yarns are kept in a cache that is shared by all templates;
+1.  the templates are studied and their results fetched,
+    optionally by several worker threads in parallel.
+
+The indexes of edge features (see `tf.search.edgeindex`) and the statistics
+for the planner (see `tf.search.stats`) are shared anyway, because they are
+kept in `S`.
+
+Results that are already in the query cache (see `tf.search.cache`) are taken
+from there, and new results are stored there.
+
+The guards against excessive time and memory (see `tf.search.guard`) apply to
+each template separately: a template gets its own guard when it starts running.
+A template that is aborted by its guard yields no results, and the reason is
+reported; the other templates are not affected.
+
+!!! note "Parallelism"
+    The workers are threads in the same process, so they share the loaded corpus,
+    but Python executes only one thread at a time.
+    The gain of more workers is limited to the parts of the work that do not
+    hold the interpreter lock.
+"""
+
+import collections
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+from .searchexe import SearchExe
+from .spin import _atomKey, _spinFeatures
+from .cache import QueryCache, resultEntry
+from .guard import Guard, SearchAborted
+from ..core.timestamp import DEEP
+
+
+def searchMany(
+    S,
+    templates,
+    limit=None,
+    sets=None,
+    shallow=False,
+    sort=False,
+    workers=1,
+    cache=True,
+    timeout=None,
+    cancel=None,
+    memory=None,
+):
+    """Runs a batch of search templates with shared computations.
+
+    See `tf.search.search.Search.searchMany`.
+    """
+
+    api = S.api
+    TF = api.TF
+    wasSilent = TF.isSilent()
+
+    items = (
+        list(templates.items())
+        if isinstance(templates, dict)
+        else [(template, template) for template in templates]
+    )
+
+    results = {}
+    cacheKeys = {}
+    exes = {}
+    atomCache = {}
+
+    for (name, template) in items:
+        if cache:
+            cacheKey = QueryCache.key(
+                template,
+                kind="sorted" if sort and not shallow else None,
+                sets=sets,
+                shallow=shallow,
+                limit=limit,
+            )
+            cached = S.cache.get(cacheKey)
+            if cached is not None:
+                queryResults = cached[1]
+                results[name] = (
+                    set(queryResults) if shallow else tuple(queryResults)
+                )
+                continue
+            cacheKeys[name] = cacheKey
+
+        exe = SearchExe(
+            api,
+            template,
+            outerTemplate=template,
+            quKind=None,
+            offset=0,
+            sets=sets,
+            shallow=shallow,
+            silent=DEEP,
+            setInfo={},
+            atomCache=atomCache,
+        )
+        exe._parse()
+        exe._prepare()
+        exes[name] = exe
+
+    # spin the atoms that are shared between templates once
+
+    atomUses = collections.Counter()
+    atomExe = {}
+    for exe in exes.values():
+        if not exe.good:
+            continue
+        for (otype, features, src, quantifiers) in exe.qnodes:
+            atomKey = _atomKey(otype, features)
+            if atomKey is not None:
+                atomUses[atomKey] += 1
+                atomExe[atomKey] = (exe, otype, features)
+
+    shared = [atomKey for (atomKey, n) in atomUses.items() if n > 1]
+
+    def makeGuard():
+        return Guard.make(timeout=timeout, cancel=cancel, memory=memory)
+
+    def spinShared(atomKey):
+        # An atom that is aborted by its guard is not shared;
+        # the templates that use it will spin it under their own guards.
+
+        (exe, otype, features) = atomExe[atomKey]
+        spinExe = copy.copy(exe)
+        spinExe.guard = makeGuard()
+        try:
+            atomCache[atomKey] = _spinFeatures(spinExe, otype, features)
+        except SearchAborted:
+            pass
+
+    def run(name):
+        exe = exes[name]
+        exe.guard = makeGuard()
+        try:
+            if exe.good:
+                exe.study(parsed=True)
+            queryResults = exe.fetch(limit=limit, sort=sort)
+            if not shallow:
+                queryResults = tuple(queryResults)
+        except SearchAborted as e:
+            return (name, exe, set() if shallow else (), e)
+        return (name, exe, queryResults, None)
+
+    try:
+        if workers and workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(spinShared, shared))
+                outcome = list(pool.map(run, list(exes)))
+        else:
+            for atomKey in shared:
+                spinShared(atomKey)
+            outcome = [run(name) for name in exes]
+    finally:
+        TF.setSilent(wasSilent)
+
+    for (name, exe, queryResults, aborted) in outcome:
+        results[name] = queryResults
+        if aborted is not None:
+            TF.error(f"{name}: {aborted}", tm=False)
+            continue
+        if cache and exe.good:
+            (value, size) = resultEntry(
+                exe, frozenset(queryResults) if shallow else queryResults
+            )
+            S.cache.put(cacheKeys[name], value, size=size)
+
+    return {name: results[name] for (name, template) in items}
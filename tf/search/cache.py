@@ -0,0 +1,433 @@
+"""
+# Cache of search results
+
+Running a search template is costly, and in many contexts the same template
+is run over and over again: in the TF browser all users share one kernel,
+and in notebooks a search is often repeated when cells are re-run.
+
+The results are kept in a cache that is shared by
+`tf.search.search.Search.search`, `tf.advanced.search.search` and
+`tf.advanced.search.runSearch`.
+
+The cache has a memory budget, `tf.parameters.SEARCH_CACHE_BUDGET`.
+When adding results would exceed it, the least recently used results are evicted.
+Results that are larger than the budget by themselves are not cached.
+
+The cache counts hits, misses and evictions, see
+`tf.search.cache.QueryCache.metrics`.
+
+Together with the results of a search, the cache keeps the search itself,
+but slimmed down to its parsed template (see
+`tf.search.searchexe.SearchExe.slim`), so that its yarns do not stay in memory.
+`tf.search.cache.resultEntry` makes such entries and estimates their size.
+
+Custom sets are part of the key by their contents, so when you add nodes to
+a set or remove nodes from it, the search is run again.
+Likewise, an entry is only valid as long as the features that were loaded
+when it was cached are still loaded with the same data.
+
+Parsed templates are kept in a separate cache, `S.parseCache`,
+see `tf.search.cache.ParseCache`.
+"""
+
+import collections
+import sys
+from threading import Lock
+
+from .syntax import whiteRe
+from ..parameters import SEARCH_CACHE_BUDGET, SEARCH_PARSE_CACHE
+
+
+POINTER_BYTES = 8
+"""Memory taken by a reference to an object in a tuple or list."""
+
+
+def normalizeTemplate(template):
+    """Normalizes a search template for use in a cache key.
+
+    Blank lines, comment lines and trailing white space do not affect
+    the meaning of a template, so they are removed.
+    """
+
+    return "\n".join(
+        line.rstrip() for line in template.split("\n") if not whiteRe.match(line)
+    )
+
+
+def sizeOf(value, depth=3):
+    """Estimates the memory footprint of a (nested) collection.
+
+    We descend into tuples, lists, sets and dicts,
+    but not deeper than `depth` levels.
+    """
+
+    size = sys.getsizeof(value)
+    if depth == 0:
+        return size
+    if isinstance(value, dict):
+        size += sum(
+            sizeOf(k, depth=depth - 1) + sizeOf(v, depth=depth - 1)
+            for (k, v) in value.items()
+        )
+    elif isinstance(value, (tuple, list, set, frozenset)):
+        size += sum(sizeOf(v, depth=depth - 1) for v in value)
+    return size
+
+
+def resultEntry(exe, results):
+    """Makes a cache entry for the results of a search.
+
+    Parameters
+    ----------
+    exe: object
+        The `tf.search.searchexe.SearchExe` that has delivered the results.
+    results: tuple | frozenset
+        The results.
+
+    Returns
+    -------
+    tuple
+        The value to cache: the slimmed down search and the results,
+        and the estimated size of that value in bytes.
+    """
+
+    slim = exe.slim()
+    return ((slim, results), sizeOf(results) + slim.memory())
+
+
+class QueryCache:
+    """Bounded LRU cache for search results.
+
+    Parameters
+    ----------
+    budget: integer, optional `tf.parameters.SEARCH_CACHE_BUDGET`
+        The maximum amount of memory in bytes that the cached results may occupy.
+    features: dict, optional None
+        The features of the dataset, `TF.features`.
+        If given, entries are dropped as soon as a feature that was loaded
+        when they were cached has been unloaded or loaded again.
+    """
+
+    def __init__(self, budget=SEARCH_CACHE_BUDGET, features=None):
+        self.budget = budget
+        self.features = features
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def key(template, kind=None, sets=None, shallow=False, limit=None):
+        """Makes a cache key for a search.
+
+        Parameters
+        ----------
+        template: string
+            The search template; it will be normalized.
+        kind: any, optional None
+            Distinguishes between the several consumers of the cache,
+            which store results in different forms.
+        sets: dict, optional None
+            The custom sets used in the search. They are identified by their
+            names and their contents.
+        shallow: boolean | integer, optional False
+            The `shallow` parameter of the search.
+        limit: integer, optional None
+            The `limit` parameter of the search.
+
+        Returns
+        -------
+        tuple
+        """
+
+        setsKey = (
+            ()
+            if not sets
+            else tuple(
+                sorted((name, len(s), hash(frozenset(s))) for (name, s) in sets.items())
+            )
+        )
+        return (kind, normalizeTemplate(template), setsKey, shallow, limit)
+
+    def get(self, key, default=None):
+        """Looks up an entry and marks it as recently used.
+
+        Returns
+        -------
+        any
+            The cached value, or `default` if the key is not in the cache.
+        """
+
+        with self.lock:
+            entry = self.entries.get(key, None)
+            if entry is not None and not self._isValid(entry[2]):
+                del self.entries[key]
+                self.size -= entry[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def _dataIds(self):
+        # identifies the data of the features that are loaded
+
+        features = self.features
+        if features is None:
+            return ()
+        return tuple(
+            (fName, id(fObj.data), fObj.dataLoaded)
+            for (fName, fObj) in features.items()
+            if fObj.dataLoaded
+        )
+
+    def _isValid(self, dataIds):
+        # whether the features are still loaded with the same data
+
+        features = self.features
+        for (fName, dataId, loaded) in dataIds:
+            fObj = features.get(fName, None)
+            if fObj is None or fObj.dataLoaded != loaded or id(fObj.data) != dataId:
+                return False
+        return True
+
+    def put(self, key, value, size=None):
+        """Adds an entry, evicting least recently used entries if needed.
+
+        Parameters
+        ----------
+        key: tuple
+            As made by `tf.search.cache.QueryCache.key`.
+        value: any
+            The results to cache.
+        size: integer, optional None
+            The memory footprint of the value; if `None` it will be estimated.
+        """
+
+        if size is None:
+            size = sizeOf(value)
+        dataIds = self._dataIds()
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            if size > self.budget:
+                return
+            self.entries[key] = (value, size, dataIds)
+            self.size += size
+            self._evict()
+
+    def _evict(self):
+        # the caller must hold the lock
+
+        while self.size > self.budget:
+            (k, (v, s, d)) = self.entries.popitem(last=False)
+            self.size -= s
+            self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __getitem__(self, key):
+        value = self.get(key, default=self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        """Removes all entries. The metrics are kept."""
+
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def setBudget(self, budget=None):
+        """Changes the memory budget.
+
+        Parameters
+        ----------
+        budget: integer, optional None
+            The new budget in bytes. If `None`, the default budget is restored,
+            see `tf.parameters.SEARCH_CACHE_BUDGET`.
+        """
+
+        if budget is None:
+            budget = SEARCH_CACHE_BUDGET
+        with self.lock:
+            self.budget = budget
+            self._evict()
+
+    def metrics(self):
+        """Reports the use of the cache.
+
+        Returns
+        -------
+        dict
+            With keys `hits`, `misses`, `evictions`, `entries`, `size`, `budget`.
+        """
+
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            entries=len(self.entries),
+            size=self.size,
+            budget=self.budget,
+        )
+
+
+class ParseCache:
+    """Bounded LRU cache for parsed and checked search templates.
+
+    Before a template can be executed, it is parsed (`tf.search.syntax`)
+    and checked against the corpus (`tf.search.semantics`), and the relations that
+    it can use are set up (`tf.search.relations`). That takes time, and in the
+    TF browser the same templates are executed over and over again,
+    e.g. when paging through the results.
+
+    This cache keeps the outcome of that work: the atoms and relations of the
+    template, its feature conditions with compiled regular expressions,
+    the relation table, and the features that are used.
+    Templates with errors are not cached, so their errors are reported every time.
+
+    An entry is only valid as long as the features that the template uses
+    are loaded with the same data as when it was cached.
+    When such a feature has been unloaded or loaded again, the template is parsed
+    anew.
+
+    Parameters
+    ----------
+    size: integer, optional `tf.parameters.SEARCH_PARSE_CACHE`
+        The maximum number of templates in the cache.
+    """
+
+    def __init__(self, size=SEARCH_PARSE_CACHE):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def key(template, sets=None, params=None, level=0):
+        """Makes a cache key for the parse of a template.
+
+        Parameters
+        ----------
+        template: string
+            The search template, as is: line numbers matter.
+        sets: dict, optional None
+            The custom sets; they are identified by their names and the identity of
+            the set objects.
+        params: dict, optional None
+            Whether the template has parameters (see `tf.search.prepared`);
+            only `None` or not `None` matters.
+        level: integer, optional 0
+            Whether the template is the template of a quantifier.
+
+        Returns
+        -------
+        tuple
+        """
+
+        setsKey = (
+            ()
+            if not sets
+            else tuple(sorted((name, id(s)) for (name, s) in sets.items()))
+        )
+        return (template, setsKey, params is not None, level > 0)
+
+    def get(self, key, features):
+        """Looks up a parsed template, if it is still valid.
+
+        Parameters
+        ----------
+        key: tuple
+            As made by `tf.search.cache.ParseCache.key`.
+        features: dict
+            The features of the dataset, `TF.features`.
+
+        Returns
+        -------
+        dict | None
+            The state of the search after parsing, or `None`.
+        """
+
+        with self.lock:
+            entry = self.entries.get(key, None)
+            if entry is not None:
+                (state, dataIds, pins) = entry
+                for (fName, dataId) in dataIds:
+                    fObj = features.get(fName, None)
+                    if fObj is None or not fObj.dataLoaded or id(fObj.data) != dataId:
+                        del self.entries[key]
+                        entry = None
+                        break
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return state
+
+    def put(self, key, state, features, pins=None):
+        """Adds a parsed template, evicting the least recently used one if needed.
+
+        Parameters
+        ----------
+        key: tuple
+            As made by `tf.search.cache.ParseCache.key`.
+        state: dict
+            The state of the search after parsing.
+        features: dict
+            The features of the dataset, `TF.features`.
+        pins: any, optional None
+            Objects that must stay alive as long as the entry is in the cache.
+        """
+
+        dataIds = tuple(
+            (fName, id(features[fName].data))
+            for fName in sorted(state["featuresUsed"])
+            if fName in features
+        )
+        with self.lock:
+            self.entries[key] = (state, dataIds, pins)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        """Removes all entries. The metrics are kept."""
+
+        with self.lock:
+            self.entries.clear()
+
+    def metrics(self):
+        """Reports the use of the cache.
+
+        Returns
+        -------
+        dict
+            With keys `hits`, `misses`, `entries`, `size`.
+        """
+
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self.entries),
+            size=self.size,
+        )
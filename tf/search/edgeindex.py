@@ -0,0 +1,223 @@
+"""
+# Indexes of edge features for search
+
+The relations `-fff>`, `<fff-` and `<fff>` in search templates follow the edges
+of edge feature `fff`. Looking up the edges of a node by means of `E.fff.f(n)` and
+friends is convenient, but not fast enough for search: every call sorts the
+neighbours of the node, and conditions on the values of the edges,
+such as `-crossref>90>`, are applied to every edge that is looked up.
+
+Instead, the search engine builds an *adjacency* per edge feature, direction and
+value condition: a dictionary from nodes to the tuple of their neighbours,
+in canonical order, restricted to the edges whose values satisfy the condition.
+Relations, both while spinning edges (`tf.search.spin.spinEdges`) and while
+stitching results (`tf.search.stitch`), are then direct lookups in that dictionary.
+
+Value conditions are reduced to the set of values that satisfy them.
+The values of an edge feature are few compared to its edges, so every condition is
+evaluated only once per distinct value, and conditions that select the same
+values, e.g. `-crossref>90>` and `-crossref=95|100>` if those are the only values
+above 90, share the same adjacency.
+
+Adjacencies are built the first time they are needed, and are kept as long as the
+data of the edge feature stays loaded. Searches in parallel threads
+(see `tf.search.batch`) build them only once.
+"""
+
+import types
+from threading import Lock
+
+from .syntax import reTp
+
+
+class EdgeIndex:
+    """Adjacencies of edge features, for use in search.
+
+    There is one edge index per TF API, in `S.edgeIndex`.
+
+    Parameters
+    ----------
+    api: object
+        The TF API.
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.indexes = {}
+        self.lock = Lock()
+
+    def adjacency(self, eName, dir, value):
+        """Delivers the adjacency of an edge feature for a value condition.
+
+        Parameters
+        ----------
+        eName: string
+            The name of the edge feature.
+        dir: integer
+            `1` for the outgoing edges of a node (as `E.fff.f`),
+            `-1` for the incoming edges (as `E.fff.t`),
+            `0` for both (as `E.fff.b`).
+        value: any
+            The value condition on the edges, as it comes out of `tf.search.syntax`.
+            Ignored if the edge feature has no values.
+
+        Returns
+        -------
+        dict
+            Keyed by node, valued by the tuple of its neighbours in canonical order.
+            Nodes without neighbours are not in the dictionary.
+        """
+
+        with self.lock:
+            eObj = self.api.Es(eName)
+            data = eObj.data
+            index = self.indexes.get(eName, None)
+            if index is None or index["data"] is not data:
+                index = dict(data=data, values=None, full={}, maps={})
+                self.indexes[eName] = index
+
+            doValues = eObj.doValues
+            if doValues:
+                values = index["values"]
+                if values is None:
+                    values = {v for ms in data.values() for v in ms.values()}
+                    index["values"] = values
+                selected = _selectValues(values, value)
+                key = None if selected == values else frozenset(selected)
+            else:
+                key = None
+
+            maps = index["maps"]
+            adj = maps.get((dir, key), None)
+            if adj is not None:
+                return adj
+
+            full = self._full(eObj, index, dir)
+            if key is None:
+                adj = (
+                    {n: tuple(m for (m, v) in mvs) for (n, mvs) in full.items()}
+                    if doValues
+                    else full
+                )
+            else:
+                adj = {}
+                for (n, mvs) in full.items():
+                    ms = tuple(m for (m, v) in mvs if v in key)
+                    if ms:
+                        adj[n] = ms
+            maps[(dir, key)] = adj
+            return adj
+
+    def memory(self):
+        """The number of neighbours kept in all adjacencies."""
+
+        return sum(
+            len(ms)
+            for index in self.indexes.values()
+            for adj in index["maps"].values()
+            for ms in adj.values()
+        )
+
+    def clear(self):
+        """Removes all adjacencies; they will be built again when needed."""
+
+        with self.lock:
+            self.indexes.clear()
+
+    def _full(self, eObj, index, dir):
+        # the unfiltered adjacency in one direction, with values if there are any
+
+        full = index["full"].get(dir, None)
+        if full is not None:
+            return full
+
+        Crank = self.api.C.rank.data
+        doValues = eObj.doValues
+        data = eObj.data
+        dataInv = eObj.dataInv
+
+        if dir == 0:
+            full = {}
+            for n in set(data) | set(dataInv):
+                if doValues:
+                    result = {}
+                    if n in dataInv:
+                        result.update(dataInv[n].items())
+                    if n in data:
+                        result.update(data[n].items())
+                else:
+                    result = set()
+                    if n in dataInv:
+                        result |= dataInv[n]
+                    if n in data:
+                        result |= data[n]
+                full[n] = result
+        else:
+            full = data if dir == 1 else dataInv
+
+        if doValues:
+            full = {
+                n: tuple(sorted(mvs.items(), key=lambda mv: Crank[mv[0] - 1]))
+                for (n, mvs) in full.items()
+            }
+        else:
+            full = {
+                n: tuple(sorted(ms, key=lambda m: Crank[m - 1]))
+                for (n, ms) in full.items()
+            }
+        index["full"][dir] = full
+        return full
+
+
+def _selectValues(values, value):
+    # the values of an edge feature that satisfy a value condition
+
+    if value is None:
+        return {v for v in values if v is None}
+    if value is True:
+        return set(values)
+    if isinstance(value, types.FunctionType):
+        return {v for v in values if value(v)}
+    if isinstance(value, reTp):
+        return {v for v in values if v is not None and value.search(v)}
+    (ident, vals) = value
+    if ident is None and vals is True:
+        return set(values)
+    if ident:
+        return {v for v in values if v in vals}
+    return {v for v in values if v not in vals}
+
+
+def spinAdjacency(adj):
+    """Makes a spin function for an edge relation out of an adjacency.
+
+    Parameters
+    ----------
+    adj: dict
+        As delivered by `tf.search.edgeindex.EdgeIndex.adjacency`.
+
+    Returns
+    -------
+    function
+        A function that takes the yarns at both sides of the relation and returns
+        them with all nodes removed that have no edge to the other side.
+    """
+
+    def doyarns(yF, yT):
+        newYF = set()
+        newYT = set()
+        if len(yF) <= len(adj):
+            pairs = ((n, adj.get(n, ())) for n in yF)
+        else:
+            pairs = ((n, ms) for (n, ms) in adj.items() if n in yF)
+        for (n, ms) in pairs:
+            found = False
+            for m in ms:
+                if m in yT:
+                    newYT.add(m)
+                    found = True
+            if found:
+                newYF.add(n)
+        return (newYF, newYT)
+
+    return doyarns
@@ -0,0 +1,157 @@
+"""
+# Guarding searches against excessive time and memory
+
+A careless search template may keep the search engine busy for a long time,
+and may fill up the memory with candidate nodes and results.
+Apart from the fail limit on the number of results
+(`tf.parameters.SEARCH_FAIL_FACTOR`), you can guard a search with
+
+*   a *timeout*: a number of seconds after which the search is aborted;
+*   a *cancellation token*: an object that signals that the search must stop;
+    it can be a `threading.Event` (the search stops if it is set),
+    or a function without arguments (the search stops if it returns a true value);
+*   a *memory budget*: an approximate number of bytes that the candidate nodes
+    (the yarns) and the fetched results may occupy.
+
+These guards are checked while the atoms are spun (`tf.search.spin.spinAtoms`),
+while the search space is narrowed down (`tf.search.spin.spinEdges`),
+and while results are stitched together (`tf.search.stitch`).
+
+When a guard fires, a `tf.search.guard.SearchAborted` exception is raised,
+which carries statistics about the search up till that point.
+
+See `tf.search.search.Search.search`.
+"""
+
+from time import monotonic
+
+
+YARN_NODE_BYTES = 64
+"""Approximate memory cost of a node in a yarn (a set of integers)."""
+
+RESULT_NODE_BYTES = 40
+"""Approximate memory cost of a node in a fetched result tuple."""
+
+CHECK_EVERY = 4096
+"""Number of steps after which the guards are checked in the inner loops."""
+
+
+class SearchAborted(Exception):
+    """Raised when a search exceeds its timeout or memory budget or is cancelled.
+
+    Attributes
+    ----------
+    reason: string
+        `timeout`, `cancelled` or `memory`.
+    stats: dict
+        Statistics of the search until it was aborted:
+
+        *   `stage`: the stage of the search: `atoms`, `edges`, `stitch`, `fetch`,
+            or `count`;
+        *   `elapsed`: the number of seconds spent;
+        *   `yarns`: the sizes of the yarns so far, keyed by the number of the atom;
+        *   `results`: the number of results delivered so far;
+        *   `memory`: the estimated amount of memory in bytes.
+    """
+
+    def __init__(self, reason, stats):
+        self.reason = reason
+        self.stats = stats
+        super().__init__(
+            f"Search aborted ({reason}) during {stats['stage']} "
+            f"after {stats['elapsed']:.2f}s"
+        )
+
+
+class Guard:
+    """Checks the timeout, cancellation token and memory budget of a search.
+
+    Parameters
+    ----------
+    timeout: float, optional None
+        Number of seconds after which the search will be aborted.
+    cancel: threading.Event | function, optional None
+        Cancellation token.
+    memory: integer, optional None
+        Memory budget in bytes.
+    """
+
+    def __init__(self, timeout=None, cancel=None, memory=None):
+        self.start = monotonic()
+        self.deadline = None if timeout is None else self.start + timeout
+        self.cancel = cancel
+        self.memory = memory
+        self.stage = None
+        self.yarns = {}
+        self.results = 0
+        self.resultNodes = 0
+        self.steps = 0
+
+    @staticmethod
+    def make(timeout=None, cancel=None, memory=None):
+        """Makes a guard, but only if there is something to guard.
+
+        Returns
+        -------
+        Guard | None
+        """
+
+        if timeout is None and cancel is None and memory is None:
+            return None
+        return Guard(timeout=timeout, cancel=cancel, memory=memory)
+
+    def setStage(self, stage):
+        self.stage = stage
+        self.check()
+
+    def setYarns(self, yarns):
+        self.yarns = {q: len(yarn) for (q, yarn) in yarns.items()}
+        self.check()
+
+    def tick(self):
+        """Counts a step in an inner loop, and checks the guards every so often."""
+
+        self.steps += 1
+        if self.steps >= CHECK_EVERY:
+            self.steps = 0
+            self.check()
+
+    def result(self, size):
+        """Counts a fetched result of `size` nodes."""
+
+        self.results += 1
+        self.resultNodes += size
+        self.tick()
+
+    def memoryUsed(self):
+        return (
+            sum(self.yarns.values()) * YARN_NODE_BYTES
+            + self.resultNodes * RESULT_NODE_BYTES
+        )
+
+    def stats(self):
+        return dict(
+            stage=self.stage,
+            elapsed=monotonic() - self.start,
+            yarns=dict(self.yarns),
+            results=self.results,
+            memory=self.memoryUsed(),
+        )
+
+    def check(self):
+        """Raises `tf.search.guard.SearchAborted` if one of the guards fires."""
+
+        reason = None
+        cancel = self.cancel
+
+        if self.deadline is not None and monotonic() > self.deadline:
+            reason = "timeout"
+        elif cancel is not None and (
+            cancel.is_set() if hasattr(cancel, "is_set") else cancel()
+        ):
+            reason = "cancelled"
+        elif self.memory is not None and self.memoryUsed() > self.memory:
+            reason = "memory"
+
+        if reason is not None:
+            raise SearchAborted(reason, self.stats())
@@ -0,0 +1,357 @@
+"""
+# Prepared search templates
+
+When the same template is run over and over again, with different values in its
+feature conditions or with different custom sets, most of the work of a search
+is the same every time: parsing the template, checking its semantics,
+spinning the atoms that do not depend on the variable parts,
+and choosing a plan to stitch the results together.
+
+`tf.search.search.Search.prepare` does that work once, and delivers a
+`tf.search.prepared.PreparedSearch`, which you can run as often as you like.
+
+## Parameters
+
+In a prepared template, a feature value of the form `$name` is a *parameter*:
+
+```
+verse number>$n
+  word sp=$pos lex#$lex
+  word gloss~$pattern
+```
+
+When you run the template, you pass the values of the parameters:
+
+``` python
+P = S.prepare(template)
+results = P.run(params=dict(n=3, pos="verb", lex=("W", "B"), pattern="^in"))
+```
+
+*   after `=` and `#`: a single value or a collection of alternative values;
+*   after `<` and `>`: an integer;
+*   after `~`: a regular expression, as a string or compiled.
+
+The names of the parameters of a prepared template are in `P.params`.
+
+Parameters may also occur in quantifiers.
+
+!!! caution "Limitations"
+    Parameters are not recognized in the values of edge features;
+    there `$name` is an ordinary value.
+
+## What is reused
+
+*   The template is parsed and checked only once.
+*   The yarns of the atoms without parameters are computed once.
+    Atoms whose node type is a custom set, and atoms with quantifiers,
+    are computed again if you run with other sets than the prepared ones.
+*   The plan to stitch the results is chosen in the first run,
+    and later runs use the same plan.
+    If later runs bind very different values, the plan may be less efficient.
+    Pass `replan=True` to choose a new plan, which will then be reused.
+
+The narrowing down of the search space by spinning edges is done in every run,
+because it depends on the yarns of all atoms.
+
+## Custom sets
+
+You can run a prepared template with other sets under the same names.
+The basic relations are implemented differently for sets of slots,
+sets of non-slots and mixed sets. If the new sets differ in that respect
+from the sets with which the template has been prepared, the template will be
+prepared again for such sets, and that preparation will be reused as well.
+
+## Caching
+
+`S.prepare()` keeps prepared templates in `S.cache`
+(see `tf.search.cache`), so calling it again with the same template
+(and the same sets) delivers the same prepared search.
+"""
+
+import copy
+import re
+from threading import Lock
+
+from .searchexe import SearchExe
+from .syntax import Param, bindParam
+from .relations import setNature
+from .spin import _spinAtom, spinEdges
+from .stitch import setStrategy, stitch
+from .guard import Guard, YARN_NODE_BYTES
+from ..core.timestamp import DEEP
+
+
+paramUsePat = r"([a-zA-Z0-9-@_]+)([=#<>~])\$([A-Za-z_][A-Za-z0-9_]*)(?=\s|$)"
+paramUseRe = re.compile(paramUsePat)
+
+
+class PreparedSearch:
+    """A search template that has been prepared for repeated execution.
+
+    Do not make these objects yourself, use `tf.search.search.Search.prepare`.
+
+    Parameters
+    ----------
+    api: object
+        The TF API.
+    searchTemplate: string
+        The template, with parameters.
+    sets: dict, optional None
+        The custom sets used in the template.
+    shallow: boolean | integer, optional False
+        As in `tf.search.search.Search.search`.
+    strategy: string, optional None
+        As in `tf.search.search.Search.study`.
+    silent: string, optional tf.core.timestamp.DEEP
+        See `tf.core.timestamp.Timestamp`.
+    """
+
+    def __init__(
+        self,
+        api,
+        searchTemplate,
+        sets=None,
+        shallow=False,
+        strategy=None,
+        silent=DEEP,
+    ):
+        self.api = api
+        self.searchTemplate = searchTemplate
+        self.sets = sets
+        self.shallow = shallow
+        self.strategy = strategy
+        self.silent = silent
+        self.compiled = {}
+        self.lock = Lock()
+        self.exe = None
+        self.uses = paramUses(searchTemplate)
+
+        compiled = self._compile(sets)
+        self.good = compiled is not None
+        self.params = () if compiled is None else compiled["params"]
+
+    def run(
+        self,
+        params=None,
+        sets=None,
+        limit=None,
+        sort=False,
+        replan=False,
+        timeout=None,
+        cancel=None,
+        memory=None,
+    ):
+        """Runs the prepared template with bound parameters.
+
+        Parameters
+        ----------
+        params: dict, optional None
+            The values of the parameters, keyed by their names (without the `$`).
+        sets: dict, optional None
+            Custom sets under the names used in the template.
+            If `None`, the sets with which the template has been prepared are used.
+        limit: integer, optional None
+            As in `tf.search.search.Search.search`.
+        sort: boolean, optional False
+            As in `tf.search.search.Search.search`.
+        replan: boolean, optional False
+            Whether to choose a new plan for stitching the results,
+            instead of the plan of the first run.
+        timeout, cancel, memory: optional None
+            Guards against excessive time and memory,
+            see `tf.search.search.Search.search`.
+
+        Returns
+        -------
+        generator | tuple | set
+            As in `tf.search.search.Search.search`.
+        """
+
+        empty = set() if self.shallow else []
+        if not self.good:
+            return empty
+
+        if sets is None:
+            sets = self.sets
+        compiled = self._compile(sets)
+        if compiled is None:
+            return empty
+
+        base = compiled["exe"]
+        exe = copy.copy(base)
+        exe.sets = sets
+        exe.guard = Guard.make(timeout=timeout, cancel=cancel, memory=memory)
+        exe.analysis = None
+        exe.atomCache = {}
+        exe.good = True
+        exe.qedges = list(compiled["qedges"])
+        exe.yarns = {}
+        exe.spreads = {}
+        exe.spreadsC = {}
+        exe.uptodate = {}
+        exe.results = None
+        setStrategy(exe, base.strategyName)
+        self.exe = exe
+
+        params = {} if params is None else params
+        if not self._checkParams(exe, params):
+            exe.good = False
+            return exe.fetch()
+        exe.params = params
+
+        paramAtoms = compiled["paramAtoms"]
+        staticYarns = compiled["yarns"]
+        setAtoms = compiled["setAtoms"]
+        sameSets = sets is compiled["sets"]
+
+        for q in range(len(exe.qnodes)):
+            if q in paramAtoms or (q in setAtoms and not sameSets):
+                _spinAtom(exe, q)
+            else:
+                exe.yarns[q] = staticYarns[q].copy()
+
+        spinEdges(exe)
+
+        plan = None if replan else compiled["plan"]
+        if plan is None:
+            stitch(exe)
+            if exe.good:
+                compiled["plan"] = (exe.stitchPlan, list(exe.qedges), exe.firstMulti)
+        else:
+            (stitchPlan, exe.qedges, exe.firstMulti) = plan
+            stitch(exe, plan=stitchPlan)
+
+        return exe.fetch(limit=limit, sort=sort)
+
+    def memory(self):
+        """Estimates the memory occupied by the yarns that are kept for reuse.
+
+        Returns
+        -------
+        integer
+            The number of bytes.
+        """
+
+        total = 0
+        for compiled in self.compiled.values():
+            for yarn in compiled["yarns"].values():
+                total += len(yarn) * YARN_NODE_BYTES
+        return total
+
+    def _compile(self, sets):
+        # Parses the template and spins the atoms without parameters,
+        # once for every kind of custom sets (see the module docs).
+
+        maxSlot = self.api.F.otype.maxSlot
+        setInfo = (
+            {}
+            if not sets
+            else {name: setNature(nodes, maxSlot) for (name, nodes) in sets.items()}
+        )
+        key = tuple(sorted(setInfo.items()))
+
+        with self.lock:
+            compiled = self.compiled.get(key, None)
+            if compiled is not None:
+                return compiled
+
+            searchTemplate = self.searchTemplate
+            exe = SearchExe(
+                self.api,
+                searchTemplate,
+                outerTemplate=searchTemplate,
+                quKind=None,
+                offset=0,
+                sets=sets,
+                shallow=self.shallow,
+                silent=self.silent,
+                showQuantifiers=False,
+                setInfo=setInfo,
+                params={},
+            )
+            setStrategy(exe, self.strategy)
+            if exe.good:
+                exe._parse()
+                exe._prepare()
+            if not exe.good:
+                return None
+
+            paramAtoms = set()
+            setAtoms = set()
+            for (q, (otype, features, src, quantifiers)) in enumerate(exe.qnodes):
+                if any(isinstance(val, Param) for val in features.values()):
+                    paramAtoms.add(q)
+                for (quKind, quTemplates, parentName, ln) in quantifiers:
+                    if any(paramUseRe.search(tpl) for tpl in quTemplates):
+                        paramAtoms.add(q)
+                if quantifiers or (sets is not None and otype in sets):
+                    setAtoms.add(q)
+
+            yarns = {}
+            for q in range(len(exe.qnodes)):
+                if q not in paramAtoms:
+                    _spinAtom(exe, q)
+                    yarns[q] = exe.yarns[q]
+            exe.atomCache.clear()
+            exe.yarns = {}
+
+            compiled = dict(
+                exe=exe,
+                qedges=list(exe.qedges),
+                sets=sets,
+                params=tuple(sorted({use[2] for use in self.uses})),
+                paramAtoms=paramAtoms,
+                setAtoms=setAtoms,
+                yarns=yarns,
+                plan=None,
+            )
+            self.compiled[key] = compiled
+            return compiled
+
+    def _checkParams(self, exe, params):
+        # Checks whether all parameters have suitable values.
+
+        TF = self.api.TF
+        error = TF.error
+        features = TF.features
+        _msgCache = exe._msgCache
+
+        good = True
+        for (fName, comp, name) in sorted(self.uses):
+            if name not in params:
+                error(f'No value for parameter "${name}"', cache=_msgCache)
+                good = False
+                continue
+            if fName not in features:
+                continue
+            value = params[name]
+            dataType = features[fName].dataType
+            if bindParam(Param(name, comp), value, dataType) is None:
+                error(
+                    f'Wrong value for parameter "${name}" of feature "{fName}": '
+                    f"{value!r}",
+                    cache=_msgCache,
+                )
+                good = False
+        return good
+
+
+def paramUses(searchTemplate):
+    """Finds the parameters in a template.
+
+    Parameters
+    ----------
+    searchTemplate: string
+        A template with parameters, see `tf.search.prepared`.
+
+    Returns
+    -------
+    set
+        Triples of feature name, comparison and parameter name.
+    """
+
+    return {
+        match.groups()
+        for line in searchTemplate.split("\n")
+        for match in paramUseRe.finditer(line)
+    }
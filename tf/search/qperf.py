@@ -0,0 +1,740 @@
+"""
+# Measuring the performance of search
+
+This module measures how long the search engine takes for a suite of queries,
+compares the measurements with a stored baseline, and finds out which settings
+of the performance parameters (see `tf.search.search.Search.tweakPerformance`)
+work best for a corpus.
+
+It can be used from Python, with a loaded corpus, and from the command line,
+as `tf-qperf`.
+
+## Query suites
+
+A suite is a YAML file with a `queries` section, in which every query has a name
+and a template, and optionally a limit on the number of results to fetch:
+
+``` yaml
+features: sp letters
+queries:
+  verbs: |
+    verse
+      word sp=verb
+  adjacent:
+    template: |
+      word sp=art
+      <: word sp=subs
+    limit: 1000
+```
+
+The `features` key is only used for corpora that are loaded from a plain
+TF directory: it lists the features to load (default: all features).
+
+A suite may also be a directory with a `.txt` file per query,
+where lines of the form `@limit=n` set the limit.
+That is the format of the queries in `test/generic/qperf`.
+
+## Measurements
+
+Every query is executed with the phases of the search timed separately
+(see `tf.search.analyze`): `parse`, `prepare`, `atoms`, `edges`, `stitch` and
+`fetch`. The first five make up the `study` time.
+Every run starts cold: before it, the parse cache, the query cache and the
+edge index of the search API are cleared (see `tf.search.qperf.measureQuery`),
+so that the parse and study times do not depend on the runs before.
+If a query is run several times (`repeat`), the fastest time of every phase
+is taken.
+
+## Baselines
+
+Measurements can be saved as a baseline in a YAML file.
+When measurements are compared with a baseline,
+
+*   a different number of results is always reported as a failure;
+*   a slower study or fetch is reported as a regression if it exceeds the
+    baseline by more than a fraction `tolerance` *and* by more than `floor`
+    seconds; the floor prevents noise in very fast queries from counting as
+    regressions.
+
+## Sweeps
+
+A sweep runs the suite for every combination of the given values of the
+performance parameters, checks that all combinations deliver the same numbers
+of results, and ranks them by total time.
+The best combination is recommended.
+
+## Command line
+
+``` sh
+tf-qperf [suite] [corpus] [options] [param=values ...]
+```
+
+Corpus, one of:
+
+*   `--app=appspec`: a TF app, loaded with `tf.app.use`, e.g. `--app=ETCBC/bhsa`;
+*   `--tf=directory`: plain TF data in a directory;
+*   `--synthetic`: a small synthetic corpus, generated on the fly;
+    this is the default.
+
+If no suite is given, a built-in suite for the synthetic corpus is used.
+
+Options:
+
+*   `--save=file.yaml`: save the measurements as a baseline;
+*   `--baseline=file.yaml`: compare the measurements with a baseline;
+    the exit status is `1` if there are failures or regressions;
+*   `--tolerance=fraction`: default `0.25`;
+*   `--floor=seconds`: default `0.01`;
+*   `--repeat=n`: run every query `n` times; default `1`;
+*   `--queries=name,name`: only run these queries.
+
+Performance parameters, e.g. `yarnRatio=1.1,1.25,1.5 tryLimitFrom=10,40`:
+comma separated values. If any parameter has more than one value,
+a sweep is done. For `yarnRatio` you may pass `-` to get a standard range.
+"""
+
+import sys
+import collections
+from itertools import product
+from random import Random
+from tempfile import TemporaryDirectory
+
+from .searchexe import SearchExe
+from .analyze import Analysis
+from ..core.files import readYaml, writeYaml, fileExists, isDir, scanDir, fileOpen
+from ..core.helpers import console
+from ..core.timestamp import DEEP
+
+
+__pdoc__ = {}
+
+STUDY_PHASES = ("parse", "prepare", "atoms", "edges", "stitch")
+"""The phases that make up the study of a query."""
+
+TOLERANCE = 0.25
+"""Fraction by which a query may be slower than its baseline."""
+
+FLOOR = 0.01
+"""Number of seconds by which a query may be slower than its baseline anyway."""
+
+YARN_RATIO_RANGE = (1.0, 1.1, 1.2, 1.25, 1.3, 1.4, 1.5, 1.6)
+"""Standard range of values for the `yarnRatio` parameter in a sweep."""
+
+SYNTHETIC_SEED = 1
+"""Seed for generating the synthetic corpus, so that it is always the same."""
+
+SYNTHETIC_SUITE = dict(
+    basic="verse\n  word sp=verb",
+    embedding="book\n  chapter\n    verse\n      phrase\n        word letters=elohim",
+    adjacent="word sp=art\n<: word sp=subs",
+    without="verse\n/without/\n  word sp=verb\n/-/",
+    where="phrase\n/where/\n  word sp=art\n/have/\n  word sp=art\n/-/",
+    edge="verse\n-crossref>80> verse",
+    mother="p1:phrase\n-mother> p2:phrase\np1 << p2",
+    order="verse\n  w1:word sp=verb\n  w2:word sp=subs\n  w1 < w2",
+    comparison="p:phrase\nw:word\nv:word\np [[ w\np [[ v\nw .letters. v\nw < v",
+    near="word letters=elohim\n<2: word",
+    overlap="phrase\n&& sentence",
+    regex="word letters~^b",
+)
+"""Queries for the synthetic corpus, see `tf.search.qperf.makeSynthetic`."""
+
+
+def makeSynthetic(location, scale=1, seed=SYNTHETIC_SEED):
+    """Generates a small synthetic corpus.
+
+    The corpus has books, chapters, verses, sentences, phrases and words,
+    a few node features on words and verses, and two edge features,
+    one of them with values. Phrases may have gaps.
+
+    Parameters
+    ----------
+    location: string
+        The directory where the TF files will be written.
+    scale: integer, optional 1
+        The number of books is three times the scale.
+    seed: integer, optional `SYNTHETIC_SEED`
+        The seed for the random choices.
+
+    Returns
+    -------
+    boolean
+        Whether the corpus has been saved successfully.
+    """
+
+    from ..fabric import Fabric
+
+    rnd = Random(seed)
+    choice = rnd.choice
+    randint = rnd.randint
+
+    LETTERS = "ab bara elohim et ha shamayim ve aretz ki tov".split()
+    POS = "verb subs prep art conj".split()
+    TYPES = "book chapter verse sentence phrase".split()
+
+    otype = {}
+    oslots = {}
+    features = {
+        name: {} for name in "book chapter verse letters sp gloss after number".split()
+    }
+    structure = []
+
+    w = 0
+    for b in range(1, 3 * scale + 1):
+        bWords = []
+        for c in range(1, 4 + b % 3 + 1):
+            cWords = []
+            for v in range(1, 6):
+                vWords = []
+                for s in range(randint(1, 3)):
+                    sWords = []
+                    for k in range(randint(2, 7)):
+                        w += 1
+                        letters = choice(LETTERS)
+                        features["letters"][w] = letters
+                        features["sp"][w] = choice(POS)
+                        features["gloss"][w] = letters.upper()
+                        features["after"][w] = " "
+                        sWords.append(w)
+                    structure.append(("sentence", sWords, None))
+                    vWords.extend(sWords)
+                structure.append(("verse", vWords, (b, c, v)))
+                cWords.extend(vWords)
+            structure.append(("chapter", cWords, (b, c)))
+            bWords.extend(cWords)
+        structure.append(("book", bWords, (b,)))
+
+    maxSlot = w
+    for n in range(1, maxSlot + 1):
+        otype[n] = "word"
+
+    i = 1
+    while i <= maxSlot:
+        k = randint(1, 4)
+        structure.append(("phrase", list(range(i, min(maxSlot, i + k - 1) + 1)), None))
+        i += k
+    structure.append(("phrase", [3, 4, 7, 8], None))
+
+    n = maxSlot
+    for (tp, words, section) in sorted(
+        structure, key=lambda x: (TYPES.index(x[0]), x[1][0])
+    ):
+        n += 1
+        otype[n] = tp
+        oslots[n] = set(words)
+        if tp == "book":
+            features["book"][n] = f"Book{section[0]}"
+        elif tp == "chapter":
+            features["chapter"][n] = section[1]
+        elif tp == "verse":
+            features["verse"][n] = section[2]
+            features["number"][n] = section[2]
+
+    verses = [m for m in otype if otype[m] == "verse"]
+    crossref = {}
+    for v in verses:
+        crossref[v] = {
+            t: choice((70, 80, 95, 100)) for t in rnd.sample(verses, 2) if t != v
+        }
+    phrases = [m for m in otype if otype[m] == "phrase"]
+    mother = {}
+    for p in phrases[1:]:
+        if rnd.random() < 0.5:
+            mother[p] = {choice(phrases)}
+
+    strFeatures = "book letters sp gloss after".split()
+    intFeatures = "chapter verse number".split()
+    metaData = {
+        "": dict(name="synthetic", description="synthetic corpus for tf-qperf"),
+        "otype": dict(valueType="str"),
+        "oslots": dict(valueType="str"),
+        "otext": {
+            "sectionTypes": "book,chapter,verse",
+            "sectionFeatures": "book,chapter,verse",
+            "fmt:text-orig-full": "{letters}{after}",
+        },
+        "crossref": dict(valueType="int", edgeValues=True),
+        "mother": dict(valueType="str"),
+    }
+    for feat in strFeatures:
+        metaData[feat] = dict(valueType="str")
+    for feat in intFeatures:
+        metaData[feat] = dict(valueType="int")
+
+    TF = Fabric(locations=location, modules=[""], silent=DEEP)
+    return TF.save(
+        nodeFeatures=dict(otype=otype, **features),
+        edgeFeatures=dict(oslots=oslots, crossref=crossref, mother=mother),
+        metaData=metaData,
+        location=location,
+        module="",
+        silent=DEEP,
+    )
+
+
+def readSuite(suite):
+    """Reads a suite of queries.
+
+    Parameters
+    ----------
+    suite: string | dict
+        A YAML file or a directory of `.txt` files, see the module docs;
+        or a dictionary of queries, keyed by name, with templates as values.
+
+    Returns
+    -------
+    tuple
+        The list of features to load (or `None`) and a dictionary of queries,
+        keyed by name, valued by a tuple of template and limit.
+    """
+
+    if type(suite) is dict:
+        return (None, {name: (template, None) for (name, template) in suite.items()})
+
+    features = None
+    queries = {}
+
+    if isDir(suite):
+        for entry in sorted(scanDir(suite), key=lambda e: e.name):
+            name = entry.name
+            if not (entry.is_file() and name.endswith(".txt")):
+                continue
+            limit = None
+            lines = []
+            with fileOpen(f"{suite}/{name}") as fh:
+                for line in fh:
+                    if line.startswith("@limit="):
+                        limit = int(line[7:].strip())
+                    elif not line.startswith("@"):
+                        lines.append(line)
+            queries[name[0:-4]] = ("".join(lines), limit)
+        return (features, queries)
+
+    if not fileExists(suite):
+        console(f"No such query suite: {suite}", error=True)
+        return (None, None)
+
+    data = readYaml(asFile=suite, plain=True) or {}
+    features = data.get("features", None)
+    if type(features) is str:
+        features = features.split()
+
+    for (name, spec) in (data.get("queries", None) or {}).items():
+        if type(spec) is str:
+            queries[name] = (spec, None)
+        else:
+            queries[name] = (spec["template"], spec.get("limit", None))
+    return (features, queries)
+
+
+def measureQuery(api, template, limit=None, sets=None, repeat=1):
+    """Measures the execution of a single query.
+
+    Parameters
+    ----------
+    api: object
+        The TF API of a loaded corpus.
+    template: string
+        The search template.
+    limit: integer, optional None
+        The maximum number of results to fetch.
+    sets: dict, optional None
+        Custom sets, as in `tf.search.search.Search.search`.
+    repeat: integer, optional 1
+        The number of times to run the query; the fastest times are taken.
+
+    Returns
+    -------
+    dict | None
+        With keys `results` (the number of results), `study` and `fetch`
+        (seconds), and `phases` (seconds per phase).
+        `None` if the template has errors.
+
+    Notes
+    -----
+    Before every run, the parsed templates (`S.parseCache`), the cached results
+    (`S.cache`) and the adjacencies of edge features (`S.edgeIndex`) are removed,
+    so every run does the full work of parsing and studying the template.
+    """
+
+    S = api.S
+    phases = None
+    results = None
+
+    for i in range(max(repeat, 1)):
+        S.parseCache.clear()
+        S.cache.clear()
+        S.edgeIndex.clear()
+        exe = SearchExe(
+            api,
+            template,
+            outerTemplate=template,
+            quKind=None,
+            offset=0,
+            sets=sets,
+            silent=DEEP,
+            setInfo={},
+        )
+        exe.analysis = Analysis(stitchCounts=False)
+        data = exe.analyze(limit=limit, show=False)
+        if data is None:
+            return None
+        results = data["results"]
+        thesePhases = data["phases"]
+        phases = (
+            thesePhases
+            if phases is None
+            else {p: min(t, thesePhases.get(p, t)) for (p, t) in phases.items()}
+        )
+
+    return dict(
+        results=results,
+        study=sum(phases.get(p, 0) for p in STUDY_PHASES),
+        fetch=phases.get("fetch", 0),
+        phases=phases,
+    )
+
+
+def runSuite(api, queries, repeat=1, sets=None, show=True):
+    """Measures all queries of a suite.
+
+    Parameters
+    ----------
+    api: object
+        The TF API of a loaded corpus.
+    queries: dict
+        Queries as delivered by `tf.search.qperf.readSuite`.
+    repeat: integer, optional 1
+        See `tf.search.qperf.measureQuery`.
+    sets: dict, optional None
+        Custom sets, as in `tf.search.search.Search.search`.
+    show: boolean, optional True
+        Whether to show a line per query.
+
+    Returns
+    -------
+    dict
+        Measurements keyed by query name,
+        see `tf.search.qperf.measureQuery`.
+        Queries with errors are left out.
+    """
+
+    measurements = {}
+    for (name, (template, limit)) in queries.items():
+        m = measureQuery(api, template, limit=limit, sets=sets, repeat=repeat)
+        if m is None:
+            console(f"{name:<30} has errors", error=True)
+            continue
+        measurements[name] = m
+        if show:
+            console(
+                f"{name:<30} {m['results']:>8} results "
+                f"study {m['study']:>8.4f}s fetch {m['fetch']:>8.4f}s"
+            )
+    return measurements
+
+
+def compareBaseline(measurements, baseline, tolerance=TOLERANCE, floor=FLOOR):
+    """Compares measurements with a baseline.
+
+    Parameters
+    ----------
+    measurements: dict
+        As delivered by `tf.search.qperf.runSuite`.
+    baseline: dict
+        Measurements as saved earlier, see `tf.search.qperf.saveBaseline`.
+    tolerance: float, optional `TOLERANCE`
+        Fraction by which a query may be slower than its baseline.
+    floor: float, optional `FLOOR`
+        Number of seconds by which a query may be slower than its baseline anyway.
+
+    Returns
+    -------
+    list
+        Problems as tuples `(name, kind, message)`, where kind is
+        `results` (the number of results differs), `slower` (a regression)
+        or `new` (the query is not in the baseline; this is not a problem).
+    """
+
+    problems = []
+    for (name, m) in measurements.items():
+        base = baseline.get(name, None)
+        if base is None:
+            problems.append((name, "new", "not in the baseline"))
+            continue
+        if m["results"] != base["results"]:
+            problems.append(
+                (name, "results", f"{m['results']} results instead of {base['results']}")
+            )
+        for kind in ("study", "fetch"):
+            (now, then) = (m[kind], base[kind])
+            if now > then * (1 + tolerance) and now - then > floor:
+                problems.append(
+                    (name, "slower", f"{kind} {now:.4f}s instead of {then:.4f}s")
+                )
+    return problems
+
+
+def saveBaseline(measurements, path, perfParams=None):
+    """Saves measurements as a baseline in a YAML file.
+
+    Parameters
+    ----------
+    measurements: dict
+        As delivered by `tf.search.qperf.runSuite`.
+    path: string
+        The file to write.
+    perfParams: dict, optional None
+        The performance parameters with which the measurements have been made.
+    """
+
+    data = dict(perfParams=dict(perfParams or {}), queries=measurements)
+    writeYaml(data, asFile=path)
+
+
+def readBaseline(path):
+    """Reads a baseline that has been saved by `tf.search.qperf.saveBaseline`.
+
+    Returns
+    -------
+    dict
+        Measurements keyed by query name.
+    """
+
+    data = readYaml(asFile=path, plain=True) or {}
+    return data.get("queries", None) or {}
+
+
+def sweep(api, queries, grid, repeat=1, sets=None):
+    """Runs a suite for combinations of performance parameters.
+
+    Parameters
+    ----------
+    api: object
+        The TF API of a loaded corpus.
+    queries: dict
+        Queries as delivered by `tf.search.qperf.readSuite`.
+    grid: dict
+        For each performance parameter a sequence of values to try.
+        Parameters that are not in the grid keep their current values.
+    repeat: integer, optional 1
+        See `tf.search.qperf.measureQuery`.
+    sets: dict, optional None
+        Custom sets, as in `tf.search.search.Search.search`.
+
+    Returns
+    -------
+    list
+        Tuples `(settings, total, consistent)`, sorted by total time:
+        the parameter settings, the total time of the suite,
+        and whether all queries had the same numbers of results as with
+        the first settings.
+        The first consistent entry is the recommended setting.
+    """
+
+    S = api.S
+    original = dict(S.perfParams)
+    names = sorted(grid)
+    outcome = []
+    reference = None
+
+    try:
+        for values in product(*(grid[name] for name in names)):
+            settings = dict(zip(names, values))
+            S.tweakPerformance(silent=DEEP, **settings)
+            measurements = runSuite(api, queries, repeat=repeat, sets=sets, show=False)
+            counts = {name: m["results"] for (name, m) in measurements.items()}
+            if reference is None:
+                reference = counts
+            total = sum(m["study"] + m["fetch"] for m in measurements.values())
+            outcome.append((settings, total, counts == reference))
+            settingsRep = " ".join(f"{k}={v}" for (k, v) in settings.items())
+            console(f"{settingsRep:<50} {total:>8.4f}s")
+    finally:
+        S.tweakPerformance(silent=DEEP, **original)
+
+    return sorted(outcome, key=lambda x: x[1])
+
+
+def _parseArgs(cargs):
+    perfDefaults = SearchExe.perfDefaults
+    options = dict(
+        suite=None,
+        app=None,
+        tf=None,
+        synthetic=False,
+        save=None,
+        baseline=None,
+        tolerance=TOLERANCE,
+        floor=FLOOR,
+        repeat=1,
+        queries=None,
+    )
+    optionTypes = dict(tolerance=float, floor=float, repeat=int)
+    grid = {}
+
+    for arg in cargs:
+        if arg.startswith("--"):
+            (key, value) = arg[2:].split("=", 1) if "=" in arg else (arg[2:], True)
+            if key not in options or key == "suite":
+                console(f"Unknown option {arg}", error=True)
+                return None
+            if key == "queries":
+                value = value.split(",")
+            elif key in optionTypes:
+                try:
+                    value = optionTypes[key](value)
+                except ValueError:
+                    console(f"Wrong value for option {arg}", error=True)
+                    return None
+            options[key] = value
+        elif "=" in arg:
+            (key, value) = arg.split("=", 1)
+            if key not in perfDefaults:
+                console(f"Unknown performance parameter {key}", error=True)
+                return None
+            typ = float if key == "yarnRatio" else int
+            if key == "yarnRatio" and value == "-":
+                grid[key] = YARN_RATIO_RANGE
+                continue
+            try:
+                grid[key] = tuple(typ(v) for v in value.split(","))
+            except ValueError:
+                console(f"Wrong value for performance parameter {arg}", error=True)
+                return None
+        elif options["suite"] is None:
+            options["suite"] = arg
+        else:
+            console(f"Superfluous argument {arg}", error=True)
+            return None
+
+    if sum(1 for x in ("app", "tf", "synthetic") if options[x]) > 1:
+        console("Choose only one of --app, --tf, --synthetic", error=True)
+        return None
+
+    return (options, grid)
+
+
+def _loadCorpus(options, features, tempDir):
+    if options["app"]:
+        from ..app import use
+
+        A = use(options["app"], silent=DEEP)
+        return None if A is None else A.api
+
+    from ..fabric import Fabric
+
+    location = options["tf"]
+    if not location:
+        location = tempDir
+        console("generating synthetic corpus ...")
+        if not makeSynthetic(location):
+            return None
+
+    TF = Fabric(locations=location, modules=[""], silent=DEEP)
+    return TF.loadAll(silent=DEEP) if features is None else TF.load(
+        features, silent=DEEP
+    )
+
+
+HELP = __doc__.split("## Command line")[1].strip()
+
+
+def main(cargs=sys.argv[1:]):
+    if any(arg in {"--help", "-help", "-h", "?", "-?"} for arg in cargs):
+        console(HELP)
+        return 0
+
+    parsed = _parseArgs(cargs)
+    if parsed is None:
+        console(HELP)
+        return 2
+    (options, grid) = parsed
+
+    suite = options["suite"]
+    if suite is None:
+        if options["app"] or options["tf"]:
+            console("No query suite given", error=True)
+            return 2
+        (features, queries) = readSuite(SYNTHETIC_SUITE)
+    else:
+        (features, queries) = readSuite(suite)
+    if queries is None:
+        return 2
+
+    if options["queries"]:
+        names = set(options["queries"])
+        queries = {k: v for (k, v) in queries.items() if k in names}
+    if not queries:
+        console("No queries to run", error=True)
+        return 2
+
+    repeat = options["repeat"]
+
+    with TemporaryDirectory() as tempDir:
+        api = _loadCorpus(options, features, tempDir)
+        if not api:
+            console("Could not load the corpus", error=True)
+            return 1
+
+        S = api.S
+
+        if any(len(values) > 1 for values in grid.values()):
+            outcome = sweep(api, queries, grid, repeat=repeat)
+            best = [x for x in outcome if x[2]]
+            for (settings, total, consistent) in outcome:
+                if not consistent:
+                    settingsRep = " ".join(f"{k}={v}" for (k, v) in settings.items())
+                    console(f"{settingsRep}: different results!", error=True)
+            if not best:
+                return 1
+            (settings, total, consistent) = best[0]
+            settingsRep = ", ".join(f"{k}={v}" for (k, v) in settings.items())
+            console(f"Recommended: S.tweakPerformance({settingsRep})  {total:.4f}s")
+            return 0 if len(best) == len(outcome) else 1
+
+        if grid:
+            S.tweakPerformance(
+                silent=DEEP, **{k: values[0] for (k, values) in grid.items()}
+            )
+
+        measurements = runSuite(api, queries, repeat=repeat)
+        total = sum(m["study"] + m["fetch"] for m in measurements.values())
+        console(f"{len(measurements)} queries in {total:.4f}s")
+
+        if options["save"]:
+            saveBaseline(measurements, options["save"], perfParams=S.perfParams)
+            console(f"Baseline saved to {options['save']}")
+
+        status = 0 if len(measurements) == len(queries) else 1
+
+        if options["baseline"]:
+            baseline = readBaseline(options["baseline"])
+            problems = compareBaseline(
+                measurements,
+                baseline,
+                tolerance=options["tolerance"],
+                floor=options["floor"],
+            )
+            failures = collections.Counter()
+            for (name, kind, msg) in problems:
+                console(f"{name:<30} {kind:<8} {msg}", error=kind != "new")
+                if kind != "new":
+                    failures[kind] += 1
+            if failures:
+                status = 1
+                console(
+                    ", ".join(f"{kind}: {n}" for (kind, n) in sorted(failures.items())),
+                    error=True,
+                )
+            else:
+                console("No regressions with respect to the baseline")
+
+        return status
+
+
+__pdoc__["main"] = HELP
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,11 +11,28 @@ import array
 from ..parameters import OTYPE, OSLOTS, OMAP
 from ..core.helpers import makeIndex
 from ..core.timestamp import DEEP
-from .syntax import reTp
+from .edgeindex import spinAdjacency
 
 # LOW-LEVEL NODE RELATIONS SEMANTICS ###
 
 
+def setNature(nodes, maxSlot):
+    """Whether a custom set consists of slots, of non-slots, or of both.
+
+    Returns
+    -------
+    boolean | None
+        `True` if all nodes are slots, `False` if none of them are slots,
+        `None` if the set contains slots and non-slots.
+    """
+
+    if all(n <= maxSlot for n in nodes):
+        return True
+    if all(n > maxSlot for n in nodes):
+        return False
+    return None
+
+
 def _l_em(n):
     return ()
 
@@ -74,17 +91,9 @@ def basicRelations(searchExe, api):
         if sets is not None and nType in sets:
             if nType in setInfo:
                 return setInfo[nType]
-            nodes = sets[nType]
-            allSlots = all(n < maxSlotP for n in nodes)
-            if allSlots:
-                setInfo[nType] = True
-                return True
-            allNonSlots = all(n > maxSlot for n in nodes)
-            if allNonSlots:
-                setInfo[nType] = False
-                return False
-            setInfo[nType] = None
-            return None
+            nature = setNature(sets[nType], maxSlot)
+            setInfo[nType] = nature
+            return nature
         return nType == slotType
 
     # EQUAL
@@ -1350,91 +1359,46 @@ def basicRelations(searchExe, api):
     # EDGES
 
     def makeEdgeMaps(efName):
-        def edgeAccess(eFunc, doValues, value):
-            if doValues:
-                if value is None:
-
-                    def func(n):
-                        return (m[0] for m in eFunc(n) if m[1] is None)
-
-                    return func
-                elif value is True:
-
-                    def func(n):
-                        return (m[0] for m in eFunc(n))
-
-                    return func
-                elif isinstance(value, types.FunctionType):
+        # the edges are looked up in adjacencies per direction and value condition,
+        # see tf.search.edgeindex
 
-                    def func(n):
-                        return (m[0] for m in eFunc(n) if value(m[1]))
-
-                    return func
-                elif isinstance(value, reTp):
-
-                    def func(n):
-                        return (
-                            m[0]
-                            for m in eFunc(n)
-                            if value is not None and value.search(m[1])
-                        )
-
-                    return func
-                else:
-                    (ident, value) = value
-                    if ident is None and value is True:
-
-                        def func(n):
-                            return (m[0] for m in eFunc(n))
-
-                        return func
-                    elif ident:
-
-                        def func(n):
-                            return (m[0] for m in eFunc(n) if m[1] in value)
+        def edgeAccess(dir, value):
+            def edgeR(fTp, tTp):
+                adj = api.S.edgeIndex.adjacency(efName, dir, value)
+                get = adj.get
 
-                        return func
-                    else:
+                def func(n):
+                    return get(n, ())
 
-                        def func(n):
-                            return (m[0] for m in eFunc(n) if m[1] not in value)
+                return func
 
-                        return func
-            else:
+            return edgeR
 
-                def func(n):
-                    return eFunc(n)
+        def edgeSpin(dir, value):
+            def spin(fTp, tTp):
+                return spinAdjacency(api.S.edgeIndex.adjacency(efName, dir, value))
 
-                return func
+            return spin
 
         def edgeRV(value):
-            def edgeR(fTp, tTp):
-                Es = api.Es
-                Edata = Es(efName)
-                doValues = Edata.doValues
-                return edgeAccess(Edata.f, doValues, value)
-
-            return edgeR
+            return edgeAccess(1, value)
 
         def edgeIRV(value):
-            def edgeIR(fTp, tTp):
-                Es = api.Es
-                Edata = Es(efName)
-                doValues = Edata.doValues
-                return edgeAccess(Edata.t, doValues, value)
-
-            return edgeIR
+            return edgeAccess(-1, value)
 
         def edgeSRV(value):
-            def edgeSR(fTp, tTp):
-                Es = api.Es
-                Edata = Es(efName)
-                doValues = Edata.doValues
-                return edgeAccess(Edata.b, doValues, value)
+            return edgeAccess(0, value)
+
+        def edgeSpinV(value):
+            return edgeSpin(1, value)
 
-            return edgeSR
+        def edgeSpinIV(value):
+            return edgeSpin(-1, value)
 
-        return (edgeRV, edgeIRV, edgeSRV)
+        def edgeSpinSV(value):
+            return edgeSpin(0, value)
+
+        return (edgeRV, edgeIRV, edgeSRV, edgeSpinV, edgeSpinIV, edgeSpinSV)
 
     # COLLECT ALL RELATIONS IN A TUPLE
 
@@ -1579,15 +1543,22 @@ def basicRelations(searchExe, api):
             continue
         r = len(relations)
 
-        (edgeRV, edgeIRV, edgeSRV) = makeEdgeMaps(efName)
+        (edgeRV, edgeIRV, edgeSRV, edgeSpinV, edgeSpinIV, edgeSpinSV) = makeEdgeMaps(
+            efName
+        )
         doValues = api.TF.features[efName].edgeValues
         extra = " with value specification allowed" if doValues else ""
         relations.append(
             (
-                (f"-{efName}>", True, edgeRV, f'edge feature "{efName}"{extra}'),
+                (
+                    f"-{efName}>",
+                    edgeSpinV,
+                    edgeRV,
+                    f'edge feature "{efName}"{extra}',
+                ),
                 (
                     f"<{efName}-",
-                    True,
+                    edgeSpinIV,
                     edgeIRV,
                     f'edge feature "{efName}"{extra} (opposite direction)',
                 ),
@@ -1601,11 +1572,11 @@ def basicRelations(searchExe, api):
             (
                 (
                     f"<{efName}>",
-                    True,
+                    edgeSpinSV,
                     edgeSRV,
                     f'edge feature "{efName}"{extra} (either direction)',
                 ),
-                (f"<{efName}>", True, edgeSRV, None),
+                (f"<{efName}>", edgeSpinSV, edgeSRV, None),
             )
         )
         edgeMap[2 * r] = (efName, 0)
@@ -1790,13 +1761,13 @@ def add_V_Relations(searchExe, varRels):
                 [
                     dict(
                         acro=acro,
-                        spin=r["spin"],
+                        spin=r["spin"](val),
                         func=r["func"](val),
                         desc=r["desc"],
                     ),
                     dict(
                         acro=acroi,
-                        spin=ri["spin"],
+                        spin=ri["spin"](val),
                         func=ri["func"](val),
                         desc=ri["desc"],
                     ),
@@ -0,0 +1,230 @@
+"""
+# Search results on disk
+
+Some queries have tens of millions of results. Collecting them in memory,
+let alone turning them into one big string for export, is not feasible.
+
+`tf.search.search.Search.searchToFile` pulls the results one by one from the
+search engine and writes them to a file in chunks of
+`tf.parameters.SEARCH_FILE_CHUNK` results, so that only one chunk is in memory
+at any time.
+
+## Formats
+
+`tsv`
+:   One result per line, with the nodes separated by tabs, compressed with `gzip`.
+    Good for exchanging results with other tools.
+
+`npy`
+:   A two-dimensional array of 32-bit integers in the
+    [NumPy file format](https://numpy.org/doc/stable/reference/generated/numpy.lib.format.html),
+    with a row per result and a column per node of the result.
+    It is not compressed, so that it can be memory-mapped:
+    you can page through the results without reading them all.
+    If you have NumPy, you can load it with `numpy.load(path, mmap_mode="r")`,
+    but NumPy is not needed to write or read it.
+
+## Reading
+
+`tf.search.resultfile.readResults` opens a result file.
+For the `npy` format you get a `tf.search.resultfile.ResultFile`,
+which is memory-mapped and behaves like a tuple of result tuples,
+so you can pass it directly to `A.table()` and `A.show()` with `start` and `end`:
+only the results that are displayed are read from disk.
+
+``` python
+S.searchToFile(query, "results.npy", format="npy")
+results = readResults("results.npy")
+A.table(results, start=1000000, end=1000050)
+```
+
+For the `tsv` format you get a generator of result tuples.
+"""
+
+import gzip
+import mmap
+import sys
+from array import array
+from ast import literal_eval
+from itertools import islice
+
+from ..parameters import SEARCH_FILE_CHUNK
+from ..core.files import fileOpen
+
+
+FORMATS = ("tsv", "npy")
+"""The formats in which search results can be written."""
+
+NPY_MAGIC = b"\x93NUMPY"
+NPY_DTYPE = "<i4"
+NPY_HEADER_SIZE = 128
+"""Size of the header of the `npy` files that we write.
+
+The header has a fixed size, so that it can be rewritten when the number of results
+is known.
+"""
+
+
+def writeResults(results, path, format="tsv", width=None):
+    """Writes search results to a file, chunk by chunk.
+
+    Parameters
+    ----------
+    results: iterable
+        The results, tuples of nodes, or nodes.
+    path: string
+        The file to write.
+    format: string, optional tsv
+        One of `tf.search.resultfile.FORMATS`.
+    width: integer, optional None
+        The number of nodes per result; only needed for the `npy` format
+        if there are no results.
+
+    Returns
+    -------
+    integer
+        The number of results that have been written.
+    """
+
+    results = (r if type(r) is tuple else (r,) for r in results)
+    if format == "npy":
+        return _writeNpy(results, path, width)
+    return _writeTsv(results, path)
+
+
+def _writeTsv(results, path):
+    n = 0
+    with gzip.open(path, mode="wt", encoding="utf8") as fh:
+        while True:
+            chunk = list(islice(results, SEARCH_FILE_CHUNK))
+            if not chunk:
+                break
+            fh.write("".join("\t".join(str(m) for m in r) + "\n" for r in chunk))
+            n += len(chunk)
+    return n
+
+
+def _npyHeader(shape):
+    header = (
+        f"{{'descr': '{NPY_DTYPE}', 'fortran_order': False, 'shape': {shape}, }}"
+    ).encode("latin1")
+    prefix = len(NPY_MAGIC) + 2 + 2
+    header += b" " * (NPY_HEADER_SIZE - prefix - len(header) - 1) + b"\n"
+    return NPY_MAGIC + b"\x01\x00" + (len(header)).to_bytes(2, "little") + header
+
+
+def _writeNpy(results, path, width):
+    n = 0
+    with fileOpen(path, mode="wb") as fh:
+        fh.write(_npyHeader((0, 0)))
+        while True:
+            chunk = list(islice(results, SEARCH_FILE_CHUNK))
+            if not chunk:
+                break
+            if width is None:
+                width = len(chunk[0])
+            data = array("i", (m for r in chunk for m in r))
+            if sys.byteorder != "little":
+                data.byteswap()
+            data.tofile(fh)
+            n += len(chunk)
+        fh.seek(0)
+        fh.write(_npyHeader((n, width or 0)))
+    return n
+
+
+def readResults(path):
+    """Opens a file with search results.
+
+    Parameters
+    ----------
+    path: string
+        A file written by `tf.search.resultfile.writeResults`.
+        Files ending in `.npy` are read as `npy`, other files as `tsv`.
+
+    Returns
+    -------
+    object
+        For `npy`: a `tf.search.resultfile.ResultFile`;
+        for `tsv`: a generator of result tuples.
+    """
+
+    if path.endswith(".npy"):
+        return ResultFile(path)
+    return _readTsv(path)
+
+
+def _readTsv(path):
+    with gzip.open(path, mode="rt", encoding="utf8") as fh:
+        for line in fh:
+            yield tuple(int(m) for m in line.rstrip("\n").split("\t"))
+
+
+class ResultFile:
+    """Memory-mapped search results in the `npy` format.
+
+    The object behaves like a tuple of result tuples: it has a length,
+    you can iterate over it, and you can index and slice it.
+    Only the results that you access are read from disk.
+
+    Parameters
+    ----------
+    path: string
+        The `npy` file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with fileOpen(path, mode="rb") as fh:
+            self.mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self.mm
+        if mm[0:6] != NPY_MAGIC:
+            raise ValueError(f"Not a npy file: {path}")
+        major = mm[6]
+        sizeBytes = 2 if major == 1 else 4
+        headerSize = int.from_bytes(mm[8 : 8 + sizeBytes], "little")
+        offset = 8 + sizeBytes + headerSize
+        header = literal_eval(mm[8 + sizeBytes : offset].decode("latin1"))
+        if header["descr"] != NPY_DTYPE or header["fortran_order"]:
+            raise ValueError(f"Not a search result file: {path}")
+        (self.n, self.width) = header["shape"]
+        self.offset = offset
+        self.view = memoryview(mm)
+        self.data = (
+            self.view[offset:].cast("i") if sys.byteorder == "little" else None
+        )
+
+    def __len__(self):
+        return self.n
+
+    def _row(self, i):
+        width = self.width
+        data = self.data
+        if data is not None:
+            return tuple(data[i * width : (i + 1) * width])
+        start = self.offset + 4 * i * width
+        row = array("i", self.mm[start : start + 4 * width])
+        row.byteswap()
+        return tuple(row)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self._row(j) for j in range(*i.indices(self.n)))
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError("result index out of range")
+        return self._row(i)
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self._row(i)
+
+    def close(self):
+        """Releases the memory map."""
+
+        if self.data is not None:
+            self.data.release()
+            self.data = None
+        self.view.release()
+        self.mm.close()
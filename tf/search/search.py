@@ -2,8 +2,20 @@
 # Search (top-level)
 """
 
+from itertools import islice
+
 from ..core.helpers import console, wrapMessages
 from .searchexe import SearchExe
+from .stats import SearchStats
+from .edgeindex import EdgeIndex
+from .textlayer import TextLayer
+from .cache import QueryCache, ParseCache, POINTER_BYTES, resultEntry, sizeOf
+from .guard import Guard
+from .prepared import PreparedSearch
+from .batch import searchMany
+from .resultfile import FORMATS, writeResults
+from .stitch import sortedResults
+from ..parameters import SEARCH_FAIL_FACTOR
 from ..core.timestamp import SILENT_D, AUTO, silentConvert
 
 
@@ -15,6 +27,11 @@ class Search:
         self.api = api
         self.silent = silent
         self.exe = None
+        self.stats = SearchStats(api)
+        self.edgeIndex = EdgeIndex(api)
+        self.textLayer = TextLayer(api)
+        self.cache = QueryCache(features=api.TF.features)
+        self.parseCache = ParseCache()
         perfDefaults = SearchExe.perfDefaults
         self.perfParams = {}
         self.perfParams.update(perfDefaults)
@@ -166,6 +183,11 @@ class Search:
         shallow=False,
         silent=SILENT_D,
         here=True,
+        cache=True,
+        sort=False,
+        timeout=None,
+        cancel=None,
+        memory=None,
         _msgCache=False,
     ):
         """Searches for combinations of nodes that together match a search template.
@@ -199,6 +221,38 @@ class Search:
                 If this *fail limit* is exceeded in cases where no positive `limit`
                 has been passed, you get a warning message.
 
+        cache: boolean, optional True
+            Whether to look up the results in the query cache, and to store
+            them there. See `tf.search.cache`.
+
+            If the results are delivered by a generator, they are stored when
+            the generator has been exhausted.
+
+        sort: boolean, optional False
+            If `True`, the results are delivered in canonical order
+            (`tf.core.nodes`), as if they were sorted with
+            `tf.core.nodes.Nodes.sortKeyTuple`.
+            The results are computed in that order, so with a `limit` you get the
+            first results in canonical order without computing all results.
+            Has no effect on shallow searches.
+
+        timeout: float, optional None
+            If given, the search is aborted with a
+            `tf.search.guard.SearchAborted` exception
+            when it takes more than this number of seconds.
+            See `tf.search.guard`.
+
+        cancel: threading.Event | function, optional None
+            If given, the search is aborted with a
+            `tf.search.guard.SearchAborted` exception
+            as soon as this event is set or this function returns a true value.
+
+        memory: integer, optional None
+            If given, the search is aborted with a
+            `tf.search.guard.SearchAborted` exception
+            when the candidate nodes and fetched results are estimated to
+            take more than this number of bytes.
+
         Returns
         -------
         generator | tuple
@@ -218,6 +272,32 @@ class Search:
             and translated into a search plan. See `tf.search.search.Search.study`.
         """
 
+        # Messages are not cached, so if the caller wants them,
+        # we have to run the query.
+
+        useCache = cache and type(_msgCache) is not list
+
+        if useCache:
+            cacheKey = QueryCache.key(
+                searchTemplate,
+                kind="sorted" if sort and not shallow else None,
+                sets=sets,
+                shallow=shallow,
+                limit=limit,
+            )
+            cached = self.cache.get(cacheKey)
+            if cached is not None:
+                (exe, queryResults) = cached
+                if here:
+                    self.exe = exe
+                return (
+                    set(queryResults)
+                    if shallow
+                    else queryResults
+                    if limit is not None
+                    else (r for r in queryResults)
+                )
+
         exe = SearchExe(
             self.api,
             searchTemplate,
@@ -229,10 +309,19 @@ class Search:
             silent=silent,
             _msgCache=_msgCache,
             setInfo={},
+            guard=Guard.make(timeout=timeout, cancel=cancel, memory=memory),
         )
         if here:
             self.exe = exe
-        queryResults = exe.search(limit=limit)
+        queryResults = exe.search(limit=limit, sort=sort)
+
+        if useCache and exe.good:
+            if shallow or limit is not None:
+                cachedResults = frozenset(queryResults) if shallow else queryResults
+                (value, size) = resultEntry(exe, cachedResults)
+                self.cache.put(cacheKey, value, size=size)
+            else:
+                queryResults = self._cacheWhenDone(cacheKey, exe, queryResults, sets)
         if type(_msgCache) is list:
             (status, messages) = wrapMessages(_msgCache)
             self._msgCache = _msgCache
@@ -243,6 +332,239 @@ class Search:
             )
         return queryResults
 
+    def _cacheWhenDone(self, cacheKey, exe, queryResults, sets):
+        # We store the results when the generator is exhausted,
+        # but not if it has been cut off at the fail limit,
+        # and we stop collecting them as soon as they exceed the cache budget.
+
+        failLimit = SEARCH_FAIL_FACTOR * self.api.F.otype.maxNode
+        budget = self.cache.budget
+        collected = []
+        size = 0
+
+        for r in queryResults:
+            if collected is not None:
+                size += sizeOf(r) + POINTER_BYTES
+                if size > budget:
+                    collected = None
+                else:
+                    collected.append(r)
+            yield r
+
+        if collected is not None and len(collected) < failLimit:
+            (value, size) = resultEntry(exe, tuple(collected))
+            self.cache.put(cacheKey, value, size=size)
+
+    def searchMany(
+        self,
+        templates,
+        limit=None,
+        sets=None,
+        shallow=False,
+        sort=False,
+        workers=1,
+        cache=True,
+        timeout=None,
+        cancel=None,
+        memory=None,
+    ):
+        """Searches with a batch of templates, sharing the work they have in common.
+
+        The atoms that occur in several templates are computed only once,
+        and the templates can be executed by several workers in parallel,
+        see `tf.search.batch`.
+
+        Parameters
+        ----------
+        templates: dict | iterable
+            The search templates. If it is a dictionary, the values are the templates
+            and the keys are names for them; otherwise the templates themselves
+            are used as names.
+        workers: integer, optional 1
+            The number of worker threads.
+        limit, sets, shallow, sort, cache: optional
+            As in `tf.search.search.Search.search`; they apply to all templates.
+        timeout, cancel, memory: optional None
+            Guards against excessive time and memory,
+            as in `tf.search.search.Search.search`; they apply to each template
+            separately.
+
+        Returns
+        -------
+        dict
+            The results keyed by the names of the templates.
+            The results of a template are a tuple of result tuples,
+            or a set if `shallow` is true.
+            Templates with errors yield no results; the errors are reported.
+            Templates that are aborted by a guard yield no results either;
+            the reason is reported.
+        """
+
+        return searchMany(
+            self,
+            templates,
+            limit=limit,
+            sets=sets,
+            shallow=shallow,
+            sort=sort,
+            workers=workers,
+            cache=cache,
+            timeout=timeout,
+            cancel=cancel,
+            memory=memory,
+        )
+
+    def searchToFile(
+        self,
+        searchTemplate,
+        path,
+        format="tsv",
+        limit=None,
+        sets=None,
+        shallow=False,
+        sort=False,
+        silent=SILENT_D,
+        timeout=None,
+        cancel=None,
+    ):
+        """Searches and writes the results to a file, without collecting them.
+
+        The results are pulled from the search engine one by one and written in
+        chunks, so that even searches with tens of millions of results do not
+        exhaust the memory, see `tf.search.resultfile`.
+        The fail limit of `tf.search.search.Search.search` does not apply.
+
+        Read the file back with `tf.search.resultfile.readResults`.
+
+        Parameters
+        ----------
+        searchTemplate: string
+            A string that conforms to the rules described in `tf.about.searchusage`.
+        path: string
+            The file to write.
+        format: string, optional tsv
+            `tsv` for a compressed tab-separated file,
+            `npy` for a memory-mappable array of nodes.
+        limit: integer, optional None
+            If a positive number, at most this many results are written.
+        sets, shallow, sort, silent: optional
+            As in `tf.search.search.Search.search`.
+        timeout, cancel: optional None
+            Guards against excessive time,
+            as in `tf.search.search.Search.search`.
+
+        Returns
+        -------
+        integer | None
+            The number of results written, or `None` if the template has errors.
+        """
+
+        TF = self.api.TF
+        error = TF.error
+
+        if format not in FORMATS:
+            error(
+                f'Unknown format "{format}" for search results; '
+                f"choose from {', '.join(FORMATS)}",
+                tm=False,
+            )
+            return None
+
+        if silent is False:
+            silent = AUTO
+
+        guard = Guard.make(timeout=timeout, cancel=cancel)
+        exe = SearchExe(
+            self.api,
+            searchTemplate,
+            outerTemplate=searchTemplate,
+            quKind=None,
+            offset=0,
+            sets=sets,
+            shallow=shallow,
+            silent=silent,
+            setInfo={},
+            guard=guard,
+        )
+        self.exe = exe
+        TF.setSilent(True)
+        exe.study()
+        TF.setSilent(silent)
+        if not exe.good:
+            return None
+
+        if exe.shallow:
+            results = exe.results
+            width = 1 if exe.shallow == 1 else min(exe.shallow, len(exe.qnodes))
+        else:
+            results = sortedResults(exe) if sort else exe.results()
+            width = len(exe.qnodes)
+            if guard:
+                guard.setStage("fetch")
+                results = _ticked(results, guard.tick)
+        if limit and limit > 0:
+            results = islice(results, limit)
+
+        return writeResults(results, path, format=format, width=width)
+
+    def prepare(
+        self,
+        searchTemplate,
+        sets=None,
+        shallow=False,
+        strategy=None,
+        silent=SILENT_D,
+    ):
+        """Prepares a template with parameters for repeated execution.
+
+        The template is parsed and checked, and the search space is set up
+        as far as it does not depend on parameters.
+        The result can be run many times with different values for the parameters
+        and different custom sets, see `tf.search.prepared`.
+
+        Prepared templates are kept in the cache of search results (`S.cache`),
+        so preparing the same template again is cheap.
+
+        Parameters
+        ----------
+        searchTemplate: string
+            A search template, in which feature values of the form `$name` are
+            parameters.
+        sets: dict, optional None
+            As in `tf.search.search.Search.search`.
+        shallow: boolean | integer, optional False
+            As in `tf.search.search.Search.search`.
+        strategy: string, optional None
+            As in `tf.search.search.Search.study`.
+        silent: string, optional tf.core.timestamp.SILENT_D
+            See `tf.core.timestamp.Timestamp`
+
+        Returns
+        -------
+        object
+            A `tf.search.prepared.PreparedSearch`; run it with its `run()` method.
+        """
+
+        if silent is False:
+            silent = AUTO
+
+        cacheKey = QueryCache.key(
+            searchTemplate, kind=("prepared", strategy), sets=sets, shallow=shallow
+        )
+        prepared = self.cache.get(cacheKey)
+        if prepared is None:
+            prepared = PreparedSearch(
+                self.api,
+                searchTemplate,
+                sets=sets,
+                shallow=shallow,
+                strategy=strategy,
+                silent=silent,
+            )
+            if prepared.good:
+                self.cache.put(cacheKey, prepared, size=prepared.memory())
+        return prepared
+
     def study(
         self,
         searchTemplate,
@@ -251,6 +573,9 @@ class Search:
         shallow=False,
         here=True,
         silent=SILENT_D,
+        timeout=None,
+        cancel=None,
+        memory=None,
     ):
         """Studies a template to prepare for searching with it.
 
@@ -295,6 +620,10 @@ class Search:
         silent: string, optional tf.core.timestamp.SILENT_D
             See `tf.core.timestamp.Timestamp`
 
+        timeout, cancel, memory: optional None
+            Guards against excessive time and memory,
+            see `tf.search.search.Search.search`.
+
         See Also
         --------
         tf.about.searchusage: Search guide
@@ -314,12 +643,21 @@ class Search:
             silent=SILENT_D,
             showQuantifiers=True,
             setInfo={},
+            guard=Guard.make(timeout=timeout, cancel=cancel, memory=memory),
         )
         if here:
             self.exe = exe
         return exe.study(strategy=strategy)
 
-    def fetch(self, limit=None, _msgCache=False):
+    def fetch(
+        self,
+        limit=None,
+        sort=False,
+        timeout=None,
+        cancel=None,
+        memory=None,
+        _msgCache=False,
+    ):
         """Retrieves query results, up to a limit.
 
         Must be called after a previous `tf.search.search.Search.search()` or
@@ -338,6 +676,13 @@ class Search:
                 If this *fail limit* is exceeded in cases where no positive `limit`
                 has been passed, you get a warning message.
 
+        sort: boolean, optional False
+            If `True`, the results are delivered in canonical order,
+            see `tf.search.search.Search.search`.
+
+        timeout, cancel, memory: optional None
+            Guards against excessive time and memory,
+            see `tf.search.search.Search.search`.
 
         Returns
         -------
@@ -380,25 +725,53 @@ class Search:
             error = TF.error
             error('Cannot fetch if there is no previous "study()"')
         else:
-            queryResults = exe.fetch(limit=limit)
+            exe.guard = Guard.make(timeout=timeout, cancel=cancel, memory=memory)
+            queryResults = exe.fetch(limit=limit, sort=sort)
             if type(_msgCache) is list:
                 messages = TF.cache(_asString=True)
                 return (queryResults, messages)
             return queryResults
 
-    def count(self, progress=None, limit=None):
-        """Counts the results, with progress messages, optionally up to a limit.
+    def count(
+        self,
+        searchTemplate=None,
+        progress=None,
+        limit=None,
+        byType=None,
+        sets=None,
+        silent=SILENT_D,
+        here=True,
+    ):
+        """Counts the results.
+
+        There are two modes.
 
-        Must be called after a previous `tf.search.search.Search.search()` or
-        `tf.search.search.Search.study()`.
+        *   **count-only search**: if you pass a search template, it will be studied
+            and its results will be counted without constructing result tuples.
+            Independent parts of the plan are counted separately and their counts
+            are multiplied.
+            The count is returned, and there is no fail limit.
+        *   **counting with progress**: without a search template,
+            the results of a previous `tf.search.search.Search.search()` or
+            `tf.search.search.Search.study()` are fetched one by one, with
+            progress messages, optionally up to a limit.
 
         Parameters
         ----------
+        searchTemplate: string, optional None
+            A string that conforms to the rules described in `tf.about.searchusage`.
+
+            For backward compatibility: if you pass an integer here, it will be
+            taken as the `progress` parameter, and the next positional parameter
+            as `limit`.
+
         progress: integer, optional, default `100`
+            Only without a search template.
             Every once for every `progress` results a progress message is shown
             when fetching results.
 
         limit: integer, optional None
+            Only without a search template.
             If `limit` is a positive number, it will fetch only that many results.
             If it is negative, 0, None, or absent, it will fetch arbitrary many results.
 
@@ -408,9 +781,26 @@ class Search:
                 If this *fail limit* is exceeded in cases where no positive `limit`
                 has been passed, you get a warning message.
 
+        byType: string, optional None
+            If given, the results are counted per node of this type that contains
+            the first node of the result, e.g. per `book` or per `chapter`.
+            Also possible without a search template, after a previous
+            `tf.search.search.Search.study()`.
+
+        sets: dict, optional None
+            Only with a search template.
+            If not `None`, it should be a dictionary of sets, keyed by a names.
+
+        silent: string, optional tf.core.timestamp.SILENT_D
+            See `tf.core.timestamp.Timestamp`
+
+        here: boolean, optional True
+            Whether the studied search template becomes the current one,
+            so that you can call `tf.search.search.Search.showPlan` afterwards.
+
         !!! note "why needed"
             You typically need this in cases where result fetching turns out to
-            be (very) slow.
+            be (very) slow, or when you only need the numbers.
 
         !!! caution "generator versus list"
             `len(S.results())` does not work in general, because `S.results()` is
@@ -418,19 +808,48 @@ class Search:
 
         Returns
         -------
-        None
-            The point of this function is to show the counting of the results
+        integer | dict | None
+            With a search template or `byType`: the number of results,
+            or, if `byType` is given, a dict keyed by nodes of that type with
+            the number of results as values.
+            The key `None` is used for results whose first node is not contained
+            in a node of type `byType`.
+            If the template has errors, `None` is returned.
+
+            Otherwise `None`:
+            the point is then to show the counting of the results
             on the screen in a series of timed messages.
         """
 
+        if type(searchTemplate) is int:
+            (searchTemplate, progress, limit) = (None, searchTemplate, progress)
+
+        if searchTemplate is not None:
+            exe = SearchExe(
+                self.api,
+                searchTemplate,
+                outerTemplate=searchTemplate,
+                quKind=None,
+                offset=0,
+                sets=sets,
+                shallow=False,
+                silent=silent,
+                setInfo={},
+            )
+            if here:
+                self.exe = exe
+            return exe.countOnly(byType=byType)
+
         exe = self.exe
         if exe is None:
             error = self.api.TF.error
             error('Cannot count if there is no previous "study()"')
+        elif byType is not None:
+            return exe.countOnly(byType=byType, study=False)
         else:
             exe.count(progress=progress, limit=limit)
 
-    def showPlan(self, details=False):
+    def showPlan(self, details=False, analyze=False, limit=None):
         """Show the result of the latest study of a template.
 
         Search results are tuples of nodes and the plan shows which part of the tuple
@@ -445,6 +864,21 @@ class Search:
             an overview of the search space and a description of how the results
             will be retrieved.
 
+        analyze: boolean, optional False
+            If `True`, the latest template is executed again, and all its results
+            are fetched, while every phase of the execution is measured.
+            The measurements are shown after the plan, see `tf.search.analyze`.
+
+        limit: integer, optional None
+            Only meaningful if `analyze` is `True`: the maximum number of results
+            that will be fetched.
+
+        Returns
+        -------
+        dict | None
+            If `analyze` is `True`, the measurements,
+            see `tf.search.analyze.Analysis.data`.
+
         !!! note "after S.study()"
             This function is only meaningful after a call to `S.study()`.
         """
@@ -453,8 +887,28 @@ class Search:
         if exe is None:
             error = self.api.TF.error
             error('Cannot show plan if there is no previous "study()"')
-        else:
+            return None
+
+        if not analyze:
             exe.showPlan(details=details)
+            return None
+
+        strategy = getattr(exe, "strategyName", None)
+        exe = SearchExe(
+            self.api,
+            exe.searchTemplate,
+            outerTemplate=exe.outerTemplate,
+            quKind=None,
+            offset=0,
+            sets=exe.sets,
+            shallow=exe.shallow,
+            silent=exe.silent,
+            showQuantifiers=False,
+            setInfo={},
+            analyze=True,
+        )
+        self.exe = exe
+        return exe.analyze(strategy=strategy, limit=limit, details=details)
 
     def relationsLegend(self):
         """Dynamic info about the basic relations that can be used in templates.
@@ -540,3 +994,11 @@ class Search:
                 )
             fields.append(field)
         return " ".join(fields)
+
+
+def _ticked(results, tick):
+    # passes the results on, while the guard checks the timeout and cancellation
+
+    for r in results:
+        tick()
+        yield r
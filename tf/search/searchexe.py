@@ -2,18 +2,56 @@
 # Search execution management
 """
 
+import copy
+
 from .relations import basicRelations
 from .syntax import syntax
 from .semantics import semantics
 from .graph import connectedness, displayPlan
 from .spin import spinAtoms, spinEdges
-from .stitch import setStrategy, stitch
-from ..parameters import SEARCH_FAIL_FACTOR, YARN_RATIO, TRY_LIMIT_FROM, TRY_LIMIT_TO
+from .stitch import setStrategy, stitch, countResults, sortedResults
+from .analyze import Analysis, displayAnalysis
+from .cache import ParseCache, sizeOf
+from ..parameters import (
+    SEARCH_FAIL_FACTOR,
+    YARN_RATIO,
+    TRY_LIMIT_FROM,
+    TRY_LIMIT_TO,
+)
 from ..core.timestamp import DEEP
 
 
 PROGRESS = 100
 
+PARSED = (
+    "searchLines",
+    "tokens",
+    "badSyntax",
+    "badSemantics",
+    "qnames",
+    "qnodes",
+    "qedgesRaw",
+    "qedges",
+    "nodeLine",
+    "edgeLine",
+    "featuresUsed",
+    "relations",
+    "relationFromName",
+    "relationLegend",
+    "converse",
+    "edgeMap",
+    "nodeMap",
+    "featureValueIndex",
+)
+"""The members of a search that are the outcome of parsing its template.
+
+They are kept in the parse cache, see `tf.search.cache.ParseCache`.
+"""
+
+
+def _unmeasured(phase, func, *args):
+    return func(*args)
+
 
 class SearchExe:
     perfDefaults = dict(
@@ -41,6 +79,11 @@ class SearchExe:
         showQuantifiers=False,
         _msgCache=False,
         setInfo={},
+        universe=None,
+        atomCache=None,
+        guard=None,
+        analyze=False,
+        params=None,
     ):
         self.api = api
         TF = api.TF
@@ -61,20 +104,43 @@ class SearchExe:
         )
         self.good = True
         self.setInfo = setInfo
-        basicRelations(self, api)
+        self.universe = universe
+        self.ownAtomCache = atomCache is None
+        self.atomCache = {} if atomCache is None else atomCache
+        self.guard = guard
+        self.analysis = Analysis() if analyze else None
+        self.params = params
+
+        S = getattr(api, "S", None)
+        parseCache = None if S is None else S.parseCache
+        self.parseKey = (
+            None
+            if parseCache is None
+            else ParseCache.key(searchTemplate, sets=sets, params=params, level=level)
+        )
+        self.parsed = (
+            None
+            if parseCache is None
+            else parseCache.get(self.parseKey, api.TF.features)
+        )
+        if self.parsed is None:
+            basicRelations(self, api)
+        else:
+            for member in PARSED:
+                setattr(self, member, self.parsed[member])
 
     # API METHODS ###
 
-    def search(self, limit=None):
+    def search(self, limit=None, sort=False):
         api = self.api
         TF = api.TF
         setSilent = TF.setSilent
         setSilent(True)
         self.study()
         setSilent(self.silent)
-        return self.fetch(limit=limit)
+        return self.fetch(limit=limit, sort=sort)
 
-    def study(self, strategy=None):
+    def study(self, strategy=None, parsed=False):
         api = self.api
         TF = api.TF
         info = TF.info
@@ -92,17 +158,25 @@ class SearchExe:
         if not self.good:
             return
 
+        analysis = self.analysis
+        measure = analysis.measure if analysis else _unmeasured
+
         info("Checking search template ...", cache=_msgCache)
 
-        self._parse()
-        self._prepare()
+        if not parsed:
+            measure("parse", self._parse)
+            measure("prepare", self._prepare)
         if not self.good:
             return
         info(
             f"Setting up search space for {len(self.qnodes)} objects ...",
             cache=_msgCache,
         )
-        spinAtoms(self)
+        measure("atoms", spinAtoms, self)
+        if self.level == 0 and self.ownAtomCache:
+            # the yarns of atoms are only shared with the searches of quantifiers,
+            # unless the cache has been passed in, see tf.search.batch
+            self.atomCache.clear()
         # in spinAtoms an inner call to study may have happened due to quantifiers
         # That will restore the silent level to what we had outside
         # study(). So we have to make it deep again.
@@ -111,20 +185,21 @@ class SearchExe:
             f"Constraining search space with {len(self.qedges)} relations ...",
             cache=_msgCache,
         )
-        spinEdges(self)
+        measure("edges", spinEdges, self)
         info(f"\t{len(self.thinned)} edges thinned", cache=_msgCache)
         info(
             f"Setting up retrieval plan with strategy {self.strategyName} ...",
             cache=_msgCache,
         )
-        stitch(self)
+        measure("stitch", stitch, self)
         if self.good:
             yarnContent = sum(len(y) for y in self.yarns.values())
             info(f"Ready to deliver results from {yarnContent} nodes", cache=_msgCache)
             info("Iterate over S.fetch() to get the results", tm=False, cache=_msgCache)
             info("See S.showPlan() to interpret the results", tm=False, cache=_msgCache)
 
-    def fetch(self, limit=None):
+    def fetch(self, limit=None, sort=False):
+        self._ensureStudied()
         api = self.api
         TF = api.TF
         F = api.F
@@ -141,9 +216,16 @@ class SearchExe:
         else:
             failLimit = limit if limit else SEARCH_FAIL_FACTOR * F.otype.maxNode
 
+            results = sortedResults(self) if sort else self.results()
+            guard = self.guard
+
             def limitedResults():
-                for (i, result) in enumerate(self.results()):
+                if guard:
+                    guard.setStage("fetch")
+                for (i, result) in enumerate(results):
                     if i < failLimit:
+                        if guard:
+                            guard.result(len(result))
                         yield result
                     else:
                         if not limit:
@@ -159,7 +241,57 @@ class SearchExe:
 
         return queryResults
 
+    def slim(self):
+        """A copy of this search without its search space.
+
+        The query cache keeps such copies with the results of searches
+        (see `tf.search.cache`): they know the template and how it has been parsed,
+        but the yarns, spreads and results are left out.
+        If they are needed again, the template is studied anew.
+
+        Returns
+        -------
+        object
+            A `tf.search.searchexe.SearchExe`.
+        """
+
+        exe = copy.copy(self)
+        exe.strategy = None
+        exe.guard = None
+        exe.analysis = None
+        exe.atomCache = {}
+        exe.ownAtomCache = True
+        exe.yarns = {}
+        exe.spreads = {}
+        exe.spreadsC = {}
+        exe.uptodate = {}
+        exe.results = None
+        return exe
+
+    def memory(self):
+        """Estimates the memory occupied by the parsed template, in bytes.
+
+        This is what a copy made by `SearchExe.slim` keeps.
+        """
+
+        return sum(sizeOf(getattr(self, member, None)) for member in PARSED)
+
+    def countOnly(self, byType=None, study=True):
+        if study:
+            api = self.api
+            TF = api.TF
+            setSilent = TF.setSilent
+            setSilent(True)
+            self.study()
+            setSilent(self.silent)
+        else:
+            self._ensureStudied()
+        if not self.good:
+            return None
+        return countResults(self, byType=byType)
+
     def count(self, progress=None, limit=None):
+        self._ensureStudied()
         TF = self.api.TF
         info = TF.info
         error = TF.error
@@ -217,8 +349,30 @@ class SearchExe:
     # SHOWING WITH THE SEARCH GRAPH ###
 
     def showPlan(self, details=False):
+        self._ensureStudied()
         displayPlan(self, details=details)
 
+    def analyze(self, strategy=None, limit=None, details=False, show=True):
+        analysis = self.analysis
+        TF = self.api.TF
+        wasSilent = TF.isSilent()
+        TF.setSilent(DEEP)
+        self.study(strategy=strategy)
+        TF.setSilent(wasSilent)
+        if not self.good:
+            return None
+
+        def fetchAll():
+            results = self.fetch(limit=limit)
+            analysis.results = len(results) if self.shallow else sum(1 for r in results)
+
+        analysis.measure("fetch", fetchAll)
+        data = analysis.data(self)
+        if show:
+            self.showPlan(details=details)
+            displayAnalysis(self, data)
+        return data
+
     def showOuterTemplate(self, _msgCache):
         error = self.api.TF.error
         offset = self.offset
@@ -231,10 +385,36 @@ class SearchExe:
 
     # TOP-LEVEL IMPLEMENTATION METHODS
 
+    def _ensureStudied(self):
+        # A search that has been slimmed down for the query cache
+        # has to be studied again before it can deliver results.
+
+        if self.good and getattr(self, "results", False) is None:
+            TF = self.api.TF
+            wasSilent = TF.isSilent()
+            TF.setSilent(True)
+            self.study(strategy=getattr(self, "strategyName", None))
+            TF.setSilent(wasSilent)
+
     def _parse(self):
+        parsed = self.parsed
+        if parsed is not None:
+            # the stitcher adds edges to the qedges
+            self.qedges = list(parsed["qedges"])
+            self.good = True
+            return
+
         syntax(self)
         semantics(self)
 
+        S = getattr(self.api, "S", None)
+        if self.good and S is not None:
+            parsed = {member: getattr(self, member) for member in PARSED}
+            parsed["qedges"] = tuple(self.qedges)
+            features = self.api.TF.features
+            S.parseCache.put(self.parseKey, parsed, features, pins=self.sets)
+            self.parsed = parsed
+
     def _prepare(self):
         if not self.good:
             return
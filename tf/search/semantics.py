@@ -6,7 +6,8 @@ import types
 import re
 
 from .relations import add_K_Relations, add_F_Relations, add_V_Relations
-from .syntax import reTp, kRe, deContext
+from .syntax import reTp, kRe, deContext, Param
+from .textlayer import textFormat
 
 # SEMANTIC ANALYSIS OF SEARCH TEMPLATE ###
 
@@ -225,11 +226,19 @@ def _validateFeature(
     missingFeatures,
     wrongValues,
     hasValues={},
+    wrongText={},
     asEdge=False,
 ):
     values = features[fName]
     fSet = "edges" if asEdge else "nodes"
-    if fName not in searchExe.api.TF.featureSets[fSet]:
+    fmt = None if asEdge else textFormat(fName)
+    if fmt is not None:
+        problem = searchExe.api.S.textLayer.check(fmt)
+        if problem is None and not isinstance(values, (reTp, Param)):
+            problem = "Only regular expressions (~) are allowed"
+        if problem is not None:
+            wrongText.setdefault(fName, {}).setdefault(problem, []).append(q)
+    elif fName not in searchExe.api.TF.featureSets[fSet]:
         missingFeatures.setdefault(fName, []).append(q)
     else:
         if asEdge:
@@ -242,6 +251,9 @@ def _validateFeature(
             return
         elif values is None:
             return
+        elif isinstance(values, Param):
+            # the value will be bound and cast when the template is run
+            return
         elif isinstance(values, types.FunctionType):
             if requiredType == "str":
                 wrongValues.setdefault(fName, {}).setdefault(values, []).append(q)
@@ -319,12 +331,19 @@ def _validation(searchExe):
     wrongValues = {}
     wrongTypes = {}
     hasValues = {}
+    wrongText = {}
 
     for (q, qdata) in enumerate(qnodes):
         features = qdata[1]
         for fName in sorted(features):
             _validateFeature(
-                searchExe, q, fName, features, missingFeatures, wrongValues
+                searchExe,
+                q,
+                fName,
+                features,
+                missingFeatures,
+                wrongValues,
+                wrongText=wrongText,
             )
 
     # check the relational operator token in edges
@@ -478,6 +497,22 @@ def _validation(searchExe):
                 )
         good = False
 
+    if len(wrongText):
+        for (fName, wrongs) in sorted(wrongText.items()):
+            searchExe.badSemantics.append(
+                (None, f'Text condition "{fName}" cannot be used:')
+            )
+            for (problem, qs) in sorted(wrongs.items()):
+                searchExe.badSemantics.append(
+                    (
+                        None,
+                        "    {}: line(s) {}".format(
+                            problem, ", ".join(str(nodeLine[q] + offset) for q in qs),
+                        ),
+                    )
+                )
+        good = False
+
     if len(wrongTypes):
         for (fName, wrongs) in sorted(wrongTypes.items()):
             searchExe.badSemantics.append((None, f'Feature "{fName}" has wrong type:'))
@@ -505,11 +540,13 @@ def _validation(searchExe):
     for (n, qdata) in enumerate(qnodes):
         features = qdata[1]
         for nfName in features:
-            nFeatsUsed.add(nfName)
+            if textFormat(nfName) is None:
+                nFeatsUsed.add(nfName)
         if n in nodeMap:
             nFeatsUsed |= nodeMap[n]
 
+    searchExe.featuresUsed = eFeatsUsed | nFeatsUsed
     if good:
-        searchExe.api.ensureLoaded(eFeatsUsed | nFeatsUsed)
+        searchExe.api.ensureLoaded(searchExe.featuresUsed)
     else:
         searchExe.good = False
@@ -3,11 +3,14 @@
 """
 
 import types
-from random import randrange
+from random import Random
+from time import perf_counter
 from inspect import signature
 
 from .syntax import (
     reTp,
+    Param,
+    bindParam,
     cleanParent,
     QWHERE,
     QWITHOUT,
@@ -17,28 +20,149 @@ from .syntax import (
     QEND,
 )
 from ..core.helpers import project
+from .textlayer import textFormat
+
+SAMPLE_SEED = 1
+"""Seed for sampling relations, so that query plans are reproducible."""
 
 # SPINNING ###
 
 
 def _spinAtom(searchExe, q):
-    F = searchExe.api.F
-    Fs = searchExe.api.Fs
-    maxNode = F.otype.maxNode
     qnodes = searchExe.qnodes
-    sets = searchExe.sets
 
     (otype, features, src, quantifiers) = qnodes[q]
-    featureList = sorted(features.items())
-    yarn = set()
+    if searchExe.params is not None:
+        features = _bindParams(searchExe, features)
+    universe = searchExe.universe
+    atomCache = searchExe.atomCache
+    analysis = searchExe.analysis
+    if analysis:
+        start = perf_counter()
+
+    if q == 0 and universe is not None:
+        # we are in a quantifier, and the first atom is the quantified atom,
+        # of which the outer search has already computed the yarn
+        yarn = universe.copy()
+        source = "universe"
+        tried = len(yarn)
+    else:
+        atomKey = _atomKey(otype, features)
+        cached = None if atomKey is None else atomCache.get(atomKey, None)
+        if cached is None:
+            yarn = _spinFeatures(searchExe, otype, features)
+            if atomKey is not None:
+                atomCache[atomKey] = yarn.copy()
+            source = "spun"
+            tried = len(_nodeSet(searchExe, otype)[0]) if analysis else None
+        else:
+            yarn = cached.copy()
+            source = "cached"
+            tried = 0
+    accepted = len(yarn)
+
+    if quantifiers:
+        for quantifier in quantifiers:
+            yarn = _doQuantifier(searchExe, yarn, src, quantifier)
+    searchExe.yarns[q] = yarn
+
+    if analysis:
+        analysis.atom(q, source, tried, accepted, len(yarn), perf_counter() - start)
+
+
+def _bindParams(searchExe, features):
+    # Replaces the parameters in the feature conditions of an atom
+    # by conditions with the values bound to them, see tf.search.prepared.
+    # The values have been checked before.
+
+    TF = searchExe.api.TF
+    params = searchExe.params
+    return {
+        fName: bindParam(
+            val,
+            params[val.name],
+            "str" if textFormat(fName) else TF.features[fName].dataType,
+        )
+        if isinstance(val, Param)
+        else val
+        for (fName, val) in features.items()
+    }
+
+
+def _atomKey(otype, features):
+    # A hashable key for an atom without its quantifiers,
+    # or None if one of its feature conditions cannot be compared.
+    # Numerical comparisons are functions, made by tf.search.syntax._makeLimit,
+    # we identify them by their code and the limit.
+
+    featureKey = []
+    for (ft, val) in sorted(features.items()):
+        if isinstance(val, types.FunctionType):
+            closure = val.__closure__ or ()
+            try:
+                val = (val.__code__, tuple(c.cell_contents for c in closure))
+                hash(val)
+            except Exception:
+                return None
+        elif isinstance(val, reTp):
+            val = ("~", val.pattern, val.flags)
+        featureKey.append((ft, val))
+    return (otype, tuple(featureKey))
+
+
+def _nodeSet(searchExe, otype):
+    # The nodes that are candidates for an atom of type otype,
+    # and whether they come from a custom set.
+
+    F = searchExe.api.F
+    sets = searchExe.sets
+    isSet = sets is not None and otype in sets
     nodeSet = (
-        range(1, maxNode + 1)
+        range(1, F.otype.maxNode + 1)
         if otype == "."
         else sets[otype]
-        if sets is not None and otype in sets
+        if isSet
         else F.otype.s(otype)
     )
+    return (nodeSet, isSet)
+
+
+def _spinFeatures(searchExe, otype, features):
+    Fs = searchExe.api.Fs
+
+    selectivity = searchExe.api.S.stats.selectivity
+    textLayer = searchExe.api.S.textLayer
+    textList = []
+    featureList = []
+    for (ft, val) in features.items():
+        fmt = textFormat(ft)
+        if fmt is None:
+            featureList.append((ft, val))
+        else:
+            textList.append((fmt, val))
+    featureList.sort(key=lambda x: (selectivity(*x), x[0]))
+    (nodeSet, isSet) = _nodeSet(searchExe, otype)
+
+    # Conditions on the text are evaluated once for the whole corpus,
+    # see tf.search.textlayer; the nodes that satisfy them are the only candidates
+
+    if textList:
+        textType = None if otype == "." or isSet else otype
+        candidates = None
+        for (fmt, val) in textList:
+            hits = textLayer.nodes(fmt, val, otype=textType)
+            candidates = hits if candidates is None else candidates & hits
+        if isSet:
+            candidates = {n for n in candidates if n in nodeSet}
+        nodeSet = sorted(candidates)
+
+    guard = searchExe.guard
+    tick = guard.tick if guard else None
+
+    yarn = set()
     for n in nodeSet:
+        if tick:
+            tick()
         good = True
         for (ft, val) in featureList:
             fval = Fs(ft).v(n)
@@ -72,10 +196,7 @@ def _spinAtom(searchExe, q):
                         break
         if good:
             yarn.add(n)
-    if quantifiers:
-        for quantifier in quantifiers:
-            yarn = _doQuantifier(searchExe, yarn, src, quantifier)
-    searchExe.yarns[q] = yarn
+    return yarn
 
 
 def _doQuantifier(searchExe, yarn, atom, quantifier):
@@ -112,6 +233,10 @@ def _doQuantifier(searchExe, yarn, atom, quantifier):
             silent=silent,
             _msgCache=_msgCache,
             setInfo=searchExe.setInfo,
+            universe=universe,
+            atomCache=searchExe.atomCache,
+            guard=searchExe.guard,
+            params=searchExe.params,
         )
         if showQuantifiers:
             indent(level=level + 2, reset=True)
@@ -138,6 +263,10 @@ def _doQuantifier(searchExe, yarn, atom, quantifier):
             silent=silent,
             _msgCache=_msgCache,
             setInfo=searchExe.setInfo,
+            universe=universe,
+            atomCache=searchExe.atomCache,
+            guard=searchExe.guard,
+            params=searchExe.params,
         )
         if showQuantifiers:
             indent(level=level + 2, reset=True)
@@ -168,6 +297,10 @@ def _doQuantifier(searchExe, yarn, atom, quantifier):
                 silent=silent,
                 _msgCache=_msgCache,
                 setInfo=searchExe.setInfo,
+                universe=universe,
+                atomCache=searchExe.atomCache,
+                guard=searchExe.guard,
+                params=searchExe.params,
             )
             if showQuantifiers:
                 indent(level=level + 2, reset=True)
@@ -210,6 +343,10 @@ def _doQuantifier(searchExe, yarn, atom, quantifier):
                 silent=silent,
                 _msgCache=_msgCache,
                 setInfo=searchExe.setInfo,
+                universe=universe,
+                atomCache=searchExe.atomCache,
+                guard=searchExe.guard,
+                params=searchExe.params,
             )
             offset += len(alt.split("\n")) + 1
             if showQuantifiers:
@@ -239,8 +376,14 @@ def _doQuantifier(searchExe, yarn, atom, quantifier):
 
 def spinAtoms(searchExe):
     qnodes = searchExe.qnodes
+    guard = searchExe.guard
+    level = searchExe.level
+    if guard:
+        guard.setStage("atoms")
     for q in range(len(qnodes)):
         _spinAtom(searchExe, q)
+        if guard and level == 0:
+            guard.setYarns(searchExe.yarns)
 
 
 def estimateSpreads(searchExe, both=False):
@@ -251,6 +394,10 @@ def estimateSpreads(searchExe, both=False):
     converse = searchExe.converse
     qedges = searchExe.qedges
     yarns = searchExe.yarns
+    edgeMap = searchExe.edgeMap
+    sets = searchExe.sets
+    stats = searchExe.api.S.stats
+    randrange = Random(SAMPLE_SEED).randrange
 
     spreadsC = {}
     spreads = {}
@@ -268,45 +415,59 @@ def estimateSpreads(searchExe, both=False):
                 # fixed estimates
                 dest[e] = len(yarnT) * s
                 continue
+            if len(yarnF) == 0:
+                dest[e] = 0
+                continue
+
+            # estimates from corpus statistics
+            fType = qnodes[tf][0]
+            tType = qnodes[tt][0]
+            if stats.isType(fType, sets) and stats.isType(tType, sets):
+                if trela in edgeMap:
+                    (eName, eDir) = edgeMap[trela]
+                    spread = stats.edgeSpread(eName, eDir, fType, tType, len(yarnT))
+                else:
+                    relInfo = relations[trela]
+                    acro = relInfo.get("name", relInfo["acro"])
+                    spread = stats.relationSpread(acro, fType, tType, len(yarnT))
+                if spread is not None:
+                    dest[e] = spread
+                    continue
+
+            # estimates from samples
             yarnF = list(yarnF)
-            yarnT = yarns[tt]
             yarnFl = len(yarnF)
             if yarnFl < TRY_LIMIT_F:
                 triesn = yarnF
             else:
                 triesn = {yarnF[randrange(yarnFl)] for n in range(TRY_LIMIT_F)}
 
-            if len(triesn) == 0:
-                dest[e] = 0
+            r = relations[trela]["func"](qnodes[tf][0], qnodes[tt][0])
+            nparams = len(signature(r).parameters)
+            totalSpread = 0
+            if nparams == 1:
+                for n in triesn:
+                    mFromN = {m for m in r(n) or () if m in yarnT}
+                    totalSpread += len(mFromN)
             else:
-                r = relations[trela]["func"](qnodes[tf][0], qnodes[tt][0])
-                nparams = len(signature(r).parameters)
-                totalSpread = 0
-                if nparams == 1:
-                    for n in triesn:
-                        mFromN = {m for m in r(n) or () if m in yarnT}
-                        totalSpread += len(mFromN)
-                else:
-                    yarnTl = len(yarnT)
-                    yarnTL = list(yarnT)
-                    for n in triesn:
-                        triesm = (
-                            yarnT
-                            if yarnTl < TRY_LIMIT_T
-                            else set(
-                                yarnTL[randrange(yarnTl)] for m in range(TRY_LIMIT_T)
-                            )
-                        )
-                        if len(triesm) == 0:
-                            thisSpread = 0
-                        else:
-                            thisSpread = 0
-                            for m in triesm:
-                                if r(n, m):
-                                    thisSpread += 1
-                            thisSpread = thisSpread / len(triesm)
-                        totalSpread += yarnTl * thisSpread
-                dest[e] = totalSpread / len(triesn)
+                yarnTl = len(yarnT)
+                yarnTL = list(yarnT)
+                for n in triesn:
+                    triesm = (
+                        yarnT
+                        if yarnTl < TRY_LIMIT_T
+                        else set(yarnTL[randrange(yarnTl)] for m in range(TRY_LIMIT_T))
+                    )
+                    if len(triesm) == 0:
+                        thisSpread = 0
+                    else:
+                        thisSpread = 0
+                        for m in triesm:
+                            if r(n, m):
+                                thisSpread += 1
+                        thisSpread = thisSpread / len(triesm)
+                    totalSpread += yarnTl * thisSpread
+            dest[e] = totalSpread / len(triesn)
     searchExe.spreads = spreads
     searchExe.spreadsC = spreadsC
 
@@ -371,9 +532,13 @@ def _spinEdge(searchExe, e):
         nparams = len(signature(r).parameters)
         newYarnF = set()
         newYarnT = set()
+        guard = searchExe.guard
+        tick = guard.tick if guard else None
 
         if nparams == 1:
             for n in yarnF:
+                if tick:
+                    tick()
                 found = False
                 for m in r(n):
                     if m not in yarnT:
@@ -386,6 +551,8 @@ def _spinEdge(searchExe, e):
             for n in yarnF:
                 found = False
                 for m in yarnT:
+                    if tick:
+                        tick()
                     if r(n, m):
                         newYarnT.add(m)
                         found = True
@@ -414,19 +581,36 @@ def spinEdges(searchExe):
     uptodate = searchExe.uptodate
     thinned = {}
 
+    guard = searchExe.guard
+    level = searchExe.level
+    analysis = searchExe.analysis
+    if guard:
+        guard.setStage("edges")
+
     estimateSpreads(searchExe, both=True)
 
     for e in range(len(qedges)):
         uptodate[e] = False
     it = 0
     while 1:
+        if guard:
+            if level == 0:
+                guard.setYarns(yarns)
+            else:
+                guard.check()
         if min(len(yarns[q]) for q in range(len(qnodes))) == 0:
             break
         if all(uptodate[e] for e in range(len(qedges))):
             break
         e = _chooseEdge(searchExe)
         (f, rela, t) = qedges[e]
+        if analysis:
+            before = (len(yarns[f]), len(yarns[t]))
+            start = perf_counter()
         affected = _spinEdge(searchExe, e)
+        if analysis:
+            after = (len(yarns[f]), len(yarns[t]))
+            analysis.edge(e, before, after, perf_counter() - start)
         if affected:
             thinned[e] = 1
         it += 1
@@ -0,0 +1,182 @@
+"""
+# Statistics for the search planner
+
+The search engine chooses its plan on the basis of estimates of the sizes
+of the yarns and the spreads of the relations between them.
+
+Most of these estimates can be derived from statistics of the corpus,
+so that the plan does not depend on random samples.
+
+*   The spreads of the basic relations between nodes in terms of their slots,
+    per pair of node types, are pre-computed, see `tf.core.prepare.stats`.
+*   The degrees of edge features, per pair of node types, are computed
+    the first time an edge feature is used in a query.
+*   Histograms of node features are computed the first time a feature is
+    used in a query, and are used to test the most selective feature
+    conditions first.
+
+Statistics of features are kept as long as the data of that feature stays loaded.
+"""
+
+import collections
+import types
+
+from .syntax import reTp
+
+UNKNOWN_SELECTIVITY = 0.5
+"""Assumed fraction of nodes passing a condition that we cannot estimate."""
+
+
+class SearchStats:
+    def __init__(self, api):
+        self.api = api
+        C = api.C
+        data = C.stats.data if hasattr(C, "stats") else {}
+        self.typeCount = data.get("typeCount", {})
+        self.fanOut = data.get("fanOut", {})
+        self.edgeDegrees = {}
+        self.histograms = {}
+
+    def isType(self, nType, sets):
+        """Whether a node type in a template is a real node type.
+
+        Custom sets and the `.` atom are not, even if they happen to
+        have the name of a node type.
+        """
+
+        if sets is not None and nType in sets:
+            return False
+        return nType in self.typeCount
+
+    def relationSpread(self, acro, fType, tType, yarnTl):
+        """Estimates the spread of a basic relation between two yarns.
+
+        Parameters
+        ----------
+        acro: string
+            The acronym of the relation, e.g. `[[`.
+        fType, tType: string
+            The node types of the yarns at both sides of the relation.
+        yarnTl: integer
+            The size of the target yarn.
+
+        Returns
+        -------
+        float | None
+            `None` if there are no statistics for this relation.
+        """
+
+        fanOut = self.fanOut.get(acro, None)
+        if fanOut is None:
+            return None
+        tCount = self.typeCount.get(tType, 0)
+        if not tCount:
+            return 0
+        return fanOut.get((fType, tType), 0) * yarnTl / tCount
+
+    def edgeSpread(self, eName, dir, fType, tType, yarnTl):
+        """Estimates the spread of an edge relation between two yarns.
+
+        Parameters
+        ----------
+        eName: string
+            The name of the edge feature.
+        dir: integer
+            `1` if the edges go from the source yarn to the target yarn,
+            `-1` if they go in the opposite direction,
+            `0` if they may go in either direction.
+        fType, tType: string
+            The node types of the yarns at both sides of the relation.
+        yarnTl: integer
+            The size of the target yarn.
+
+        Returns
+        -------
+        float | None
+            `None` if the edge feature is not loaded.
+        """
+
+        degrees = self._edgeDegrees(eName)
+        if degrees is None:
+            return None
+        typeCount = self.typeCount
+        fCount = typeCount.get(fType, 0)
+        tCount = typeCount.get(tType, 0)
+        if not fCount or not tCount:
+            return 0
+        pairs = 0
+        if dir in {0, 1}:
+            pairs += degrees.get((fType, tType), 0)
+        if dir in {0, -1}:
+            pairs += degrees.get((tType, fType), 0)
+        return pairs / fCount * yarnTl / tCount
+
+    def selectivity(self, fName, val):
+        """Estimates the fraction of nodes that satisfy a feature condition.
+
+        Parameters
+        ----------
+        fName: string
+            The name of the node feature.
+        val: any
+            The feature condition as it comes out of `tf.search.syntax`.
+
+        Returns
+        -------
+        float
+            A number between 0 and 1.
+        """
+
+        histogram = self._histogram(fName)
+        if histogram is None:
+            return UNKNOWN_SELECTIVITY
+
+        (total, freqs) = histogram
+        if not total:
+            return 0
+
+        maxNode = self.api.F.otype.maxNode
+        present = sum(freqs.values()) / maxNode
+
+        if val is None:
+            return 1 - present
+        if val is True:
+            return present
+        if isinstance(val, (types.FunctionType, reTp)):
+            return present * UNKNOWN_SELECTIVITY
+
+        (ident, values) = val
+        if ident is None and values is True:
+            return 1
+        freq = sum(freqs.get(v, 0) for v in values) / maxNode
+        return freq if ident else 1 - freq
+
+    def _histogram(self, fName):
+        fObj = self.api.Fs(fName, warn=False)
+        if fObj is None:
+            return None
+        data = fObj.data
+        cached = self.histograms.get(fName, None)
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        freqs = collections.Counter(v for (n, v) in fObj.items())
+        histogram = (len(freqs), freqs)
+        self.histograms[fName] = (data, histogram)
+        return histogram
+
+    def _edgeDegrees(self, eName):
+        eObj = self.api.Es(eName, warn=False)
+        if eObj is None:
+            return None
+        data = eObj.data
+        cached = self.edgeDegrees.get(eName, None)
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        fOtype = self.api.F.otype.v
+        degrees = collections.Counter()
+        for (n, ms) in data.items():
+            nType = fOtype(n)
+            for m in ms:
+                degrees[(nType, fOtype(m))] += 1
+        self.edgeDegrees[eName] = (data, degrees)
+        return degrees
@@ -11,6 +11,7 @@ from .graph import multiEdges
 # STITCHING: STRATEGIES ###
 
 STRATEGY = """
+    by_cost
     small_choice_multi
     small_choice_first
     by_yarn_size
@@ -235,15 +236,99 @@ def _small_choice_multi(searchExe):
     # some of which provide an upper bound for that node, and some a lower bound.
     # So, a multi edge constrains choices much more than each of the individual edges.
 
-    qedges = searchExe.qedges
     qnodes = searchExe.qnodes
+    yarns = searchExe.yarns
+
+    (isMulti, inMulti) = _addMultiEdges(searchExe)
+
+    start = sorted(range(len(qnodes)), key=lambda x: len(yarns[x]))[0]
+    (newNodes, newEdges, removedEdges) = _growMulti(searchExe, start, isMulti, inMulti)
+
+    searchExe.newNodes = newNodes
+    searchExe.newEdges = newEdges
+    searchExe.removedEdges = removedEdges
+
+
+def _by_cost(searchExe):
+
+    # This strategy grows plans in the same way as small_choice_multi,
+    # but it does so from every possible starting point.
+    # For each resulting plan we estimate the amount of work
+    # needed to stitch the results, and we pick the cheapest plan.
+
+    # The amount of work is the number of partial stitches that will be
+    # tried. We start with the nodes of the starting yarn,
+    # and every edge that adds a new node multiplies the number of partial
+    # stitches by its spread.
+    # Edges whose relation function cannot enumerate its targets
+    # have to test every node in the target yarn for each partial stitch.
+    # Edges between nodes that are already in the stitch are mere checks.
+
+    qnodes = searchExe.qnodes
+    qedges = searchExe.qedges
+    relations = searchExe.relations
     converse = searchExe.converse
     spreads = searchExe.spreads
     spreadsC = searchExe.spreadsC
     yarns = searchExe.yarns
 
+    (isMulti, inMulti) = _addMultiEdges(searchExe)
+
+    nParams = {}
+
+    def enumerates(e, dir):
+        if e in isMulti:
+            return False
+        if (e, dir) not in nParams:
+            (f, rela, t) = qedges[e]
+            if dir == -1:
+                (f, rela, t) = (t, converse[rela], f)
+            r = relations[rela]["func"](qnodes[f][0], qnodes[t][0])
+            nParams[(e, dir)] = len(signature(r).parameters)
+        return nParams[(e, dir)] == 1
+
+    def planCost(start, edges):
+        bound = {start}
+        partial = len(yarns[start])
+        cost = partial
+        for (e, dir) in edges:
+            (f, rela, t) = qedges[e]
+            if dir == -1:
+                (f, t) = (t, f)
+            spread = spreads[e] if dir == 1 else spreadsC[e]
+            work = partial * (spread if enumerates(e, dir) else len(yarns[t]))
+            cost += work
+            if t not in bound:
+                bound.add(t)
+                partial *= spread
+        return cost
+
+    bestPlan = None
+    bestCost = None
+
+    for start in sorted(range(len(qnodes)), key=lambda x: len(yarns[x])):
+        plan = _growMulti(searchExe, start, isMulti, inMulti)
+        cost = planCost(start, plan[1])
+        if bestCost is None or cost < bestCost:
+            bestPlan = plan
+            bestCost = cost
+
+    (newNodes, newEdges, removedEdges) = bestPlan
+    searchExe.newNodes = newNodes
+    searchExe.newEdges = newEdges
+    searchExe.removedEdges = removedEdges
+    searchExe.planCost = bestCost
+
+
+def _addMultiEdges(searchExe):
+
     # add the multiedges to the qedges and determine their spreads
 
+    qedges = searchExe.qedges
+    converse = searchExe.converse
+    spreads = searchExe.spreads
+    spreadsC = searchExe.spreadsC
+
     firstMulti = searchExe.firstMulti  # has been set to len(qedges)
 
     multiEdges(searchExe)
@@ -273,7 +358,14 @@ def _small_choice_multi(searchExe):
         spreads[curE] = minSpread / 10
         curE += 1
 
-    newNodes = {sorted(range(len(qnodes)), key=lambda x: len(yarns[x]))[0]}
+    return (isMulti, inMulti)
+
+
+def _growMulti(searchExe, start, isMulti, inMulti):
+    qedges = searchExe.qedges
+    firstMulti = searchExe.firstMulti
+
+    newNodes = {start}
     newEdges = []
     doneEdges = set()
 
@@ -351,9 +443,7 @@ def _small_choice_multi(searchExe):
         if not added:
             break
 
-    searchExe.newNodes = newNodes
-    searchExe.newEdges = newEdges
-    searchExe.removedEdges = removedEdges
+    return (newNodes, newEdges, removedEdges)
 
 
 def _by_yarn_size(searchExe):
@@ -489,9 +579,19 @@ def _big_choice_first(searchExe):
 # STITCHING ###
 
 
-def stitch(searchExe):
-    estimateSpreads(searchExe, both=True)
-    _stitchPlan(searchExe)
+def stitch(searchExe, plan=None):
+    # If plan is given, it is a stitch plan of an earlier run of the same template,
+    # see tf.search.prepared, and we skip planning.
+
+    guard = searchExe.guard
+    if guard:
+        guard.setStage("stitch")
+
+    if plan is None:
+        estimateSpreads(searchExe, both=True)
+        _stitchPlan(searchExe)
+    else:
+        searchExe.stitchPlan = plan
     if searchExe.good:
         _stitchResults(searchExe)
 
@@ -568,75 +668,13 @@ In plan    : {newCedgesO}""",
 # STITCHING: DELIVERING ###
 
 
-def _stitchResults(searchExe):
+def _compilePlan(searchExe, planEdges):
     qnodes = searchExe.qnodes
     qedges = searchExe.qedges
-    plan = searchExe.stitchPlan
     relations = searchExe.relations
     converse = searchExe.converse
-    yarns = searchExe.yarns
     firstMulti = searchExe.firstMulti
 
-    planEdges = plan[1]
-    if len(planEdges) == 0:
-        # no edges, hence a single node (because of connectedness,
-        # hence we must deliver everything of its yarn
-        yarn = yarns[0]
-
-        def deliver(remap=True):
-            for n in yarn:
-                yield (n,)
-
-        if searchExe.shallow:
-            results = yarn
-        else:
-            results = deliver
-        searchExe.results = results
-        return
-
-    # The next function is optimised, and the lookup of functions and data
-    # should be as direct as possible.
-    # Because deliver() below fetches the results,
-    # of which there are unpredictably many.
-
-    # We are going to build-up and deliver stitches,
-    # which are instantiations of all the query nodes
-    # by text nodes in a specific sequence
-    # which is the same for all stitches.
-    # We can compile stitching in such a way, that the stitcher thinks it is
-    # instantiating q node 0, then 1, and so on.
-    # I.e. we are going to permute every thing that the stitching process sees,
-    # so that it happens in this order.
-
-    # We build up the stitch in a recursive process.
-    # When there is choice between a and b, we essentially say
-    #
-    # def build(stitch)
-    #     if there is choice
-    #        build(stitch+a)
-    #        build(stitch+b)
-    #
-    # But we do not have to pass on the stitch as an immutable data structure.
-    # We can just keep it as one single mutable data structure, provided we
-    # do something between the two recursive calls above.
-    # Suppose stitch is an list, and in the outer build n elements are filled
-    # (the rest contains -1)
-    #
-    # Then we say
-    #     if there is choice
-    #        build(stitch+a)
-    #        for k in range(n, len(stitch)): stitch[k] = -1
-    #        build(stitch+b)
-    #
-    # It turns out that the data in stitch that is shared between calls
-    # is not modified by them.
-    # The only thing that happens, is that -1 values get new values.
-    # So coming out calls only requires us to restore -1's.
-    # And if the stitch is ordered in the right way,
-    # the -1's are always at the end.
-
-    # We start compiling and permuting
-
     edgesCompiled = []
     qPermuted = []  # row of nodes in the order as will be created during stitching
     qPermutedPos = (
@@ -679,21 +717,32 @@ def _stitchResults(searchExe):
 
         edgesCompiled.append((compiledF, compiledT, r, nparams, isMulti))
 
-    # now permute the yarns
+    return (edgesCompiled, qPermuted, qPermutedPos)
 
-    yarnsPermuted = [yarns[q] for q in qPermuted]
 
-    shallow = searchExe.shallow
+def _makeDeliver(
+    searchExe, edgesCompiled, qPermuted, qPermutedPos, yarnsPermuted, arrivals=None
+):
+    # If starts is given, it is an iterable of nodes of the first yarn,
+    # and only results with those nodes will be delivered, in that order.
+    # If arrivals is given, it is a list in which we count, per edge of the plan,
+    # how many partial results arrive there, see tf.search.analyze.
 
-    def deliver(remap=True):
+    def deliver(remap=True, starts=None):
         stitch = [None for q in range(len(qPermuted))]
         lStitch = len(stitch)
         qs = tuple(range(lStitch))
         edgesC = edgesCompiled
         yarnsP = yarnsPermuted
+        guard = searchExe.guard
+        tick = guard.tick if guard else None
 
         def stitchOn(e):
+            if tick:
+                tick()
             if e >= len(edgesC):
+                if arrivals is not None:
+                    arrivals[e] += 1
                 if remap:
                     yield tuple(stitch[qPermutedPos[q]] for q in qs)
                 else:
@@ -703,12 +752,14 @@ def _stitchResults(searchExe):
             yarnT = yarnsP[t]
             if e == 0 and stitch[f] is None:
                 # this cannot happen for a multi-edge
-                yarnF = yarnsP[f]
+                yarnF = yarnsP[f] if starts is None else starts
                 for sN in yarnF:
                     stitch[f] = sN
                     for s in stitchOn(e):
                         yield s
                 return
+            if arrivals is not None:
+                arrivals[e] += 1
 
             sM = stitch[t]
 
@@ -769,6 +820,97 @@ def _stitchResults(searchExe):
         for s in stitchOn(0):
             yield s
 
+    return deliver
+
+
+def _stitchResults(searchExe):
+    plan = searchExe.stitchPlan
+    yarns = searchExe.yarns
+
+    planEdges = plan[1]
+    if len(planEdges) == 0:
+        # no edges, hence a single node (because of connectedness,
+        # hence we must deliver everything of its yarn
+        yarn = yarns[0]
+
+        def deliver(remap=True):
+            for n in yarn:
+                yield (n,)
+
+        if searchExe.shallow:
+            results = yarn
+        else:
+            results = deliver
+        searchExe.results = results
+        return
+
+    # The next function is optimised, and the lookup of functions and data
+    # should be as direct as possible.
+    # Because deliver() below fetches the results,
+    # of which there are unpredictably many.
+
+    # We are going to build-up and deliver stitches,
+    # which are instantiations of all the query nodes
+    # by text nodes in a specific sequence
+    # which is the same for all stitches.
+    # We can compile stitching in such a way, that the stitcher thinks it is
+    # instantiating q node 0, then 1, and so on.
+    # I.e. we are going to permute every thing that the stitching process sees,
+    # so that it happens in this order.
+
+    # We build up the stitch in a recursive process.
+    # When there is choice between a and b, we essentially say
+    #
+    # def build(stitch)
+    #     if there is choice
+    #        build(stitch+a)
+    #        build(stitch+b)
+    #
+    # But we do not have to pass on the stitch as an immutable data structure.
+    # We can just keep it as one single mutable data structure, provided we
+    # do something between the two recursive calls above.
+    # Suppose stitch is an list, and in the outer build n elements are filled
+    # (the rest contains -1)
+    #
+    # Then we say
+    #     if there is choice
+    #        build(stitch+a)
+    #        for k in range(n, len(stitch)): stitch[k] = -1
+    #        build(stitch+b)
+    #
+    # It turns out that the data in stitch that is shared between calls
+    # is not modified by them.
+    # The only thing that happens, is that -1 values get new values.
+    # So coming out calls only requires us to restore -1's.
+    # And if the stitch is ordered in the right way,
+    # the -1's are always at the end.
+
+    # We start compiling and permuting
+
+    (edgesCompiled, qPermuted, qPermutedPos) = _compilePlan(searchExe, planEdges)
+
+    analysis = searchExe.analysis
+    if analysis and analysis.stitchCounts:
+        edgesCompiled = analysis.instrument(planEdges, edgesCompiled)
+        arrivals = analysis.arrivals
+    else:
+        arrivals = None
+
+    # now permute the yarns
+
+    yarnsPermuted = [yarns[q] for q in qPermuted]
+
+    shallow = searchExe.shallow
+
+    deliver = _makeDeliver(
+        searchExe,
+        edgesCompiled,
+        qPermuted,
+        qPermutedPos,
+        yarnsPermuted,
+        arrivals=arrivals,
+    )
+
     def delivered():
         tupleSize = len(qPermuted)
         shallowTupleSize = max(tupleSize, shallow)
@@ -779,9 +921,15 @@ def _stitchResults(searchExe):
         resultQmax = max(qPermutedPos[q] for q in range(shallowTupleSize))
         resultSet = set()
         qs = tuple(range(shallow))
+        guard = searchExe.guard
+        tick = guard.tick if guard else None
 
         def stitchOn(e):
+            if tick:
+                tick()
             if e >= len(edgesC):
+                if arrivals is not None:
+                    arrivals[e] += 1
                 yield tuple(stitch)
                 return
             (f, t, r, nparams, isMulti) = edgesC[e]
@@ -802,6 +950,8 @@ def _stitchResults(searchExe):
                         for s in stitchOn(e):
                             yield s
                 return
+            if arrivals is not None:
+                arrivals[e] += 1
 
             if isMulti and resultQmax in f or not isMulti and resultQmax == f:
                 result = tuple(stitch[qPermutedPos[q]] for q in qs)
@@ -884,3 +1034,271 @@ def _stitchResults(searchExe):
         searchExe.results = delivered()
     else:
         searchExe.results = deliver
+
+
+def sortedResults(searchExe):
+    """Delivers the results in canonical order, lazily.
+
+    The plan is re-rooted at the first node of the template, and the nodes of its
+    yarn are visited in canonical order. The results for each such node are
+    sorted before they are delivered. So the first results come out in the
+    same order as when all results are sorted with
+    `tf.core.nodes.Nodes.sortKeyTuple`, without computing all results first.
+    """
+
+    api = searchExe.api
+    N = api.N
+    sortKeyTuple = N.sortKeyTuple
+    yarns = searchExe.yarns
+    planEdges = searchExe.stitchPlan[1]
+
+    if len(planEdges) == 0:
+        for n in N.sortNodes(yarns[0], fast=True):
+            yield (n,)
+        return
+
+    rootedEdges = _rootPlan(searchExe, planEdges, 0)
+    if rootedEdges is None:
+        for r in N.sortTuples(searchExe.results()):
+            yield r
+        return
+
+    (edgesCompiled, qPermuted, qPermutedPos) = _compilePlan(searchExe, rootedEdges)
+    yarnsPermuted = [yarns[q] for q in qPermuted]
+    deliver = _makeDeliver(
+        searchExe, edgesCompiled, qPermuted, qPermutedPos, yarnsPermuted
+    )
+
+    for n in N.sortNodes(yarns[0], fast=True):
+        group = list(deliver(starts=(n,)))
+        if len(group) > 1:
+            group.sort(key=sortKeyTuple)
+        for r in group:
+            yield r
+
+
+# STITCHING: COUNTING ###
+
+
+def countResults(searchExe, byType=None):
+    """Counts the results without delivering them.
+
+    We walk the stitch plan, but we do not build result tuples.
+    Whenever the remaining part of the plan falls apart in pieces that do not
+    share unbound nodes, we count the pieces separately and multiply the counts.
+
+    Parameters
+    ----------
+    byType: string, optional None
+        If given, the results are counted per node of this type that contains
+        the node of the result that corresponds to the first atom of the template.
+
+    Returns
+    -------
+    integer | dict
+        If `byType` is given, a dict keyed by the nodes of type `byType`
+        with the number of results as values; results whose first node is
+        not contained in a node of that type are counted under `None`.
+    """
+
+    yarns = searchExe.yarns
+    planEdges = searchExe.stitchPlan[1]
+
+    if byType is not None:
+        api = searchExe.api
+        fOtype = api.F.otype.v
+        lU = api.L.u
+
+        def sectionOf(n):
+            if fOtype(n) == byType:
+                return n
+            sections = lU(n, otype=byType)
+            return sections[0] if sections else None
+
+    if len(planEdges) == 0:
+        yarn = yarns[0]
+        if byType is None:
+            return len(yarn)
+        counts = {}
+        for n in yarn:
+            section = sectionOf(n)
+            counts[section] = counts.get(section, 0) + 1
+        return counts
+
+    if byType is not None:
+        # we let the plan start at the first node of the template
+        planEdges = _rootPlan(searchExe, planEdges, 0)
+        if planEdges is None:
+            counts = {}
+            for r in searchExe.results():
+                section = sectionOf(r[0])
+                counts[section] = counts.get(section, 0) + 1
+            return counts
+
+    (edgesCompiled, qPermuted, qPermutedPos) = _compilePlan(searchExe, planEdges)
+    yarnStart = yarns[qPermuted[0]]
+    yarnsPermuted = [yarns[q] for q in qPermuted]
+    stitch = [None for q in qPermuted]
+    tree = _countTree(tuple(edgesCompiled), frozenset({0}))
+    guard = searchExe.guard
+    tick = guard.tick if guard else None
+    if guard:
+        guard.setStage("count")
+
+    def countOn(tree):
+        if tick:
+            tick()
+        if tree is None:
+            return 1
+
+        if tree[0] == "prod":
+            total = 1
+            for sub in tree[1]:
+                c = countOn(sub)
+                if not c:
+                    return 0
+                total *= c
+            return total
+
+        (kind, (f, t, r, nparams, isMulti), sub) = tree
+
+        if kind == "check":
+            sM = stitch[t]
+            if isMulti:
+                satisfied = all(r[i](stitch[x], sM) for (i, x) in enumerate(f))
+            elif nparams == 1:
+                satisfied = sM in (r(stitch[f]) or ())
+            else:
+                satisfied = r(stitch[f], sM)
+            return countOn(sub) if satisfied else 0
+
+        yarnT = yarnsPermuted[t]
+        total = 0
+        if isMulti:
+            for m in yarnT:
+                if all(r[i](stitch[x], m) for (i, x) in enumerate(f)):
+                    stitch[t] = m
+                    total += countOn(sub)
+        else:
+            sN = stitch[f]
+            if nparams == 1:
+                for m in r(sN) or ():
+                    if m in yarnT:
+                        stitch[t] = m
+                        total += countOn(sub)
+            else:
+                for m in yarnT:
+                    if r(sN, m):
+                        stitch[t] = m
+                        total += countOn(sub)
+        stitch[t] = None
+        return total
+
+    if byType is None:
+        total = 0
+        for n in yarnStart:
+            stitch[0] = n
+            total += countOn(tree)
+        return total
+
+    counts = {}
+    for n in yarnStart:
+        stitch[0] = n
+        c = countOn(tree)
+        if c:
+            section = sectionOf(n)
+            counts[section] = counts.get(section, 0) + c
+    return counts
+
+
+def _countTree(edges, bound):
+    # Compiles a sequence of compiled edges into a counting tree.
+    # The nodes in bound have values when the tree is evaluated.
+    # A tree is None (count 1), or
+    # ("prod", subtrees): the product of the counts of independent subtrees, or
+    # ("check", edge, subtree): the edge between bound nodes must hold, or
+    # ("extend", edge, subtree): the sum over all values of the target of edge.
+
+    if not edges:
+        return None
+
+    groups = _independentGroups(edges, bound)
+    if len(groups) > 1:
+        return ("prod", tuple(_countTree(group, bound) for group in groups))
+
+    edge = edges[0]
+    t = edge[1]
+    if t in bound:
+        return ("check", edge, _countTree(edges[1:], bound))
+    return ("extend", edge, _countTree(edges[1:], bound | {t}))
+
+
+def _independentGroups(edges, bound):
+    # Partitions edges into groups that do not share unbound nodes.
+    # The order of the edges within a group is preserved.
+
+    groupOf = {}
+    groups = []
+
+    for edge in edges:
+        (f, t, r, nparams, isMulti) = edge
+        free = {x for x in chain(f if isMulti else (f,), (t,)) if x not in bound}
+        hits = sorted({groupOf[x] for x in free if x in groupOf})
+        if hits:
+            g = hits[0]
+            for h in hits[1:]:
+                groups[g].extend(groups[h])
+                groups[h] = None
+                for (x, gx) in groupOf.items():
+                    if gx == h:
+                        groupOf[x] = g
+        else:
+            g = len(groups)
+            groups.append([])
+        groups[g].append(edge)
+        for x in free:
+            groupOf[x] = g
+
+    position = {id(edge): i for (i, edge) in enumerate(edges)}
+    return [
+        tuple(sorted(group, key=lambda edge: position[id(edge)]))
+        for group in groups
+        if group is not None
+    ]
+
+
+def _rootPlan(searchExe, planEdges, root):
+    # Reorders the edges of a plan so that it starts at the node root.
+    # Edges that are not multi-edges may be turned around.
+    # Returns None if that does not work out.
+
+    qedges = searchExe.qedges
+    firstMulti = searchExe.firstMulti
+
+    bound = {root}
+    remaining = list(planEdges)
+    newEdges = []
+
+    while remaining:
+        for (i, (e, dir)) in enumerate(remaining):
+            (f, rela, t) = qedges[e]
+            if dir == -1:
+                (f, t) = (t, f)
+            if e >= firstMulti:
+                # a multi-edge cannot be the first edge of a plan
+                if newEdges and all(x in bound for x in f):
+                    break
+            elif f in bound:
+                break
+            elif t in bound:
+                dir = -dir
+                (f, t) = (t, f)
+                break
+        else:
+            return None
+
+        remaining.pop(i)
+        newEdges.append((e, dir))
+        bound.add(t)
+
+    return newEdges
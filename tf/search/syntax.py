@@ -45,6 +45,7 @@ namesPat = r"^\s*(?:{op}\s+)?([^ \t:=#<>~*]+):"
 nonePat = r"^([a-zA-Z0-9-@_]+)(#?)\s*$"
 truePat = r"^([a-zA-Z0-9-@_]+)[*]\s*$"
 numPat = r"^-?[0-9]+$"
+paramPat = r"^\$([A-Za-z_][A-Za-z0-9_]*)$"
 opLinePat = r"^(\s*)({op})\s*$".format(op=opPat)
 opStripPat = r"^\s*{op}\s+(.*)$".format(op=opPat)
 quPat = f"(?:{QWHERE}|{QHAVE}|{QWITHOUT}|{QWITH}|{QOR}|{QEND})"
@@ -61,6 +62,7 @@ kRe = re.compile(kPat)
 nameRe = re.compile(f"^{namePat}$")
 namesRe = re.compile(namesPat)
 numRe = re.compile(numPat)
+paramRe = re.compile(paramPat)
 noneRe = re.compile(nonePat)
 trueRe = re.compile(truePat)
 opLineRe = re.compile(opLinePat)
@@ -73,6 +75,64 @@ whiteRe = re.compile(r"^\s*(%|$)")
 reTp = type(reRe)
 
 
+class Param:
+    """A parameter in a feature condition of a prepared search template.
+
+    See `tf.search.prepared`.
+
+    Parameters
+    ----------
+    name: string
+        The name of the parameter, as in `$name`.
+    comp: string
+        The kind of condition: `=`, `#`, `<`, `>` or `~`.
+    """
+
+    __slots__ = ("name", "comp")
+
+    def __init__(self, name, comp):
+        self.name = name
+        self.comp = comp
+
+    def __repr__(self):
+        return f"{self.comp}${self.name}"
+
+
+def bindParam(param, value, dataType):
+    """Turns a parameter with a value into a feature condition.
+
+    Parameters
+    ----------
+    param: object
+        A `tf.search.syntax.Param`.
+    value: any
+        The value bound to the parameter.
+    dataType: string
+        The data type of the feature: `str` or `int`.
+
+    Returns
+    -------
+    any
+        The feature condition, in the form that `parseFeatureVals` produces,
+        or `None` if the value is not suitable.
+    """
+
+    comp = param.comp
+
+    try:
+        if comp in {"=", "#"}:
+            values = (
+                value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+            )
+            cast = int if dataType == "int" else str
+            return (comp == "=", frozenset(cast(v) for v in values))
+        if comp in {"<", ">"}:
+            return _makeLimit(int(value), comp == ">")
+        return value if isinstance(value, reTp) else re.compile(value)
+    except (ValueError, TypeError, re.error):
+        return None
+
+
 def syntax(searchExe):
     error = searchExe.api.TF.error
     _msgCache = searchExe._msgCache
@@ -520,6 +580,7 @@ def parseFeatureVals(searchExe, featStr, features, i, asEdge=False):
         feat = featStr[1:-1]
     else:
         feat = featStr.replace(chr(1), " ")
+    withParams = not asEdge and getattr(searchExe, "params", None) is not None
     good = True
     for x in [True]:
         match = trueRe.match(feat)
@@ -538,6 +599,10 @@ def parseFeatureVals(searchExe, featStr, features, i, asEdge=False):
         if match:
             (featN, comp, featValStr) = match.groups()
             featName = _unesc(featN)
+            param = paramRe.match(featValStr) if withParams else None
+            if param:
+                featVals = Param(param.group(1), comp)
+                break
             featValSet = frozenset(_unesc(featVal) for featVal in featValStr.split("|"))
             featVals = (comp == "=", featValSet)
             break
@@ -545,7 +610,10 @@ def parseFeatureVals(searchExe, featStr, features, i, asEdge=False):
         if match:
             (featN, comp, limit) = match.groups()
             featName = _unesc(featN)
-            if not numRe.match(limit):
+            param = paramRe.match(limit) if withParams else None
+            if param:
+                featVals = Param(param.group(1), comp)
+            elif not numRe.match(limit):
                 searchExe.badSyntax.append((i, f'Limit is non numeric "{limit}"'))
                 good = False
                 featVals = None
@@ -556,6 +624,10 @@ def parseFeatureVals(searchExe, featStr, features, i, asEdge=False):
         if match:
             (featN, valRe) = match.groups()
             featName = _unesc(featN)
+            param = paramRe.match(valRe) if withParams else None
+            if param:
+                featVals = Param(param.group(1), "~")
+                break
             valRe = _unesc(valRe, inRe=True)
             try:
                 featVals = re.compile(valRe)
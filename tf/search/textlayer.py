@@ -0,0 +1,207 @@
+"""
+# Searching the text of a corpus with regular expressions
+
+A condition like `word g_word~^b` matches a regular expression against the
+value of a feature, node by node. It cannot find a phrase that is spelled
+across several words, nor anything that depends on the punctuation and white
+space between words.
+
+For that, search templates have the pseudo feature `_text`, which stands for the
+text of the corpus in a text format:
+
+```
+phrase _text~elohim\\s+bara
+```
+
+`_text` uses the default format `text-orig-full`, `_text@fmt` uses format `fmt`,
+e.g. `_text@text-trans-plain~...`. Only formats that target the slot type
+can be used.
+
+An atom with such a condition matches the nodes whose slots contain all slots
+of a match of the regular expression in the text of the whole corpus.
+
+## The text layer
+
+The first time a format is used in a `_text` condition, its *text layer* is made:
+the text of all slots in that format, including what comes after them,
+concatenated into one string, together with an array of the offsets in that string
+where every slot begins.
+It is the same text as you get by `T.text()` of all slots;
+it is the text buffer that `T.text()` itself uses,
+see `tf.core.text.Text.textBuffer`.
+
+The regular expression is then run once over the whole text layer.
+Every match is mapped back to the first and last slot whose text it touches,
+by bisecting the offsets, and from there to the nodes of the atom that contain
+those slots.
+
+Note that `^` and `$` refer to the beginning and end of the whole text layer,
+and that empty matches are ignored.
+
+Text layers are kept as long as the text formats do not change.
+"""
+
+import re
+from bisect import bisect_right
+from threading import Lock
+
+from ..core.text import DEFAULT_FORMAT
+
+TEXT_FEATURE = "_text"
+"""The pseudo feature for conditions on the text of the corpus."""
+
+TEXT_FORMAT_SEP = "@"
+"""Separator between the pseudo feature `_text` and the name of a text format."""
+
+
+def textFormat(fName):
+    """The text format of a `_text` condition.
+
+    Parameters
+    ----------
+    fName: string
+        A feature name as it occurs in a search template.
+
+    Returns
+    -------
+    string | void
+        The name of the text format if `fName` is the pseudo feature `_text`,
+        with or without a format, otherwise `None`.
+    """
+
+    if fName == TEXT_FEATURE:
+        return DEFAULT_FORMAT
+    if fName.startswith(f"{TEXT_FEATURE}{TEXT_FORMAT_SEP}"):
+        return fName[len(TEXT_FEATURE) + 1 :]
+    return None
+
+
+class TextLayer:
+    """Text layers of a corpus, for use in search.
+
+    There is one object per TF API, in `S.textLayer`.
+
+    Parameters
+    ----------
+    api: object
+        The TF API.
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.lock = Lock()
+
+    def check(self, fmt):
+        """Checks whether a format can be used in a `_text` condition.
+
+        Parameters
+        ----------
+        fmt: string
+            The name of a text format.
+
+        Returns
+        -------
+        string | void
+            A description of the problem if the format cannot be used,
+            otherwise `None`.
+        """
+
+        api = self.api
+        T = getattr(api, "T", None)
+        if T is None or fmt not in T._xformats:
+            return f'Unknown text format "{fmt}"'
+        slotType = api.F.otype.slotType
+        if T._xdTypes[fmt] != slotType:
+            return f'Text format "{fmt}" does not target the slot type "{slotType}"'
+        return None
+
+    def layer(self, fmt):
+        """Delivers the text layer of a format.
+
+        Parameters
+        ----------
+        fmt: string
+            The name of a text format that targets the slot type.
+
+        Returns
+        -------
+        tuple
+            The text buffer of the format, see `tf.core.text.Text.textBuffer`.
+        """
+
+        with self.lock:
+            return self.api.T.textBuffer(fmt)
+
+    def slotRanges(self, fmt, regex):
+        """Finds the slots that are covered by the matches of a regular expression.
+
+        Parameters
+        ----------
+        fmt: string
+            The name of a text format that targets the slot type.
+        regex: string | object
+            A regular expression, compiled or not.
+
+        Returns
+        -------
+        set
+            The pairs `(first, last)`: the first and the last slot
+            whose text is touched by a match.
+        """
+
+        (text, offsets) = self.layer(fmt)
+        if type(regex) is str:
+            regex = re.compile(regex)
+
+        ranges = set()
+        for match in regex.finditer(text):
+            (start, end) = match.span()
+            if start == end:
+                continue
+            ranges.add((bisect_right(offsets, start), bisect_right(offsets, end - 1)))
+        return ranges
+
+    def nodes(self, fmt, regex, otype=None):
+        """Finds the nodes that contain a match of a regular expression.
+
+        Parameters
+        ----------
+        fmt: string
+            The name of a text format that targets the slot type.
+        regex: string | object
+            A regular expression, compiled or not.
+        otype: string, optional None
+            If given, only nodes of this type are delivered.
+
+        Returns
+        -------
+        set
+            The nodes whose slots contain all slots of at least one match.
+        """
+
+        api = self.api
+        F = api.F
+        L = api.L
+        slotType = F.otype.slotType
+        maxSlot = F.otype.maxSlot
+        eoslots = api.E.oslots.data
+
+        result = set()
+        for (first, last) in self.slotRanges(fmt, regex):
+            if first == last and (otype is None or otype == slotType):
+                result.add(first)
+            if otype == slotType:
+                continue
+            span = range(first, last + 1)
+            for n in L.u(first) if otype is None else L.u(first, otype=otype):
+                if n in result:
+                    continue
+                slots = eoslots[n - maxSlot - 1]
+                if slots[-1] < last:
+                    continue
+                if slots[-1] - slots[0] + 1 != len(slots):
+                    slotSet = set(slots)
+                    if any(s not in slotSet for s in span):
+                        continue
+                result.add(n)
+        return result